@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Asyncio orchestration for subprocess-based ECM and CADO-NFS stages.
+
+run_ecm_once blocks a Python thread per gmp-ecm process in communicate().
+AsyncOrchestrator drives many subprocesses from one event loop instead:
+
+- A semaphore bounds how many external processes run at once
+  (default: CPU count), so one coordinator can saturate a many-core box
+- Every job has its own timeout; on expiry the process is killed
+- stdout is parsed line by line as it streams, so a factor is acted on
+  (and the process stopped) as soon as it is printed
+- Jobs can be grouped by key; a factor for one key cancels its siblings
+- watch_cado() polls a directory for CADO-NFS result files and hands the
+  factors to a callback as each file appears or changes
+
+Without the ecm binary (ecm_backend.BACKEND == "pyecm") ECM jobs run the
+pure-Python backend in a process pool under the same semaphore.  Each job
+gets a manager-backed cancel event, so a cancelled job that has already
+started stops after its current curve instead of running to its timeout.
+
+Example:
+    import asyncio
+    from async_orchestrator import AsyncOrchestrator
+
+    orch = AsyncOrchestrator(max_concurrency=32)
+    factors = asyncio.run(orch.factor_many(moduli, [(11_000, 90), (50_000, 300)]))
+
+CLI:
+    python async_orchestrator.py --targets targets_256bit.json --concurrency 32
+    python async_orchestrator.py --watch-cado cado_runs/ --targets targets_256bit.json
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import ecm_backend
+from cado_result import extract_factors
+from ecm_backend import _compute_sigma_u64, _parse_factor_lines
+
+# File patterns treated as CADO-NFS result files
+CADO_PATTERNS = ("*.out", "*.txt", "*.log")
+
+
+class AsyncOrchestrator:
+    """
+    Bounded-concurrency runner for ECM and other external-tool subprocesses.
+
+    The coroutine methods must all run on one event loop.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, ecm_bin: Optional[str] = None):
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.ecm_bin = ecm_bin or ecm_backend.ECM_BIN or "ecm"
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[object, set] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self.running = 0
+        self.peak_running = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the loop that actually runs the jobs
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    # -- generic subprocess jobs -------------------------------------------
+
+    async def run_command(self, cmd: Sequence[str], stdin_data: Optional[str] = None,
+                          timeout_sec: Optional[float] = None,
+                          parse_line: Optional[Callable[[str], object]] = None):
+        """
+        Run one subprocess under the concurrency limit, streaming stdout.
+
+        Args:
+            cmd: Command and arguments
+            stdin_data: Text written to stdin (stdin is then closed)
+            timeout_sec: Kill the process after this many seconds
+            parse_line: Called on every stdout line; the first non-None
+                return value ends the job early (the process is killed)
+
+        Returns:
+            The first parse_line result, or None (no match, timeout or error)
+        """
+        async with self.semaphore:
+            self.running += 1
+            self.peak_running = max(self.peak_running, self.running)
+            try:
+                return await self._run_streaming(cmd, stdin_data, timeout_sec, parse_line)
+            finally:
+                self.running -= 1
+
+    async def _run_streaming(self, cmd, stdin_data, timeout_sec, parse_line):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.PIPE if stdin_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except OSError:
+            return None
+        deadline = time.monotonic() + timeout_sec if timeout_sec else None
+        try:
+            if stdin_data is not None:
+                proc.stdin.write(stdin_data.encode())
+                await proc.stdin.drain()
+                proc.stdin.close()
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                line = await asyncio.wait_for(proc.stdout.readline(), remaining)
+                if not line:
+                    return None
+                if parse_line is not None:
+                    result = parse_line(line.decode(errors="replace"))
+                    if result is not None:
+                        return result
+        except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+            return None
+        finally:
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+            await proc.wait()
+
+    # -- ECM ------------------------------------------------------------------
+
+    def ecm_command(self, B1: int, curves: int, sigma: Optional[int] = None) -> List[str]:
+        """gmp-ecm command line, as built by ecm_backend._run_ecm_curves."""
+        cmd = [self.ecm_bin, "-q", "-one", "-c", str(curves)]
+        if sigma is not None and sigma > 0:
+            cmd += ["-sigma", str(sigma)]
+        return cmd + [str(B1)]
+
+    async def ecm(self, N: int, B1: int, curves: int, sigma: Optional[int] = None,
+                  timeout_sec: Optional[float] = None) -> Optional[int]:
+        """Run `curves` ECM curves on N; returns a factor or None."""
+        if ecm_backend.BACKEND != "gmp-ecm":
+            return await self._ecm_python(N, B1, curves, sigma, timeout_sec)
+        return await self.run_command(
+            self.ecm_command(B1, curves, sigma), f"{N}\n", timeout_sec,
+            lambda line: _parse_factor_lines(line, N))
+
+    async def _ecm_python(self, N, B1, curves, sigma, timeout_sec):
+        from ecm_python import ecm_factor
+        if sigma is None or sigma <= 0:
+            sigma = _compute_sigma_u64(N, B1)
+        if self._executor is None:
+            # Processes, not threads: pure-Python curves would serialize on the GIL
+            self._executor = ProcessPoolExecutor(max_workers=self.max_concurrency)
+            # threading.Events cannot cross into the pool; manager proxies can
+            self._manager = multiprocessing.Manager()
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            self.running += 1
+            self.peak_running = max(self.peak_running, self.running)
+            cancel_event = self._manager.Event()
+            try:
+                return await loop.run_in_executor(
+                    self._executor, partial(ecm_factor, N, B1, curves, sigma=sigma,
+                                            timeout_sec=timeout_sec, workers=1,
+                                            cancel_event=cancel_event))
+            except asyncio.CancelledError:
+                # Queued jobs are dropped by the executor; a running one
+                # checks the event between curves
+                cancel_event.set()
+                raise
+            finally:
+                self.running -= 1
+
+    def close(self) -> None:
+        """Shut down the fallback process pool, if one was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def submit(self, key, coro: Awaitable) -> asyncio.Task:
+        """Schedule a job under `key` so cancel(key) can stop it."""
+        task = asyncio.ensure_future(coro)
+        group = self._tasks.setdefault(key, set())
+        group.add(task)
+        task.add_done_callback(group.discard)
+        return task
+
+    def cancel(self, key) -> int:
+        """Cancel every pending or running job submitted under key."""
+        tasks = self._tasks.pop(key, set())
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+    async def factor_one(self, N: int, schedule: Sequence[Tuple[int, int]],
+                         timeout_sec: Optional[float] = None,
+                         split: int = 1) -> Optional[int]:
+        """
+        Run an ECM schedule [(B1, curves), ...] on N, stage by stage.
+
+        Each stage is split into `split` concurrent jobs with disjoint
+        sigma ranges; the first factor cancels the rest of the stage.
+        """
+        deadline = time.monotonic() + timeout_sec if timeout_sec else None
+        for B1, curves in schedule:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            base = _compute_sigma_u64(N, B1)
+            parts = max(1, min(split, curves))
+            key = (N, B1)
+            tasks = []
+            for i in range(parts):
+                count = curves // parts + (1 if i < curves % parts else 0)
+                offset = i * (curves // parts) + min(i, curves % parts)
+                tasks.append(self.submit(key, self.ecm(N, B1, count, base + offset, remaining)))
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        factor = await next_done
+                    except asyncio.CancelledError:
+                        continue
+                    if factor:
+                        return factor
+            finally:
+                self.cancel(key)
+                await asyncio.gather(*tasks, return_exceptions=True)
+        return None
+
+    async def factor_many(self, numbers: Iterable[int], schedule: Sequence[Tuple[int, int]],
+                          timeout_sec: Optional[float] = None,
+                          split: int = 1) -> Dict[int, Optional[int]]:
+        """factor_one for every N concurrently; returns {N: factor or None}."""
+        numbers = list(dict.fromkeys(int(n) for n in numbers))
+        results = await asyncio.gather(*(self.factor_one(N, schedule, timeout_sec, split)
+                                         for N in numbers))
+        return dict(zip(numbers, results))
+
+    # -- CADO-NFS results --------------------------------------------------
+
+    async def watch_cado(self, directory, on_result: Callable[[Path, str, str], object],
+                         moduli: Dict[str, int],
+                         poll_interval: float = 1.0,
+                         stop: Optional[asyncio.Event] = None,
+                         patterns: Sequence[str] = CADO_PATTERNS) -> None:
+        """
+        Ingest CADO-NFS result files as they appear in `directory`.
+
+        Every new or modified file matching `patterns` is parsed with
+        cado_result.extract_factors against the modulus for
+        its stem; when factors of that N are found, on_result(path, p, q)
+        is called (awaited if it is a coroutine).  Files whose stem has no
+        modulus are ignored.  Each file is reported at most once per
+        content version.
+
+        Args:
+            directory: Directory CADO-NFS runs write their output to
+            on_result: Callback for each result
+            moduli: {file stem: N}; factors are only reported if p * q == N
+            poll_interval: Seconds between directory scans
+            stop: Event that ends the watch (default: run until cancelled)
+            patterns: Glob patterns for result files
+        """
+        directory = Path(directory)
+        seen: Dict[Path, Tuple[float, int]] = {}
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            for pattern in patterns:
+                for path in sorted(directory.glob(pattern)):
+                    try:
+                        st = path.stat()
+                    except OSError:
+                        continue
+                    version = (st.st_mtime, st.st_size)
+                    if seen.get(path) == version:
+                        continue
+                    seen[path] = version
+                    N = moduli.get(path.stem)
+                    if N is None:
+                        continue
+                    p, q = extract_factors(path, N)
+                    if p and q:
+                        result = on_result(path, p, q)
+                        if asyncio.iscoroutine(result):
+                            await result
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Asyncio ECM / CADO-NFS orchestrator")
+    ap.add_argument("--targets", help="targets JSON or .ztc corpus to run ECM on "
+                                      "(with --watch-cado: the moduli, keyed by target id)")
+    ap.add_argument("--concurrency", type=int, default=None,
+                    help="max concurrent subprocesses (default: CPU count)")
+    ap.add_argument("--timeout", type=float, default=3600, help="per-target timeout (s)")
+    ap.add_argument("--split", type=int, default=1, help="concurrent jobs per ECM stage")
+    ap.add_argument("--watch-cado", metavar="DIR", help="ingest CADO-NFS results from DIR")
+    args = ap.parse_args(argv)
+
+    orch = AsyncOrchestrator(max_concurrency=args.concurrency)
+    from target_corpus import open_targets
+
+    if args.watch_cado:
+        if not args.targets:
+            ap.error("--watch-cado needs --targets to check factors against")
+        _, targets = open_targets(Path(args.targets))
+        moduli = {str(t.get('id', i)): int(t['N']) for i, t in enumerate(targets)}
+
+        def report(path, p, q):
+            print(f"{path.name}: {p} × {q}", flush=True)
+        try:
+            asyncio.run(orch.watch_cado(args.watch_cado, report, moduli))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if not args.targets:
+        ap.error("--targets or --watch-cado is required")
+    from factor_256bit import ECM_SCHEDULE
+    _, targets = open_targets(Path(args.targets))
+    schedule = [(B1, curves) for _, B1, curves in ECM_SCHEDULE]
+    start = time.time()
+    try:
+        factors = asyncio.run(orch.factor_many((int(t['N']) for t in targets), schedule,
+                                               args.timeout, args.split))
+    finally:
+        orch.close()
+    found = sum(1 for f in factors.values() if f)
+    print(f"{found}/{len(factors)} factored in {time.time() - start:.1f}s "
+          f"(peak {orch.peak_running} concurrent jobs)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
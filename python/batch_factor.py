@@ -6,41 +6,48 @@ Supports parallel processing, checkpointing, and adaptive timeouts.
 """
 
 import argparse
+import heapq
+import itertools
 import json
+import queue
 import time
 import os
 from pathlib import Path
 from typing import List, Dict, Optional
 from multiprocessing import Pool, cpu_count
-from factor_256bit import factor_single_target, verify_factors
+from factor_256bit import factor_single_target, verify_factors, expected_work, rank_methods
+from batch_gcd import find_shared_factors
+from checkpoint_log import CheckpointLog, latest_per_target
+from work_queue import DEFAULT_LEASE_SECONDS, WorkQueueServer, parse_address, run_worker
+from target_corpus import open_targets
 
 def load_targets(filepath: Path) -> List[Dict]:
-    """Load targets from JSON file."""
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    return data['targets']
+    """
+    Load targets from a JSON file or a binary corpus (.ztc).
+
+    Binary corpora are memory-mapped and returned as a TargetCorpus, which
+    supports len(), slicing and streaming iteration like the JSON list.
+    """
+    _, targets = open_targets(filepath)
+    return targets
 
 def load_checkpoint(checkpoint_file: Path) -> List[Dict]:
-    """Load checkpoint results if they exist."""
-    if checkpoint_file.exists():
-        with open(checkpoint_file, 'r') as f:
-            data = json.load(f)
-        return data.get('results', [])
-    return []
+    """
+    Load checkpoint results if they exist.
+
+    Reads the append-only JSONL log (tolerating a torn last line) as well
+    as old single-document JSON checkpoints.
+    """
+    return latest_per_target(CheckpointLog(checkpoint_file).replay())
 
 def save_checkpoint(results: List[Dict], checkpoint_file: Path):
-    """Save intermediate results to checkpoint file."""
-    output = {
-        'checkpoint_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-        'completed_count': len(results),
-        'results': results
-    }
-    
-    # Write to temp file first, then rename for atomicity
-    temp_file = checkpoint_file.with_suffix('.tmp')
-    with open(temp_file, 'w') as f:
-        json.dump(output, f, indent=2)
-    temp_file.replace(checkpoint_file)
+    """
+    Write all results as a fresh checkpoint log.
+
+    Batch runs append each result to a CheckpointLog as it completes; this
+    full rewrite is only for one-off exports and conversions.
+    """
+    CheckpointLog(checkpoint_file).replace(results)
 
 def get_target_type(target: Dict) -> str:
     """Get target type (biased or unbiased)."""
@@ -54,17 +61,29 @@ def get_timeout_for_target(target: Dict, timeout_unbiased: float, timeout_biased
     target_type = get_target_type(target)
     return timeout_unbiased if target_type == 'unbiased' else timeout_biased
 
+def expected_cost(target: Dict, timeout: float):
+    """
+    Sort key for scheduling: expected work of the best method for the
+    target's type and bit length, then its (remaining) timeout.
+    """
+    bits = int(target['N']).bit_length()
+    target_type = get_target_type(target)
+    best = rank_methods(bits, target_type)[0]
+    return (expected_work(best, bits, target_type), timeout)
+
 def factor_single_wrapper(args):
     """
     Wrapper function for parallel factorization.
     
     Args:
-        args: Tuple of (target, timeout, verbose)
+        args: Tuple of (target, timeout, verbose), optionally followed by
+            (resume, budget) when running one time slice of a target
     
     Returns:
         Result dictionary
     """
-    target, timeout, verbose = args
+    target, timeout, verbose = args[:3]
+    resume, budget = args[3:5] if len(args) > 3 else (None, None)
     
     N = int(target['N'])
     true_p = int(target['p'])
@@ -76,7 +95,8 @@ def factor_single_wrapper(args):
         print(f"\n[Worker] Processing target {target_id} ({target_type})")
     
     start_time = time.time()
-    result = factor_single_target(N, timeout=timeout, verbose=verbose)
+    result = factor_single_target(N, timeout=timeout, verbose=verbose, target_type=target_type,
+                                  resume=resume, budget=budget)
     
     # Add metadata
     result['target_id'] = str(target_id)
@@ -105,13 +125,179 @@ def factor_single_wrapper(args):
     
     return result
 
+def batch_gcd_prestage(targets: List[Dict], verbose: bool = True) -> Dict[int, Dict]:
+    """
+    Run one batch GCD over all target moduli.
+
+    Returns:
+        {index in targets: result dict} for every target that shares a
+        prime with another target (method 'batch_gcd')
+    """
+    start_time = time.time()
+    shared = find_shared_factors(int(t['N']) for t in targets)
+    elapsed = time.time() - start_time
+    if verbose:
+        print(f"Batch GCD: {len(shared)} of {len(targets)} targets share a factor ({elapsed:.2f}s)")
+
+    results = {}
+    for i, (p, q) in shared.items():
+        target = targets[i]
+        target_type = get_target_type(target)
+        true_p = int(target['p'])
+        true_q = int(target['q'])
+        results[i] = {
+            'success': True,
+            'p': str(p),
+            'q': str(q),
+            'method': 'batch_gcd',
+            'target_id': str(target.get('id', i)),
+            'target_type': target_type,
+            'bias_close': target.get('bias_close', target_type == 'biased'),
+            'true_p': str(true_p),
+            'true_q': str(true_q),
+            'elapsed_seconds': elapsed / len(shared),
+            'correct': {p, q} == {true_p, true_q},
+        }
+    return results
+
+def _new_slice_task(target: Dict, timeout: float) -> Dict:
+    return {'target': target, 'budget': timeout, 'remaining': timeout,
+            'resume': None, 'elapsed': 0.0, 'stages': [], 'slices': 0}
+
+def _slice_args(task: Dict, slice_seconds: float):
+    """factor_single_wrapper arguments for the task's next time slice."""
+    return (task['target'], min(task['remaining'], slice_seconds), False,
+            task['resume'], task['budget'])
+
+def _record_slice(task: Dict, result: Dict) -> bool:
+    """
+    Fold one slice's result into its task.
+
+    Returns True when the target is finished (result then covers all of
+    its slices), False when it should be queued again.
+    """
+    task['slices'] += 1
+    task['elapsed'] += result['elapsed_seconds']
+    task['remaining'] -= result['elapsed_seconds']
+    task['stages'].extend(result.get('stages', []))
+    resume = result.pop('resume', None)
+    if not result['success'] and resume and task['remaining'] > 0:
+        task['resume'] = resume
+        return False
+    result['elapsed_seconds'] = task['elapsed']
+    result['stages'] = task['stages']
+    result['slices'] = task['slices']
+    return True
+
+def run_work_stealing(args_list: List, num_workers: int, slice_seconds: float, on_result):
+    """
+    Run (target, timeout, verbose) tasks on a process pool, shortest
+    expected work first.
+
+    Targets whose timeout exceeds slice_seconds run as resumable slices:
+    an unfinished slice goes back on the queue with its remaining budget
+    and resume state, and whichever worker is idle next takes the cheapest
+    queued work.  A long unbiased target therefore never pins a worker
+    while short biased ones wait behind it.  on_result is called for each
+    target as soon as it finishes, in completion order.
+    """
+    seq = itertools.count()
+    heap = []
+    for target, timeout, _ in args_list:
+        task = _new_slice_task(target, timeout)
+        heapq.heappush(heap, (expected_cost(target, timeout), next(seq), task))
+
+    done = queue.Queue()
+    in_flight = 0
+    with Pool(processes=num_workers) as pool:
+        while heap or in_flight:
+            while heap and in_flight < num_workers:
+                _, _, task = heapq.heappop(heap)
+                pool.apply_async(factor_single_wrapper, (_slice_args(task, slice_seconds),),
+                                 callback=lambda r, t=task: done.put((t, r, None)),
+                                 error_callback=lambda e, t=task: done.put((t, None, e)))
+                in_flight += 1
+
+            task, result, error = done.get()
+            in_flight -= 1
+            if error is not None:
+                raise error
+            if _record_slice(task, result):
+                on_result(result)
+            else:
+                key = expected_cost(task['target'], task['remaining'])
+                heapq.heappush(heap, (key, next(seq), task))
+
+def run_coordinator(args_list: List, address, slice_seconds: float, on_result,
+                    lease_seconds: float = DEFAULT_LEASE_SECONDS, linger: float = 3.0,
+                    verbose: bool = True):
+    """
+    Serve (target, timeout, verbose) tasks to remote workers over TCP.
+
+    Same shortest-expected-first time slicing as run_work_stealing, but
+    the slices are leased to `batch_factor.py --worker` processes on any
+    host.  A worker that stops heartbeating loses its lease and the slice
+    is handed to another worker.  Returns once every target is finished,
+    after lingering so idle workers hear that the batch is done.
+    """
+    server = WorkQueueServer(address[0], address[1], lease_seconds=lease_seconds).start()
+    if verbose:
+        host, port = server.address
+        print(f"Coordinator listening on {host}:{port} ({len(args_list)} targets)")
+    try:
+        tasks = {}
+        for i, (target, timeout, _) in enumerate(args_list):
+            task_id = str(i)
+            tasks[task_id] = _new_slice_task(target, timeout)
+            server.put(task_id, _slice_payload(tasks[task_id], slice_seconds),
+                       expected_cost(target, timeout)[0])
+        unfinished = len(tasks)
+        while unfinished:
+            task_id, _, result = server.results.get()
+            task = tasks[task_id]
+            if _record_slice(task, result):
+                on_result(result)
+                unfinished -= 1
+            else:
+                server.put(task_id, _slice_payload(task, slice_seconds),
+                           expected_cost(task['target'], task['remaining'])[0])
+        server.finish()
+        time.sleep(linger)
+    finally:
+        server.shutdown()
+
+def _slice_payload(task: Dict, slice_seconds: float) -> Dict:
+    target, timeout, _, resume, budget = _slice_args(task, slice_seconds)
+    return {'target': dict(target), 'timeout': timeout, 'resume': resume, 'budget': budget}
+
+def _worker_handler(payload: Dict) -> Dict:
+    return factor_single_wrapper((payload['target'], payload['timeout'], False,
+                                  payload['resume'], payload['budget']))
+
+def run_batch_worker(address, num_workers: int = 1) -> int:
+    """
+    Worker node: lease target slices from a coordinator until the batch
+    is done, with num_workers processes on this host.
+
+    Returns:
+        Number of slices completed
+    """
+    if num_workers <= 1:
+        return run_worker(address, _worker_handler)
+    with Pool(processes=num_workers) as pool:
+        return sum(pool.starmap(run_worker, [(address, _worker_handler)] * num_workers))
+
 def run_batch_factorization(targets: List[Dict], 
                             timeout_unbiased: float = 3600,
                             timeout_biased: float = 300,
                             num_workers: int = 1,
                             checkpoint_file: Optional[Path] = None,
                             checkpoint_interval: int = 10,
-                            verbose: bool = True) -> List[Dict]:
+                            verbose: bool = True,
+                            batch_gcd: bool = True,
+                            slice_seconds: float = 600,
+                            serve=None,
+                            lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[Dict]:
     """
     Run factorization on multiple targets with parallel processing.
     
@@ -120,9 +306,17 @@ def run_batch_factorization(targets: List[Dict],
         timeout_unbiased: Timeout per unbiased target in seconds
         timeout_biased: Timeout per biased target in seconds
         num_workers: Number of parallel workers (1 = sequential)
-        checkpoint_file: Path to checkpoint file for crash recovery
-        checkpoint_interval: Save checkpoint every N targets
+        checkpoint_file: Path to the JSONL checkpoint log for crash recovery
+        checkpoint_interval: fsync the checkpoint log every N results
+            (each result is written as soon as it completes)
         verbose: Print progress
+        batch_gcd: Factor targets that share a prime with batch GCD first
+        slice_seconds: Longest uninterrupted run of one target when
+            num_workers > 1 or serving; longer targets are resumed in later slices
+        serve: (host, port) to coordinate remote workers instead of
+            factoring locally (see run_coordinator)
+        lease_seconds: Heartbeat-less time before a remote worker's slice
+            is handed to another worker
     
     Returns:
         List of result dictionaries
@@ -131,22 +325,44 @@ def run_batch_factorization(targets: List[Dict],
     completed_results = []
     completed_ids = set()
     
-    if checkpoint_file and checkpoint_file.exists():
-        completed_results = load_checkpoint(checkpoint_file)
+    log = None
+    if checkpoint_file:
+        log = CheckpointLog(checkpoint_file, fsync_every=checkpoint_interval)
+        records = log.replay()
+        completed_results = latest_per_target(records)
         completed_ids = {r['target_id'] for r in completed_results}
+        if len(records) > len(completed_results):
+            log.compact_in_background()
         if verbose and completed_results:
             print(f"Resuming from checkpoint: {len(completed_results)} targets already completed")
     
-    # Filter out already completed targets
-    remaining_targets = [t for t in targets if str(t.get('id', '')) not in completed_ids]
+    # Filter out already completed targets (by corpus index, so id-less
+    # targets, reported as their index, are told apart)
+    remaining = [i for i, t in enumerate(targets) if str(t.get('id', i)) not in completed_ids]
+    remaining_targets = [targets[i] for i in remaining]
     
     if not remaining_targets:
         if verbose:
             print("All targets already completed!")
+        if log:
+            log.close()
         return completed_results
     
     total_targets = len(targets)
     
+    # Shared-prime targets fall out of one batch GCD before per-target work
+    # (over the whole corpus, so primes shared with completed targets count)
+    results = list(completed_results)
+    if batch_gcd and len(targets) > 1:
+        shared = batch_gcd_prestage(targets, verbose=verbose)
+        new = {i: r for i, r in shared.items() if r['target_id'] not in completed_ids}
+        results.extend(new.values())
+        remaining = [i for i in remaining if i not in new]
+        remaining_targets = [targets[i] for i in remaining]
+        if log:
+            for r in new.values():
+                log.append(r)
+    
     if verbose:
         print("="*60)
         print(f"Batch Factorization: {len(remaining_targets)} targets to process")
@@ -162,38 +378,38 @@ def run_batch_factorization(targets: List[Dict],
         timeout = get_timeout_for_target(target, timeout_unbiased, timeout_biased)
         args_list.append((target, timeout, False))  # Set verbose=False for workers
     
-    # Process targets
-    results = list(completed_results)
-    
-    if num_workers > 1:
-        # Parallel processing
-        with Pool(processes=num_workers) as pool:
-            for i, result in enumerate(pool.imap(factor_single_wrapper, args_list)):
-                results.append(result)
-                
-                if verbose:
-                    completed = len(results)
-                    successes = sum(1 for r in results if r['success'])
-                    target_id = result['target_id']
-                    target_type = result['target_type']
-                    status = "✓ SUCCESS" if result['success'] else "✗ FAILED"
-                    
-                    print(f"\n[{completed}/{total_targets}] Target {target_id} ({target_type}): {status}")
-                    if result['success']:
-                        print(f"  Method: {result['method']}, Time: {result['elapsed_seconds']:.2f}s")
-                    print(f"  Progress: {successes}/{completed} successful ({successes/completed*100:.1f}%)")
+    if num_workers > 1 or serve:
+        # Parallel or distributed: shortest expected first, results as they complete
+        def on_result(result):
+            results.append(result)
+            
+            if verbose:
+                completed = len(results)
+                successes = sum(1 for r in results if r['success'])
+                target_id = result['target_id']
+                target_type = result['target_type']
+                status = "✓ SUCCESS" if result['success'] else "✗ FAILED"
                 
-                # Checkpoint periodically
-                if checkpoint_file and (len(results) % checkpoint_interval == 0):
-                    save_checkpoint(results, checkpoint_file)
-                    if verbose:
-                        print(f"  Checkpoint saved: {len(results)} targets")
+                print(f"\n[{completed}/{total_targets}] Target {target_id} ({target_type}): {status}")
+                if result['success']:
+                    print(f"  Method: {result['method']}, Time: {result['elapsed_seconds']:.2f}s")
+                print(f"  Progress: {successes}/{completed} successful ({successes/completed*100:.1f}%)")
+            
+            # Record the result the moment it completes
+            if log:
+                log.append(result)
+        
+        if serve:
+            run_coordinator(args_list, serve, slice_seconds, on_result,
+                            lease_seconds=lease_seconds, verbose=verbose)
+        else:
+            run_work_stealing(args_list, num_workers, slice_seconds, on_result)
     else:
         # Sequential processing
-        for i, (target, timeout, _) in enumerate(args_list):
+        for i, (target, timeout, _) in zip(remaining, args_list):
+            target_type = get_target_type(target)
             if verbose:
                 target_id = target.get('id', i)
-                target_type = get_target_type(target)
                 print(f"\n[{len(results)+1}/{total_targets}] Target {target_id} ({target_type})")
                 print(f"  Balance ratio: {target.get('balance_ratio', 'N/A')}")
             
@@ -202,7 +418,8 @@ def run_batch_factorization(targets: List[Dict],
             true_q = int(target['q'])
             
             start_time = time.time()
-            result = factor_single_target(N, timeout=timeout, verbose=verbose)
+            result = factor_single_target(N, timeout=timeout, verbose=verbose, target_type=target_type)
+            result.pop('resume', None)
             
             # Add metadata
             result['target_id'] = str(target.get('id', i))
@@ -234,15 +451,13 @@ def run_batch_factorization(targets: List[Dict],
                 successes = sum(1 for r in results if r['success'])
                 print(f"\n  Progress: {successes}/{len(results)} successful ({successes/len(results)*100:.1f}%)")
             
-            # Checkpoint periodically
-            if checkpoint_file and (len(results) % checkpoint_interval == 0):
-                save_checkpoint(results, checkpoint_file)
-                if verbose:
-                    print(f"  Checkpoint saved: {len(results)} targets")
+            # Record the result the moment it completes
+            if log:
+                log.append(result)
     
-    # Final checkpoint
-    if checkpoint_file:
-        save_checkpoint(results, checkpoint_file)
+    # fsync the last batch (and wait for any background compaction)
+    if log:
+        log.close()
     
     return results
 
@@ -328,7 +543,7 @@ def main():
         description='Batch factorization for 256-bit RSA targets with parallel processing'
     )
     parser.add_argument('--targets', type=str, default='targets_256bit.json',
-                       help='Input targets JSON file (default: targets_256bit.json)')
+                       help='Input targets JSON file or binary corpus (default: targets_256bit.json)')
     parser.add_argument('--output', type=str, default='factorization_results_256bit.json',
                        help='Output results JSON file (default: factorization_results_256bit.json)')
     parser.add_argument('--workers', type=int, default=1,
@@ -340,9 +555,20 @@ def main():
     parser.add_argument('--checkpoint', type=str, default=None,
                        help='Checkpoint file for crash recovery (default: auto-generated)')
     parser.add_argument('--checkpoint-interval', type=int, default=10,
-                       help='Save checkpoint every N targets (default: 10)')
+                       help='fsync the checkpoint log every N results (default: 10)')
     parser.add_argument('--max-targets', type=int, default=None,
                        help='Maximum number of targets to process (default: all)')
+    parser.add_argument('--slice-seconds', type=float, default=600,
+                       help='Time slice per target before it yields its worker (default: 600)')
+    parser.add_argument('--serve', type=str, default=None, metavar='HOST:PORT',
+                       help='Coordinate remote workers on HOST:PORT instead of factoring locally')
+    parser.add_argument('--worker', type=str, default=None, metavar='HOST:PORT',
+                       help='Run as a worker for the coordinator at HOST:PORT (uses --workers processes)')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                       help=f'Re-queue a slice after this long without a worker heartbeat '
+                            f'(default: {DEFAULT_LEASE_SECONDS})')
+    parser.add_argument('--no-batch-gcd', action='store_true',
+                       help='Skip the batch GCD pre-stage for shared-prime targets')
     parser.add_argument('--log-level', type=str, default='INFO',
                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                        help='Logging level (default: INFO)')
@@ -356,6 +582,12 @@ def main():
         print(f"Using {max_workers} workers instead")
         args.workers = max_workers
     
+    # Worker nodes get their targets from the coordinator
+    if args.worker:
+        done = run_batch_worker(parse_address(args.worker), args.workers)
+        print(f"Worker finished: {done} slices completed")
+        return 0
+    
     # Load targets
     targets_file = Path(__file__).parent / args.targets
     
@@ -376,8 +608,12 @@ def main():
     if args.checkpoint:
         checkpoint_file = Path(__file__).parent / args.checkpoint
     else:
-        # Auto-generate checkpoint filename
-        checkpoint_file = Path(__file__).parent / f"checkpoint_{Path(args.output).stem}.json"
+        # Auto-generate checkpoint filename; an old JSON checkpoint is
+        # picked up and converted to the JSONL log in place
+        checkpoint_file = Path(__file__).parent / f"checkpoint_{Path(args.output).stem}.jsonl"
+        legacy_file = checkpoint_file.with_suffix('.json')
+        if legacy_file.exists() and not checkpoint_file.exists():
+            checkpoint_file = legacy_file
     
     print(f"Checkpoint file: {checkpoint_file}")
     
@@ -389,7 +625,11 @@ def main():
         num_workers=args.workers,
         checkpoint_file=checkpoint_file,
         checkpoint_interval=args.checkpoint_interval,
-        verbose=(args.log_level in ['INFO', 'DEBUG'])
+        verbose=(args.log_level in ['INFO', 'DEBUG']),
+        batch_gcd=not args.no_batch_gcd,
+        slice_seconds=args.slice_seconds,
+        serve=parse_address(args.serve) if args.serve else None,
+        lease_seconds=args.lease_seconds
     )
     
     # Print summary
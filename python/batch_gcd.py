@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Bernstein batch GCD over a whole target corpus.
+
+Generated corpora can contain moduli that share a prime (the prime-near-
+prediction search is deterministic), and any such pair factors instantly
+with one GCD.  Checking all pairs is quadratic; the product/remainder tree
+finds every shared factor in quasi-linear time:
+
+    P           = N_1 · N_2 · ... · N_n               (product tree, bottom-up)
+    R_i         = P mod N_i²                          (remainder tree, top-down)
+    g_i         = gcd(R_i / N_i, N_i)                 (= gcd(N_i, ∏_{j≠i} N_j))
+
+Each product-tree level is written to a scratch file as it is built, so
+only one level (plus the level being produced) is ever in memory; the
+remainder tree reads the levels back from the top down.  Duplicate moduli
+are removed first so they do not mask real shared primes.
+
+Example:
+    from batch_gcd import find_shared_factors
+    for i, (p, q) in find_shared_factors(moduli).items():
+        print(i, p, q)
+
+CLI:
+    python batch_gcd.py targets_1500.json
+"""
+
+import argparse
+import struct
+import sys
+import tempfile
+from math import gcd
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import gmpy2
+    _mpz = gmpy2.mpz
+    _gcd = gmpy2.gcd
+except ImportError:
+    _mpz = int
+    _gcd = gcd
+
+_LEN = struct.Struct("<Q")
+
+
+def _write_level(path: Path, values) -> None:
+    with open(path, "wb") as f:
+        f.write(_LEN.pack(len(values)))
+        for v in values:
+            raw = int(v).to_bytes((int(v).bit_length() + 7) // 8, "little")
+            f.write(_LEN.pack(len(raw)))
+            f.write(raw)
+
+
+def _read_level(path: Path) -> List:
+    with open(path, "rb") as f:
+        (count,) = _LEN.unpack(f.read(_LEN.size))
+        values = []
+        for _ in range(count):
+            (size,) = _LEN.unpack(f.read(_LEN.size))
+            values.append(_mpz(int.from_bytes(f.read(size), "little")))
+    return values
+
+
+def product_tree(moduli: List[int], workdir: Union[str, Path]) -> List[Path]:
+    """
+    Build the product tree, spilling each level to workdir.
+
+    Returns:
+        Level files, leaves first; the last file holds the single root
+    """
+    workdir = Path(workdir)
+    level = [_mpz(n) for n in moduli]
+    paths = []
+    depth = 0
+    while True:
+        path = workdir / f"level_{depth:03d}.bin"
+        _write_level(path, level)
+        paths.append(path)
+        if len(level) == 1:
+            return paths
+        level = [level[i] * level[i + 1] if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        depth += 1
+
+
+def batch_gcd(moduli: List[int], workdir: Optional[Union[str, Path]] = None) -> List[int]:
+    """
+    gcd(N_i, ∏_{j≠i} N_j) for every modulus.
+
+    Args:
+        moduli: Distinct moduli (see find_shared_factors for deduplication)
+        workdir: Scratch directory for tree levels (default: a temp dir)
+
+    Returns:
+        One GCD per modulus, in input order (1 = no shared factor)
+    """
+    if len(moduli) < 2:
+        return [1] * len(moduli)
+    with tempfile.TemporaryDirectory(dir=workdir, prefix="batch_gcd_") as tmp:
+        paths = product_tree(moduli, tmp)
+        rems = _read_level(paths[-1])
+        for path in reversed(paths[:-1]):
+            level = _read_level(path)
+            rems = [rems[i // 2] % (level[i] * level[i]) for i in range(len(level))]
+        leaves = level
+    return [int(_gcd(r // n, n)) for r, n in zip(rems, leaves)]
+
+
+def find_shared_factors(moduli: Iterable[int],
+                        workdir: Optional[Union[str, Path]] = None) -> Dict[int, Tuple[int, int]]:
+    """
+    Targets whose modulus shares a prime with another target.
+
+    Moduli that share both primes with other targets (batch GCD returns N
+    itself) are resolved with pairwise GCDs among the affected moduli.
+    Exact duplicates are ignored: they reveal nothing about the factors.
+
+    Returns:
+        {index: (p, q)} with p <= q and p·q = N_index
+    """
+    moduli = [int(n) for n in moduli]
+    first_index: Dict[int, int] = {}
+    for i, n in enumerate(moduli):
+        first_index.setdefault(n, i)
+    unique = list(first_index)
+    gcds = batch_gcd(unique, workdir)
+
+    factors: Dict[int, int] = {}
+    whole = []
+    for n, g in zip(unique, gcds):
+        if 1 < g < n:
+            factors[n] = g
+        elif g == n:
+            whole.append(n)
+    for n in whole:
+        for m in unique:
+            g = gcd(n, m)
+            if m != n and 1 < g < n:
+                factors[n] = g
+                break
+
+    shared = {}
+    for i, n in enumerate(moduli):
+        g = factors.get(n)
+        if g:
+            shared[i] = tuple(sorted((g, n // g)))
+    return shared
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Batch GCD over a target corpus")
+    ap.add_argument("targets", help="targets JSON or .ztc corpus")
+    ap.add_argument("--workdir", default=None, help="scratch directory for tree levels")
+    args = ap.parse_args(argv)
+
+    from target_corpus import open_targets
+    _, targets = open_targets(Path(args.targets))
+    moduli = [int(t['N']) for t in targets]
+    shared = find_shared_factors(moduli, args.workdir)
+    print(f"{len(shared)} of {len(moduli)} targets share a factor")
+    for i, (p, q) in sorted(shared.items()):
+        print(f"  {targets[i].get('id', i)}: {p} × {q}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
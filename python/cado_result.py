@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Parsing of CADO-NFS factorization results.
+
+Shared by tools/import_cado_result.py (which records factors in the RSA
+challenges CSV) and async_orchestrator.watch_cado (which picks up result
+files as CADO-NFS runs finish).
+
+Example:
+    from cado_result import extract_factors
+    p, q = extract_factors("RSA-100.out", N)
+"""
+
+import csv
+import re
+
+CHALLENGES_CSV = 'src/test/resources/rsa_challenges.csv'
+
+
+def extract_factors(cado_file, N):
+    """
+    Extract p and q from CADO-NFS output.
+
+    Accepts "p = ..." / "q = ..." lines, or cado-nfs.py's final stdout
+    line listing the factors separated by spaces.  A candidate pair is
+    only reported if 1 < p < N and p * q == N, so stray numbers in a log
+    are never taken for factors.
+
+    Returns:
+        (p, q) as decimal strings, or (None, None)
+    """
+    N = int(N)
+    with open(cado_file, 'r') as f:
+        content = f.read()
+
+    def valid(p, q):
+        return 1 < int(p) < N and int(p) * int(q) == N
+
+    # Look for lines like "p = 123..." or similar
+    p_match = re.search(r'p\s*=\s*(\d+)', content)
+    q_match = re.search(r'q\s*=\s*(\d+)', content)
+    if p_match and q_match:
+        p, q = p_match.group(1), q_match.group(1)
+        if valid(p, q):
+            return p, q
+    # cado-nfs.py prints the factors on the last line: "p q"
+    for line in reversed(content.strip().splitlines()):
+        fields = line.split()
+        if len(fields) == 2 and all(x.isdigit() for x in fields):
+            p, q = fields
+            if valid(p, q):
+                return p, q
+    return None, None
+
+
+def lookup_modulus(rsa_id, csv_path=CHALLENGES_CSV):
+    """N for rsa_id from the challenges CSV, or None if it isn't listed."""
+    with open(csv_path, 'r') as f:
+        for row in csv.reader(f):
+            if row and row[0] == rsa_id:
+                return int(row[1])
+    return None
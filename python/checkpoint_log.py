@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL result log for batch runs.
+
+batch_factor used to rewrite every accumulated result as one indented JSON
+document every few targets: O(n²) I/O over a run, and anything since the
+last rewrite was lost on a crash.  CheckpointLog appends one line per
+completed result instead: one JSON object per line, newest last.
+
+Each append is written and flushed immediately; fsync is batched (every
+`fsync_every` records or `fsync_interval` seconds), so a process crash
+never loses a completed result and a power loss loses at most one batch.
+Replay reads the log front to back (there is no side index), stops at the
+first torn or partial line (a crash mid-write) and truncates it away.
+Compaction, which keeps only the newest record per target_id, runs in a
+background thread and never blocks appends for longer than copying the
+records written while it ran.
+
+Legacy checkpoints (a single JSON document with a "results" list) are
+read transparently and converted to JSONL in place on the first append or
+compaction.
+
+Example:
+    log = CheckpointLog("checkpoint.jsonl")
+    done = log.replay()
+    log.append({"target_id": "7", "success": True})
+    log.close()
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+
+def _is_legacy(path: Path) -> bool:
+    """
+    True for the old single-document {'results': [...]} checkpoint.
+
+    Those were always written with indent=2, so the first line is a lone
+    '{'; JSONL records never are.
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.readline().strip() == b"{"
+    except OSError:
+        return False
+
+
+def latest_per_target(records: List[Dict]) -> List[Dict]:
+    """Newest record for each target_id, in order of first appearance."""
+    latest = {}
+    for i, r in enumerate(records):
+        latest[str(r.get("target_id", f"#{i}"))] = r
+    return list(latest.values())
+
+
+class CheckpointLog:
+    """
+    Append-only, fsync-batched JSONL log of per-target results.
+
+    Thread-safe: appends, replay and compaction share one lock.
+    """
+
+    def __init__(self, path: Union[str, Path], fsync_every: int = 10,
+                 fsync_interval: float = 1.0):
+        self.path = Path(path)
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._records = 0
+        self._last_sync = time.time()
+        self._compactor: Optional[threading.Thread] = None
+
+    # -- reading ------------------------------------------------------------
+
+    def replay(self) -> List[Dict]:
+        """
+        All intact records, oldest first.
+
+        A partial last line left by a crash is dropped and truncated from
+        the file so later appends start on a clean line.  Legacy JSON
+        checkpoints are returned as their 'results' list.
+        """
+        with self._lock:
+            if not self.path.exists():
+                return []
+            if _is_legacy(self.path):
+                with open(self.path, "r") as f:
+                    records = json.load(f).get("results", [])
+                self._records = len(records)
+                return records
+            records = []
+            good = 0
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+                    good += len(line)
+            if good < self.path.stat().st_size:
+                self._close_file()
+                with open(self.path, "r+b") as f:
+                    f.truncate(good)
+            self._records = len(records)
+            return records
+
+    # -- writing ------------------------------------------------------------
+
+    def _open(self):
+        if self._file is None:
+            if self.path.exists() and _is_legacy(self.path):
+                self._convert_legacy()
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def _convert_legacy(self) -> None:
+        with open(self.path, "r") as f:
+            records = json.load(f).get("results", [])
+        self._rewrite(records)
+
+    def append(self, record: Dict) -> None:
+        """Write one record now; fsync when the batch is full or stale."""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            f.flush()
+            self._records += 1
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.time() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.time()
+
+    def flush(self) -> None:
+        """fsync any pending records."""
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._sync()
+
+    # -- compaction ---------------------------------------------------------
+
+    def replace(self, records: List[Dict]) -> None:
+        """Atomically replace the whole log with exactly these records."""
+        with self._lock:
+            self._close_file()
+            self._rewrite(records)
+
+    def _rewrite(self, records: List[Dict], tail: bytes = b"") -> None:
+        """Atomically replace the log with records (+ raw tail bytes)."""
+        tmp = self.path.with_name(self.path.name + ".compact")
+        with open(tmp, "wb") as f:
+            for r in records:
+                f.write((json.dumps(r, separators=(",", ":")) + "\n").encode())
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+        self._records = len(records) + tail.count(b"\n")
+
+    def compact(self) -> None:
+        """Keep only the newest record per target_id (synchronous)."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            snapshot = self.path.stat().st_size if self.path.exists() else 0
+        if not snapshot:
+            return
+        if _is_legacy(self.path):
+            with self._lock:
+                self._convert_legacy()
+            return
+        # Read and dedupe the snapshot without holding the lock
+        with open(self.path, "rb") as f:
+            data = f.read(snapshot)
+        records = []
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+        records = latest_per_target(records)
+        # Swap in, carrying over anything appended meanwhile
+        with self._lock:
+            with open(self.path, "rb") as f:
+                f.seek(snapshot)
+                tail = f.read()
+            self._close_file()
+            self._rewrite(records, tail)
+
+    def compact_in_background(self) -> threading.Thread:
+        """Start compact() on a daemon thread (one at a time)."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return self._compactor
+        self._compactor = threading.Thread(target=self.compact, daemon=True,
+                                           name="checkpoint-compact")
+        self._compactor.start()
+        return self._compactor
+
+    # -- lifecycle ----------------------------------------------------------
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            if self._pending:
+                self._sync()
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        """Wait for compaction, fsync and close."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,20 +1,50 @@
 from __future__ import annotations
+import atexit
+import functools
+import hashlib
+import os
+import queue
+import selectors
 import shutil
 import subprocess
 import shlex
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
-# Detect backend once
+# Detect backend once: gmp-ecm when the binary is on PATH, otherwise the
+# built-in pure-Python ECM (ecm_python). ECM_BACKEND=gmp-ecm|pyecm overrides.
 ECM_BIN = shutil.which("ecm")
-BACKEND = "gmp-ecm"  # Force for simulation
+BACKEND = os.environ.get("ECM_BACKEND") or ("gmp-ecm" if ECM_BIN else "pyecm")
+# Checkpointed stages are recorded every this many curves by default: an
+# interrupted stage loses at most this much work, while each chunk is still
+# one ecm process / one parallel pyecm run rather than one per curve
+CHECKPOINT_CURVES = 8
+
+def _compute_sigma_u64(N: int, B1: int) -> int:
+    """
+    Deterministic curve seed from blake2b(N||B1). Keep within uint64.
+    Shared by both backends so a (N, B1) stage runs the same curves.
+    """
+    h = hashlib.blake2b(f"{N}:{B1}".encode(), digest_size=16).digest()
+    # take lower 8 bytes as unsigned 64-bit
+    return int.from_bytes(h[-8:], "little") or 1
 
 def backend_info() -> dict:
     """
     Returns {'backend': 'gmp-ecm'|'pyecm', 'version': <str or None>}
+    The version probe spawns 'ecm --version' once per process and is cached.
     """
     if BACKEND != "gmp-ecm":
-        return {"backend": BACKEND, "version": None}
+        from ecm_python import GMPY2_AVAILABLE
+        return {"backend": BACKEND,
+                "version": "ecm_python (gmpy2)" if GMPY2_AVAILABLE else "ecm_python"}
+    return {"backend": BACKEND, "version": _ecm_version()}
+
+@functools.lru_cache(maxsize=1)
+def _ecm_version() -> Optional[str]:
     try:
         # Use 'ecm --version' to get version info
         result = subprocess.run(
@@ -28,10 +58,10 @@ def backend_info() -> dict:
         first = out.strip().splitlines()[0] if out else ""
         # Extract just the version line (e.g., "GMP-ECM 7.0.5 [configured with...]")
         if "GMP-ECM" in first:
-            return {"backend": BACKEND, "version": first}
-        return {"backend": BACKEND, "version": None}
+            return first
+        return None
     except Exception:
-        return {"backend": BACKEND, "version": None}
+        return None
 
 def _parse_factor_lines(output: str, N: int) -> Optional[int]:
     """
@@ -63,39 +93,407 @@ def run_ecm_once(
     checkpoint_dir: Optional[str | Path] = None,
     sigma: Optional[int] = None,
     allow_resume: bool = True,
+    cancel_event: Optional[threading.Event] = None,
+    checkpoint_every: Optional[int] = None,
 ) -> Optional[int]:
     """
     Returns a nontrivial factor of N or None.
     - For gmp-ecm: uses -q -one -c {curves} {B1} and, if provided,
-      -save/-resume <file> and -sigma <u64>.
-    - For pyecm fallback: attempts a single-pass trial with given B1.
+      -sigma <u64>.
+    - For pyecm fallback: runs the curves with the built-in Montgomery ECM
+      (ecm_python), seeded like gmp-ecm's -sigma.
+    - With checkpoint_dir, progress is kept in an ECMCheckpointStore keyed
+      by the full N, B1 and sigma range: curves run in chunks of
+      checkpoint_every curves (default CHECKPOINT_CURVES), each chunk is
+      recorded in the manifest, and with allow_resume a rerun skips the
+      curves already done.
+    - If cancel_event is given, the run is abandoned (process killed,
+      None returned) as soon as the event is set.
     """
+    if checkpoint_dir:
+        return _run_ecm_checkpointed(N, B1, curves, timeout_sec, checkpoint_dir, sigma,
+                                     allow_resume, cancel_event, checkpoint_every)
+    return _run_ecm_curves(N, B1, curves, timeout_sec, sigma, cancel_event)
+
+def _run_ecm_checkpointed(N, B1, curves, timeout_sec, checkpoint_dir, sigma,
+                          allow_resume, cancel_event, checkpoint_every) -> Optional[int]:
+    """Run a stage chunk by chunk, recording completed curves after each chunk."""
+    from ecm_checkpoint import ECMCheckpointStore
+    if BACKEND != "gmp-ecm" and (sigma is None or sigma <= 0):
+        # The local backend is always deterministic; key on its actual sigma range
+        sigma = _compute_sigma_u64(N, B1)
+    if sigma is not None and sigma <= 0:
+        sigma = None
+    store = ECMCheckpointStore(checkpoint_dir)
+    if not allow_resume:
+        store.reset(N, B1, sigma, curves)
+    entry = store.progress(N, B1, sigma, curves)
+    if entry["factor"]:
+        return int(entry["factor"])
+    done = entry["curves_done"]
+    deadline = time.time() + timeout_sec
+    if checkpoint_every is None:
+        checkpoint_every = CHECKPOINT_CURVES
+    chunk = max(1, checkpoint_every)
+    while done < curves:
+        remaining = deadline - time.time()
+        if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+            return None
+        count = min(chunk, curves - done)
+        chunk_sigma = None if sigma is None else sigma + done
+        factor = _run_ecm_curves(N, B1, count, remaining, chunk_sigma, cancel_event)
+        if factor is None and (time.time() >= deadline or
+                               (cancel_event is not None and cancel_event.is_set())):
+            return None  # chunk was cut short; do not count it
+        done += count
+        store.record(N, B1, sigma, curves, done, factor)
+        if factor:
+            return factor
+    return None
+
+def _run_ecm_curves(N, B1, curves, timeout_sec, sigma, cancel_event) -> Optional[int]:
+    """Run `curves` curves in one go on the active backend."""
     if BACKEND == "gmp-ecm":
         # Build command
         cmd = ["ecm", "-q", "-one", "-c", str(curves)]
         # Optional deterministic seeding
         if sigma is not None and sigma > 0:
             cmd += ["-sigma", str(sigma)]
-        # Optional checkpointing
-        ckfile = None
-        if checkpoint_dir:
-            Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
-            ckfile = Path(checkpoint_dir) / f"ecm_ck_B1{B1}_{str(N)[:16]}.sav"
-            cmd += ["-save", str(ckfile)]
-            if allow_resume and ckfile.exists():
-                cmd += ["-resume", str(ckfile)]
         cmd += [str(B1)]
         # Launch
         p = subprocess.Popen(
             cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
         )
-        try:
-            out, _ = p.communicate(input=str(N) + "\n", timeout=timeout_sec)
-        except subprocess.TimeoutExpired:
-            p.kill()
-            return None
-        return _parse_factor_lines(out, N)
+        if cancel_event is None:
+            try:
+                out, _ = p.communicate(input=str(N) + "\n", timeout=timeout_sec)
+            except subprocess.TimeoutExpired:
+                p.kill()
+                p.communicate()
+                return None
+            return _parse_factor_lines(out, N)
+        # Cancellable: wait in short slices so a sibling's hit stops us quickly
+        deadline = time.time() + timeout_sec
+        stdin_data = str(N) + "\n"
+        while True:
+            try:
+                out, _ = p.communicate(input=stdin_data, timeout=0.25)
+                return _parse_factor_lines(out, N)
+            except subprocess.TimeoutExpired:
+                stdin_data = None  # input is only sent on the first call
+                if cancel_event.is_set() or time.time() >= deadline:
+                    p.kill()
+                    p.communicate()
+                    return None
     else:
         # pyecm fallback – slower; only for dev boxes without gmp-ecm
-        # For now, return None as pyecm API differs
-        return None
\ No newline at end of file
+        from ecm_python import ecm_factor
+        if sigma is None or sigma <= 0:
+            sigma = _compute_sigma_u64(N, B1)
+        return ecm_factor(N, B1, curves, sigma=sigma, timeout_sec=timeout_sec,
+                          cancel_event=cancel_event)
+
+
+class ECMJob:
+    """One (N, B1, curves, sigma) request queued on an ECMWorkerPool."""
+
+    __slots__ = ("key", "N", "B1", "curves", "sigma", "timeout_sec", "future")
+
+    def __init__(self, key, N: int, B1: int, curves: int,
+                 sigma: Optional[int], timeout_sec: Optional[float]):
+        self.key = key
+        self.N = N
+        self.B1 = B1
+        self.curves = curves
+        self.sigma = sigma
+        self.timeout_sec = timeout_sec
+        self.future: Future = Future()
+
+    @property
+    def config(self) -> Tuple[int, int, Optional[int]]:
+        """Command-line parameters; jobs with equal config share a process."""
+        return (self.B1, self.curves, self.sigma)
+
+
+class _ECMProcess:
+    """
+    A long-lived 'ecm -q -one -c curves B1' process.
+
+    In quiet mode gmp-ecm reads one number per stdin line and answers with
+    exactly one stdout line (the factors found, or the input copied back),
+    so the process can be fed any number of N with the same parameters.
+    """
+
+    def __init__(self, ecm_bin: str, B1: int, curves: int, sigma: Optional[int]):
+        self.config = (B1, curves, sigma)
+        cmd = [ecm_bin, "-q", "-one", "-c", str(curves)]
+        if sigma is not None and sigma > 0:
+            cmd += ["-sigma", str(sigma)]
+        cmd += [str(B1)]
+        self.proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, bufsize=0
+        )
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.proc.stdout, selectors.EVENT_READ)
+        self._buffer = b""
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def send(self, N: int) -> None:
+        self.proc.stdin.write(f"{N}\n".encode())
+        self.proc.stdin.flush()
+
+    def read_line(self, deadline: Optional[float]) -> Optional[str]:
+        """Next stdout line, or None on EOF / deadline."""
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self._buffer:
+            wait = None if deadline is None else deadline - time.time()
+            if wait is not None and wait <= 0:
+                return None
+            if not self._selector.select(wait):
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line.decode(errors="replace")
+
+    def kill(self) -> None:
+        if self.alive():
+            self.proc.kill()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        self._selector.close()
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+class ECMWorkerPool:
+    """
+    Pool of persistent gmp-ecm processes fed from a shared job queue.
+
+    Each worker thread owns one ecm process and keeps it alive for as long
+    as consecutive jobs use the same (B1, curves, sigma); a process is only
+    restarted when the parameters change, the process dies, or its job is
+    cancelled.  Results are delivered through futures as soon as each
+    process answers.  When a job finds a factor, every other queued or
+    running job with the same key (by default, N) is cancelled and its
+    process killed.
+
+    Example:
+        with ECMWorkerPool(num_workers=8) as pool:
+            futures = [pool.submit(N, 11_000_000, 20) for N in targets]
+            factors = [f.result() for f in futures]
+    """
+
+    def __init__(self, num_workers: Optional[int] = None, ecm_bin: Optional[str] = None):
+        self.ecm_bin = ecm_bin or ECM_BIN or "ecm"
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self._jobs: "queue.Queue[Optional[ECMJob]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending: Dict[object, List[ECMJob]] = {}
+        self._running: Dict[int, Tuple[ECMJob, _ECMProcess]] = {}
+        self._cancelled_keys = set()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, args=(i,), daemon=True,
+                             name=f"ecm-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # -- public API --------------------------------------------------------
+
+    def submit(self, N: int, B1: int, curves: int, sigma: Optional[int] = None,
+               timeout_sec: Optional[float] = None, key=None) -> Future:
+        """
+        Queue one ECM job.
+
+        Returns a Future resolving to a nontrivial factor of N or None
+        (no factor, timeout, or cancelled because a sibling job succeeded).
+        """
+        if self._closed:
+            raise RuntimeError("ECMWorkerPool is shut down")
+        job = ECMJob(N if key is None else key, N, B1, curves, sigma, timeout_sec)
+        with self._lock:
+            self._cancelled_keys.discard(job.key)
+            self._pending.setdefault(job.key, []).append(job)
+        self._jobs.put(job)
+        return job.future
+
+    def cancel_target(self, key) -> None:
+        """Drop queued jobs for key and kill the processes running its jobs."""
+        with self._lock:
+            self._cancelled_keys.add(key)
+            for job in self._pending.pop(key, []):
+                job.future.cancel()
+            running = [proc for job, proc in self._running.values() if job.key == key]
+            self._retire(key)
+        for proc in running:
+            proc.kill()
+
+    def factor_batch(self, numbers: Iterable[int], schedule: Iterable[Tuple[int, int]],
+                     timeout_sec: Optional[float] = None) -> Dict[int, Optional[int]]:
+        """
+        Run an ECM schedule over many numbers.
+
+        Stages run in order; within a stage every still-unfactored number is
+        queued at once, so all workers share one B1 and keep their processes
+        alive across targets.
+
+        Args:
+            numbers: Numbers to factor
+            schedule: (B1, curves) pairs, smallest B1 first
+            timeout_sec: Per-job timeout
+
+        Returns:
+            {N: factor or None}
+        """
+        results: Dict[int, Optional[int]] = {N: None for N in numbers}
+        for B1, curves in schedule:
+            todo = [N for N, f in results.items() if f is None]
+            if not todo:
+                break
+            futures = {N: self.submit(N, B1, curves, timeout_sec=timeout_sec) for N in todo}
+            for N, fut in futures.items():
+                try:
+                    results[N] = fut.result()
+                except Exception:
+                    results[N] = None
+        return results
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers and kill every ecm process."""
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            for jobs in self._pending.values():
+                for job in jobs:
+                    job.future.cancel()
+            self._pending.clear()
+            running = [proc for _, proc in self._running.values()]
+        for proc in running:
+            proc.kill()
+        for _ in self._threads:
+            self._jobs.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    # -- worker side -------------------------------------------------------
+
+    def _retire(self, key) -> None:
+        """Forget a cancelled key once none of its jobs is pending or running (lock held)."""
+        if key in self._cancelled_keys and key not in self._pending and \
+                not any(job.key == key for job, _ in self._running.values()):
+            self._cancelled_keys.discard(key)
+
+    def _take(self, job: ECMJob) -> bool:
+        """Move a job from pending to running; False if it was cancelled."""
+        with self._lock:
+            jobs = self._pending.get(job.key, [])
+            if job in jobs:
+                jobs.remove(job)
+                if not jobs:
+                    self._pending.pop(job.key, None)
+            # Jobs dropped by cancel_target already have cancelled futures, so
+            # the key set only has to cover jobs taken while it is running
+            if job.future.cancelled() or job.key in self._cancelled_keys:
+                job.future.cancel()
+                self._retire(job.key)
+                return False
+        return job.future.set_running_or_notify_cancel()
+
+    def _worker(self, index: int) -> None:
+        proc: Optional[_ECMProcess] = None
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            if not self._take(job):
+                continue
+            try:
+                if proc is None or not proc.alive() or proc.config != job.config:
+                    if proc is not None:
+                        proc.kill()
+                    proc = _ECMProcess(self.ecm_bin, job.B1, job.curves, job.sigma)
+                with self._lock:
+                    self._running[index] = (job, proc)
+                    cancelled = job.key in self._cancelled_keys
+                factor = None
+                if not cancelled:
+                    deadline = time.time() + job.timeout_sec if job.timeout_sec else None
+                    proc.send(job.N)
+                    line = proc.read_line(deadline)
+                    if line is None:
+                        # Timed out or killed mid-job: the process state is unknown
+                        proc.kill()
+                        proc = None
+                    else:
+                        factor = _parse_factor_lines(line, job.N)
+            except Exception as exc:
+                if proc is not None:
+                    proc.kill()
+                    proc = None
+                with self._lock:
+                    self._running.pop(index, None)
+                    cancelled = job.key in self._cancelled_keys
+                    self._retire(job.key)
+                # A pipe error after cancel_target() killed our process is expected
+                if cancelled:
+                    job.future.set_result(None)
+                else:
+                    job.future.set_exception(exc)
+                continue
+            with self._lock:
+                self._running.pop(index, None)
+                self._retire(job.key)
+            job.future.set_result(factor)
+            if factor is not None:
+                self.cancel_target(job.key)
+        if proc is not None:
+            proc.kill()
+
+
+_shared_pool: Optional[ECMWorkerPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_worker_pool(num_workers: int) -> ECMWorkerPool:
+    """
+    Process-wide ECMWorkerPool with at least num_workers workers.
+
+    Created on first use and kept, so ecm processes survive across stages
+    and targets that use the same (B1, curves); shut down at exit.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        pool = _shared_pool
+        if pool is None or pool.num_workers < num_workers:
+            _shared_pool = ECMWorkerPool(num_workers=num_workers)
+            if pool is not None:
+                pool.shutdown(wait=False)
+        return _shared_pool
+
+
+@atexit.register
+def _shutdown_shared_pool() -> None:
+    with _shared_pool_lock:
+        if _shared_pool is not None:
+            _shared_pool.shutdown(wait=False)
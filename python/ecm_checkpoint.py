@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Resumable ECM stage state.
+
+Checkpoints used to be named ecm_ck_B1{B1}_{str(N)[:16]}.sav, so distinct
+targets sharing a 16-digit prefix collided.  This store keys everything by a
+hash of the full N, and each stage by (N, B1, first sigma, curves):
+
+    <root>/<blake2b(N)>/manifest.json       curves completed per stage
+
+A stage runs in chunks of a few curves (ecm_backend.CHECKPOINT_CURVES by
+default) and the manifest is updated after each chunk, so an interrupted run
+loses at most one chunk and resumes at the next unfinished curve instead of
+repeating the whole stage.  For deterministic sigma ranges,
+chunk k of a stage uses sigma_lo + curves_done, so resumed curves are
+exactly the ones that had not run yet.
+
+Example:
+    store = ECMCheckpointStore("ckpts")
+    progress = store.progress(N, 11_000_000, sigma, 20)
+    print(progress["curves_done"], "of", progress["curves_total"])
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def target_hash(N: int) -> str:
+    """Hex digest identifying N (full value, not a prefix)."""
+    return hashlib.blake2b(str(N).encode(), digest_size=16).hexdigest()
+
+
+def stage_key(N: int, B1: int, sigma: Optional[int], curves: int) -> str:
+    """
+    Key for one ECM stage: N, B1 and the sigma range [sigma, sigma + curves).
+
+    Stages with random curves (sigma None) are keyed as 'random'.
+    """
+    sigma_part = "random" if sigma is None else str(sigma)
+    raw = f"{N}:{B1}:{sigma_part}:{curves}"
+    return f"B1_{B1}_" + hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+class ECMCheckpointStore:
+    """
+    Per-target ECM progress manifests.
+
+    Safe for concurrent use from threads of one process (e.g. the parallel
+    curve slices in run_distance_break); manifest writes are atomic renames.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def target_dir(self, N: int) -> Path:
+        path = self.root / target_hash(N)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    # -- manifest ----------------------------------------------------------
+
+    def _manifest_path(self, N: int) -> Path:
+        return self.target_dir(N) / MANIFEST_NAME
+
+    def manifest(self, N: int) -> Dict:
+        """Full manifest for N (empty skeleton if none exists yet)."""
+        path = self._manifest_path(N)
+        if path.exists():
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                pass  # a torn write never replaces the file, but be forgiving
+        return {
+            "version": MANIFEST_VERSION,
+            "N_hash": target_hash(N),
+            "N_head": str(N)[:24],
+            "N_bits": N.bit_length(),
+            "stages": {},
+        }
+
+    def _write_manifest(self, N: int, manifest: Dict) -> None:
+        path = self._manifest_path(N)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        tmp.replace(path)
+
+    def progress(self, N: int, B1: int, sigma: Optional[int], curves: int) -> Dict:
+        """Stage entry: curves_total, curves_done, factor (str or None)."""
+        key = stage_key(N, B1, sigma, curves)
+        entry = self.manifest(N)["stages"].get(key)
+        if entry is None:
+            entry = {
+                "B1": B1,
+                "sigma_lo": sigma,
+                "sigma_hi": None if sigma is None else sigma + curves - 1,
+                "curves_total": curves,
+                "curves_done": 0,
+                "factor": None,
+            }
+        return entry
+
+    def record(self, N: int, B1: int, sigma: Optional[int], curves: int,
+               curves_done: int, factor: Optional[int] = None) -> Dict:
+        """Update a stage's progress; returns the stored entry."""
+        key = stage_key(N, B1, sigma, curves)
+        with self._lock:
+            manifest = self.manifest(N)
+            entry = manifest["stages"].get(key) or self.progress(N, B1, sigma, curves)
+            entry["curves_done"] = min(curves, curves_done)
+            if factor is not None:
+                entry["factor"] = str(factor)
+            entry["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            manifest["stages"][key] = entry
+            self._write_manifest(N, manifest)
+        return entry
+
+    def reset(self, N: int, B1: int, sigma: Optional[int], curves: int) -> None:
+        """Forget a stage's progress (used when resume is disabled)."""
+        key = stage_key(N, B1, sigma, curves)
+        with self._lock:
+            manifest = self.manifest(N)
+            if manifest["stages"].pop(key, None) is not None:
+                self._write_manifest(N, manifest)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Pure-Python ECM backend (gmpy2-accelerated when available).
+
+Local fallback for hosts without the GMP-ECM binary, so the ECM schedules
+in run_distance_break / factor_256bit run anywhere.  It is much slower than
+GMP-ECM but uses the same conventions:
+
+- Montgomery curves By² = x³ + Ax² + x in XZ coordinates
+- Suyama parameterization from sigma; curve i of a run uses sigma + i,
+  starting from the same blake2b(N||B1) seed as the gmp-ecm path
+- Stage 1: one Montgomery ladder over the product of all prime powers ≤ B1
+  (prime_powers.prime_power_exponent, shared with P−1/P+1)
+- Stage 2: baby-step/giant-step over (B1, B2] with a single GCD at the end
+- Curves run in a shared process pool; the first factor found (or the
+  caller's cancel_event) stops the chunks that are already running
+
+Example:
+    from ecm_python import ecm_factor
+    f = ecm_factor(N, B1=50_000, curves=40, workers=4)
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import gcd
+from typing import List, Optional, Tuple
+
+from prime_powers import prime_power_exponent, small_primes
+
+try:
+    import gmpy2
+    GMPY2_AVAILABLE = True
+    _mpz = gmpy2.mpz
+    _gcd = gmpy2.gcd
+except ImportError:
+    GMPY2_AVAILABLE = False
+    _mpz = int
+    _gcd = gcd
+
+# Stage-2 giant-step width; 2310 = 2·3·5·7·11 keeps the baby-step table small
+STAGE2_D = 2310
+DEFAULT_B2_FACTOR = 100
+# How many ladder steps between deadline checks
+_DEADLINE_CHECK_INTERVAL = 4096
+# Concurrent parallel ecm_factor calls that can each have their own stop flag
+_CANCEL_SLOTS = 64
+# Seconds between cancel_event polls while waiting on pool workers
+_CANCEL_POLL_INTERVAL = 0.1
+
+# One process pool per process, grown on demand and shared by every call.
+# Each parallel call owns a slot in a shared byte array; setting it stops
+# that call's running chunks at their next deadline check.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+_cancel_flags = None
+_free_slots = list(range(_CANCEL_SLOTS))
+_active_slot = -1  # in a pool worker: slot of the chunk being run
+
+
+class _Found(Exception):
+    """Raised inside curve arithmetic when a modular inverse exposes a factor."""
+
+    def __init__(self, factor):
+        super().__init__(factor)
+        self.factor = factor
+
+
+def primes_up_to(n: int) -> List[int]:
+    """All primes ≤ n."""
+    return small_primes(n).tolist()
+
+
+def stage1_exponent(B1: int) -> int:
+    """
+    Product of the largest power of each prime ≤ B1 that does not exceed B1.
+
+    Shared with P−1/P+1 through prime_powers, which computes it once per B1
+    and memory-maps it from the on-disk cache in later processes.
+    """
+    return prime_power_exponent(B1)
+
+
+def _expired(deadline: Optional[float]) -> bool:
+    """Deadline passed, or (in a pool worker) the owning call was stopped."""
+    if deadline is not None and time.time() >= deadline:
+        return True
+    return _active_slot >= 0 and bool(_cancel_flags[_active_slot])
+
+
+# -- Montgomery curve arithmetic --------------------------------------------
+
+def _xdbl(X, Z, a24, N):
+    s = X + Z
+    d = X - Z
+    ss = s * s % N
+    dd = d * d % N
+    t = ss - dd
+    return ss * dd % N, t * (dd + a24 * t) % N
+
+
+def _xadd(XP, ZP, XQ, ZQ, Xd, Zd, N):
+    """P + Q given P - Q = (Xd : Zd)."""
+    u = (XP - ZP) * (XQ + ZQ)
+    v = (XP + ZP) * (XQ - ZQ)
+    s = u + v
+    t = u - v
+    return Zd * s * s % N, Xd * t * t % N
+
+
+def _ladder(k: int, X, Z, a24, N, deadline: Optional[float] = None):
+    """k·(X : Z) with the Montgomery ladder."""
+    if k == 0:
+        return _mpz(0), _mpz(0)
+    if k == 1:
+        return X, Z
+    X0, Z0 = X, Z
+    X1, Z1 = _xdbl(X, Z, a24, N)
+    for i, bit in enumerate(bin(k)[3:]):
+        if bit == "1":
+            X0, Z0 = _xadd(X1, Z1, X0, Z0, X, Z, N)
+            X1, Z1 = _xdbl(X1, Z1, a24, N)
+        else:
+            X1, Z1 = _xadd(X1, Z1, X0, Z0, X, Z, N)
+            X0, Z0 = _xdbl(X0, Z0, a24, N)
+        if i % _DEADLINE_CHECK_INTERVAL == 0 and _expired(deadline):
+            raise TimeoutError
+    return X0, Z0
+
+
+def suyama_curve(sigma: int, N: int):
+    """
+    Suyama parameterization: returns (X0, Z0, a24) with a24 = (A + 2) / 4.
+
+    Raises _Found if the modular inverse reveals a factor of N, and
+    ValueError for degenerate sigma.
+    """
+    N = _mpz(N)
+    sigma = _mpz(sigma) % N
+    u = (sigma * sigma - 5) % N
+    v = 4 * sigma % N
+    if u == 0 or v == 0:
+        raise ValueError("degenerate sigma")
+    X0 = pow(u, 3, N)
+    Z0 = pow(v, 3, N)
+    num = pow(v - u, 3, N) * (3 * u + v) % N
+    den = 16 * X0 * v % N
+    g = _gcd(den, N)
+    if g != 1:
+        if g == N:
+            raise ValueError("degenerate sigma")
+        raise _Found(int(g))
+    a24 = num * pow(den, -1, N) % N
+    return X0, Z0, a24
+
+
+def _stage2(X, Z, a24, N, B1: int, B2: int, deadline: Optional[float]):
+    """
+    Baby-step/giant-step stage 2.
+
+    Every prime q in (B1, B2] can be written q = m·D ± j with gcd(j, D) = 1
+    and j < D/2.  If the curve order divides E·q, then m·D·Q = ±j·Q, which
+    makes X_m·Z_j − X_j·Z_m vanish mod p; those differences are multiplied
+    together and checked with one GCD.  All coprime j are accumulated, not
+    just the ones giving primes, which keeps the loop branch-free.
+    """
+    D = STAGE2_D if B2 - B1 > 10 * STAGE2_D else 210
+    # Baby steps: odd j < D/2 coprime to D
+    js = [j for j in range(1, D // 2, 2) if gcd(j, D) == 1]
+    X2, Z2 = _xdbl(X, Z, a24, N)
+    baby = {1: (X, Z)}
+    prev, cur = (X, Z), _xadd(X2, Z2, X, Z, X, Z, N)  # 1Q, 3Q
+    for j in range(3, D // 2, 2):
+        if gcd(j, D) == 1:
+            baby[j] = cur
+        nxt = _xadd(cur[0], cur[1], X2, Z2, prev[0], prev[1], N)
+        prev, cur = cur, nxt
+
+    # Giant steps: m·D·Q for m covering (B1, B2]
+    XD, ZD = _ladder(D, X, Z, a24, N)
+    m_start = max(1, B1 // D)
+    m_end = B2 // D + 1
+    R = _ladder(m_start * D, X, Z, a24, N)
+    Rnext = _ladder((m_start + 1) * D, X, Z, a24, N)
+
+    acc = _mpz(1)
+    for m in range(m_start, m_end + 1):
+        XR, ZR = R
+        for j in js:
+            Xj, Zj = baby[j]
+            acc = acc * (XR * Zj - Xj * ZR) % N
+        R, Rnext = Rnext, _xadd(Rnext[0], Rnext[1], XD, ZD, R[0], R[1], N)
+        if m % 64 == 0 and _expired(deadline):
+            raise TimeoutError
+    return _gcd(acc, N)
+
+
+def ecm_one_curve(N: int, B1: int, B2: int, sigma: int,
+                  deadline: Optional[float] = None) -> Optional[int]:
+    """
+    Run a single ECM curve.
+
+    Returns:
+        A nontrivial factor of N, or None
+    """
+    N = _mpz(N)
+    try:
+        X, Z, a24 = suyama_curve(sigma, N)
+    except _Found as found:
+        return found.factor
+    except ValueError:
+        return None
+
+    X, Z = _ladder(stage1_exponent(B1), X, Z, a24, N, deadline)
+    g = _gcd(Z, N)
+    if 1 < g < N:
+        return int(g)
+    if g == N or B2 <= B1:
+        return None
+
+    g = _stage2(X, Z, a24, N, B1, B2, deadline)
+    if 1 < g < N:
+        return int(g)
+    return None
+
+
+def _run_curves(N: int, B1: int, B2: int, sigmas: List[int],
+                deadline: Optional[float]) -> Tuple[Optional[int], int]:
+    """Run curves sequentially; returns (factor or None, curves completed)."""
+    done = 0
+    for sigma in sigmas:
+        if _expired(deadline):
+            break
+        try:
+            factor = ecm_one_curve(N, B1, B2, sigma, deadline)
+        except TimeoutError:
+            break
+        done += 1
+        if factor:
+            return factor, done
+    return None, done
+
+
+def _run_curves_in_slot(slot: int, N: int, B1: int, B2: int, sigmas: List[int],
+                        deadline: Optional[float]) -> Tuple[Optional[int], int]:
+    """Pool-worker entry point: _run_curves, stoppable through cancel slot `slot`."""
+    global _active_slot
+    _active_slot = slot
+    try:
+        return _run_curves(N, B1, B2, sigmas, deadline)
+    finally:
+        _active_slot = -1
+
+
+def _init_worker(flags) -> None:
+    global _cancel_flags
+    _cancel_flags = flags
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared pool, (re)created with at least `workers` processes."""
+    global _pool, _pool_size, _cancel_flags
+    with _pool_lock:
+        if _pool is None or _pool_size < workers:
+            if _cancel_flags is None:
+                _cancel_flags = multiprocessing.Array("b", _CANCEL_SLOTS, lock=False)
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        initargs=(_cancel_flags,))
+            _pool_size = workers
+        return _pool
+
+
+def _acquire_slot() -> Optional[int]:
+    with _pool_lock:
+        if not _free_slots:
+            return None
+        slot = _free_slots.pop()
+    _cancel_flags[slot] = 0
+    return slot
+
+
+def _release_slot(slot: int) -> None:
+    with _pool_lock:
+        _free_slots.append(slot)
+
+
+@atexit.register
+def shutdown_pool() -> None:
+    """Stop the shared worker processes (also run at interpreter exit)."""
+    global _pool, _pool_size
+    with _pool_lock:
+        pool, _pool, _pool_size = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _chunks(seq: List[int], size: int) -> List[List[int]]:
+    return [seq[i:i + size] for i in range(0, len(seq), size)]
+
+
+def ecm_factor(N: int, B1: int, curves: int, sigma: Optional[int] = None,
+               B2: Optional[int] = None, timeout_sec: Optional[float] = None,
+               workers: Optional[int] = None, cancel_event=None) -> Optional[int]:
+    """
+    Look for a factor of N with `curves` ECM curves.
+
+    Args:
+        N: Number to factor
+        B1: Stage-1 bound
+        curves: Number of curves; curve i uses sigma + i
+        sigma: First sigma (default: the deterministic blake2b(N||B1) seed)
+        B2: Stage-2 bound (default: 100·B1; ≤ B1 disables stage 2)
+        timeout_sec: Wall-clock budget
+        workers: Processes to spread curves over.  Default: CPU count when
+            called from the main thread, 1 from any other thread (callers
+            that already run stages concurrently, like run_stage_parallel,
+            would otherwise multiply the process count).  Forced to 1
+            inside daemonic pool workers, which cannot fork.
+        cancel_event: Optional threading.Event; setting it stops the run,
+            including curves already running in worker processes
+
+    Returns:
+        A nontrivial factor of N, or None
+    """
+    if N % 2 == 0:
+        return 2
+    if sigma is None:
+        from ecm_backend import _compute_sigma_u64
+        sigma = _compute_sigma_u64(N, B1)
+    if B2 is None:
+        B2 = DEFAULT_B2_FACTOR * B1
+    deadline = time.time() + timeout_sec if timeout_sec else None
+    sigmas = [sigma + i for i in range(curves)]
+
+    if workers is None:
+        nested = threading.current_thread() is not threading.main_thread()
+        workers = 1 if nested else (os.cpu_count() or 1)
+    if multiprocessing.current_process().daemon:
+        workers = 1
+    workers = max(1, min(workers, curves))
+
+    slot = None
+    if workers > 1:
+        # Warm the stage-1 exponent once so forked workers inherit it
+        stage1_exponent(B1)
+        pool = _get_pool(workers)
+        slot = _acquire_slot()
+
+    if slot is None:
+        for sigma_i in sigmas:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            factor, done = _run_curves(N, B1, B2, [sigma_i], deadline)
+            if factor or not done:
+                return factor
+        return None
+
+    chunk = max(1, curves // (workers * 4))
+    futures = [pool.submit(_run_curves_in_slot, slot, N, B1, B2, part, deadline)
+               for part in _chunks(sigmas, chunk)]
+    try:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=_CANCEL_POLL_INTERVAL,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                factor, _ = future.result()
+                if factor:
+                    return factor
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+        return None
+    finally:
+        # Stop running chunks at their next check, drop queued ones, and
+        # wait (briefly) so no CPU is burnt after we return
+        _cancel_flags[slot] = 1
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        _release_slot(slot)
@@ -1,8 +1,19 @@
-import os, time
+import copy, os, time
+import multiprocessing
 from pathlib import Path
-import hashlib
-from ecm_backend import run_ecm_once, backend_info
-from math import gcd, ceil, sqrt
+from ecm_backend import run_ecm_once, backend_info, _compute_sigma_u64, CHECKPOINT_CURVES
+from prime_powers import pm1, williams_pp1
+from functools import lru_cache
+from math import gcd, isqrt, log, prod, sqrt
+import numpy as np
+
+try:
+    import gmpy2
+    _mpz = gmpy2.mpz
+    _is_square = gmpy2.is_square
+except ImportError:
+    _mpz = int
+    _is_square = None
 
 def is_probable_prime(n, k=12) -> bool:
     if n < 2: return False
@@ -28,14 +39,6 @@ def is_probable_prime(n, k=12) -> bool:
             return False
     return True
 
-def _compute_sigma_u64(N: int, B1: int) -> int:
-    """
-    Deterministic curve seed from blake2b(N||B1). Keep within uint64.
-    """
-    h = hashlib.blake2b(f"{N}:{B1}".encode(), digest_size=16).digest()
-    # take lower 8 bytes as unsigned 64-bit
-    return int.from_bytes(h[-8:], "little") or 1
-
 ECM_SCHEDULE = [
     # (target_digits, B1, curves)
     (35,   1_000_000,   1800),
@@ -50,71 +53,603 @@ def factor_256bit(
     checkpoint_dir: str | None = None,
     use_sigma: bool = False,
 ):
-    # ... existing code ...
-    pass  # Keep existing
+    """
+    Cheap probes (trial division, Fermat, P−1), then the ECM_SCHEDULE
+    stages with a fixed timeout per stage.
+
+    Returns:
+        (p, q) with p <= q, or (None, None)
+    """
+    factor = trial_division(N) or try_fermat(
+        N, max_iterations=FERMAT_PIPELINE_ITERATIONS,
+        deadline=time.time() + min(PROBE_MAX_SECONDS, per_stage_timeout_sec))
+    if not factor:
+        factor = try_pm1(N, deadline=time.time() + min(PROBE_MAX_SECONDS, per_stage_timeout_sec))
+    if not factor:
+        for _digits, B1, curves in ECM_SCHEDULE:
+            sigma = _compute_sigma_u64(N, B1) if use_sigma else None
+            factor = run_ecm_once(N, B1, curves, per_stage_timeout_sec,
+                                  checkpoint_dir=checkpoint_dir, sigma=sigma)
+            if factor and 1 < factor < N:
+                break
+    if factor and 1 < factor < N:
+        p, q = sorted((int(factor), int(N // factor)))
+        return p, q
+    return None, None
 
 def verify_factors(N, p, q):
     return p * q == N and is_probable_prime(p) and is_probable_prime(q)
 
-def pollard_rho(N, max_iterations=10000):
+# Polynomial constants tried by try_pollard_rho (x² + c); c = 0, -2 are degenerate
+RHO_CONSTANTS = (1, 3, 5, 7, 11, 13, 17, 19)
+RHO_BATCH_SIZE = 512
+RHO_PIPELINE_ITERATIONS = 1_000_000
+
+def pollard_rho(N, max_iterations=10000, c=1, x0=2, batch_size=RHO_BATCH_SIZE, deadline=None,
+                state=None):
+    """
+    Brent's variant of Pollard rho with batched GCDs.
+
+    Products of |x - y| mod N are accumulated over blocks of batch_size
+    steps and checked with a single GCD per block.  If a block collapses
+    to N (both factors caught at once), the block is replayed one step at
+    a time to recover the factor.
+
+    Args:
+        N: Number to factor
+        max_iterations: Budget of polynomial evaluations
+        c: Constant of the iteration x -> x² + c
+        x0: Starting value
+        batch_size: Steps per GCD
+        deadline: Optional time.time() value to stop at (checked every batch)
+        state: Optional dict holding the walk's position (x, y, r, k, phase,
+            q); a call continues from it and stores where it stopped, so
+            consecutive calls never repeat steps
+
+    Returns:
+        A nontrivial factor of N, or None
+    """
     if N % 2 == 0:
         return 2
-    def f(x):
-        return (x*x + 1) % N
-    x = 2
-    y = 2
-    d = 1
-    for i in range(max_iterations):
-        x = f(x)
-        y = f(f(y))
-        d = gcd(abs(x - y), N)
-        if d > 1:
-            return d
+    if N < 4:
+        return None
+    n = _mpz(N)
+    c = _mpz(c)
+    state = {} if state is None else state
+    y = _mpz(state.get('y', x0)) % n
+    x = _mpz(state.get('x', y))
+    r = state.get('r', 1)
+    k = state.get('k', 0)
+    phase = state.get('phase', 0)  # 0: advancing y by r, 1: comparing against x
+    q = _mpz(state.get('q', 1))
+    ys = y
+    g = 1
+    iterations = 0
+    expired = False
+    while g == 1 and iterations < max_iterations:
+        if phase == 0:
+            if k == 0:
+                x = y
+            # Advance y in batch-sized chunks so the deadline is seen within
+            # one batch even when r has grown large
+            while k < r:
+                steps = min(batch_size, r - k)
+                for _ in range(steps):
+                    y = (y * y + c) % n
+                k += steps
+                iterations += steps
+                if deadline is not None and time.time() >= deadline:
+                    expired = True
+                    break
+            if expired:
+                break
+            phase, k = 1, 0
+        while k < r and g == 1:
+            ys = y
+            steps = min(batch_size, r - k)
+            for _ in range(steps):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+            g = gcd(q, n)
+            k += steps
+            iterations += steps
+            if deadline is not None and time.time() >= deadline:
+                expired = True
+                break
+        if g != 1 or expired:
+            break
+        r *= 2
+        phase, k = 0, 0
+    if g == n:
+        # Backtrack through the last block one step at a time
+        g = 1
+        for _ in range(batch_size):
+            ys = (ys * ys + c) % n
+            g = gcd(abs(x - ys), n)
+            if g > 1:
+                break
+    if 1 < g < n:
+        return int(g)
+    state.update(x=int(x), y=int(y), r=r, k=k, phase=phase, q=int(q))
     return None
 
-def fermat_factorization(N, max_iterations=100):
+def _rho_worker(args):
+    N, max_iterations, c, deadline = args
+    return c, pollard_rho(N, max_iterations=max_iterations, c=c, deadline=deadline)
+
+# Square sieve for Fermat: a² − N must be a square mod each of these, so only
+# a ≡ allowed residues (mod their product, 720720) are ever tested.
+FERMAT_SIEVE_MODULI = (16, 9, 5, 7, 11, 13)
+FERMAT_SIEVE_PERIOD = 720720
+# Cheap per-candidate prefilter before isqrt (classic 64/63/65/11 test)
+_SQUARE_FILTERS = tuple((m, bytes(1 if any((x * x) % m == r for x in range(m)) else 0
+                                  for r in range(m)))
+                        for m in (64, 63, 65, 11))
+FERMAT_PIPELINE_ITERATIONS = 10**8
+HART_PIPELINE_ITERATIONS = 200_000
+# P−1 / P+1 stage-1 bounds, tried in increasing order (B2 = 100·B1)
+PM1_B1_LEVELS = (10_000, 100_000, 1_000_000, 10_000_000)
+PP1_B1_LEVELS = (10_000, 100_000, 1_000_000)
+PM1_PIPELINE_B1 = 100_000
+
+def is_square(n):
+    """Exact perfect-square test for arbitrarily large n (no floats)."""
+    if n < 0:
+        return False
+    if _is_square is not None:
+        return bool(_is_square(n))
+    for m, table in _SQUARE_FILTERS:
+        if not table[n % m]:
+            return False
+    r = isqrt(n)
+    return r * r == n
+
+def _fermat_offsets(N, a0):
+    """
+    Offsets k in [0, FERMAT_SIEVE_PERIOD) for which (a0 + k)² − N is a
+    quadratic residue modulo every sieve modulus (numpy-vectorized).
+    """
+    k = np.arange(FERMAT_SIEVE_PERIOD, dtype=np.int64)
+    mask = np.ones(FERMAT_SIEVE_PERIOD, dtype=bool)
+    for m in FERMAT_SIEVE_MODULI:
+        squares = np.zeros(m, dtype=bool)
+        squares[(np.arange(m) ** 2) % m] = True
+        residues = np.arange(m, dtype=np.int64)
+        ok = squares[(residues * residues - (N % m)) % m]
+        mask &= ok[(a0 % m + k) % m]
+    return k[mask]
+
+def fermat_factorization(N, max_iterations=100, deadline=None, state=None):
+    """
+    Integer-exact Fermat factorization with a quadratic-residue square sieve.
+
+    Searches a = ⌈√N⌉, ⌈√N⌉ + 1, ... for a² − N = b², using math.isqrt so
+    it is exact at any size.  Values of a whose a² − N is a non-square
+    modulo 16, 9, 5, 7, 11 or 13 are skipped without touching big integers,
+    which leaves about 1% of candidates to test.
+
+    Args:
+        N: Number to factor
+        max_iterations: Number of consecutive a values to cover
+        deadline: Optional time.time() value to stop at
+        state: Optional dict; state['a'] is where the search starts (default
+            ⌈√N⌉) and is set to the first a not yet searched on return
+
+    Returns:
+        (a - b, a + b) or None
+    """
     if N % 2 == 0:
         return (2, N//2)
-    a = ceil(sqrt(N))
-    for i in range(max_iterations):
-        b2 = a*a - N
-        b = int(sqrt(b2))
-        if b*b == b2:
-            return (a - b, a + b)
-        a += 1
+    a0 = isqrt(N)
+    if a0 * a0 < N:
+        a0 += 1
+    offsets = _fermat_offsets(N, a0)
+    state = {} if state is None else state
+    # Stopping points are whole sieve periods past a0, so offsets stay aligned
+    start = state.get('a', a0) - a0
+    base = start
+    for base in range(start, max_iterations, FERMAT_SIEVE_PERIOD):
+        limit = max_iterations - base
+        block = offsets if limit >= FERMAT_SIEVE_PERIOD else offsets[offsets < limit]
+        for k in block.tolist():
+            a = a0 + base + k
+            b2 = a*a - N
+            if is_square(b2):
+                b = isqrt(b2)
+                return (a - b, a + b)
+        base += FERMAT_SIEVE_PERIOD
+        if deadline is not None and time.time() >= deadline:
+            break
+    state['a'] = a0 + base
     return None
 
-def try_pollard_rho(N, max_iterations=10000):
-    factor = pollard_rho(N, max_iterations)
-    if factor and factor != N:
-        return factor
+def hart_one_line(N, max_iterations=100000, multiplier=1, deadline=None, state=None):
+    """
+    Hart's one-line factoring algorithm.
+
+    For i = 1, 2, ...: s = ⌈√(N·M·i)⌉, m = s² mod N; when m is a square t²,
+    gcd(s − t, N) is usually a factor.  Finds N = p·q quickly when p/q is
+    close to a ratio of small integers, which plain Fermat misses.
+
+    Args:
+        N: Number to factor
+        max_iterations: Number of multipliers i to try
+        multiplier: Extra constant M (Hart suggests 480 for general N)
+        deadline: Optional time.time() value to stop at
+        state: Optional dict; state['i'] is the first i to try (default 1)
+            and is set to the next untried i on return
+
+    Returns:
+        A nontrivial factor of N, or None
+    """
+    if N % 2 == 0:
+        return 2
+    NM = N * multiplier
+    state = {} if state is None else state
+    start = state.get('i', 1)
+    i = start - 1
+    for i in range(start, max_iterations + 1):
+        s = isqrt(NM * i)
+        if s * s != NM * i:
+            s += 1
+        m = s * s % N
+        if is_square(m):
+            g = gcd(s - isqrt(m), N)
+            if 1 < g < N:
+                return g
+        if deadline is not None and i % 4096 == 0 and time.time() >= deadline:
+            break
+    state['i'] = i + 1
     return None
 
-def try_fermat(N, max_iterations=100):
-    result = fermat_factorization(N, max_iterations)
+def try_pollard_rho(N, max_iterations=10000, constants=RHO_CONSTANTS, workers=1, deadline=None,
+                    state=None):
+    """
+    Brent rho over several polynomial constants.
+
+    Each constant gets the full max_iterations budget.  With workers > 1 the
+    constants run in parallel processes and the first factor wins (the
+    other workers are terminated, not left to run out their budget); inside
+    daemonic pool workers (batch_factor) they run sequentially instead.
+    When run sequentially, state (a dict) records the constant reached and
+    its walk (see pollard_rho) so a later call continues there.
+    """
+    if workers > 1 and not multiprocessing.current_process().daemon:
+        # Leaving the with block terminates the pool, stopping running walks too
+        with multiprocessing.Pool(min(workers, len(constants))) as pool:
+            jobs = [(N, max_iterations, c, deadline) for c in constants]
+            for _, factor in pool.imap_unordered(_rho_worker, jobs):
+                if factor and factor != N:
+                    return factor
+        return None
+    state = {} if state is None else state
+    # Constants before state['c'] were finished by an earlier call
+    start = constants.index(state['c']) if state.get('c') in constants else 0
+    for c in constants[start:]:
+        if state.get('c') != c:
+            state.update(c=c, walk={})
+        factor = pollard_rho(N, max_iterations, c=c, deadline=deadline, state=state['walk'])
+        if factor and factor != N:
+            return factor
+        if deadline is not None and time.time() >= deadline:
+            break
+    return None
+
+def try_fermat(N, max_iterations=100, deadline=None, state=None):
+    result = fermat_factorization(N, max_iterations, deadline=deadline, state=state)
     if result:
         p, q = result
-        if p != q:
+        # p == 1 means the search ran all the way to the trivial representation
+        if p != q and p > 1:
             return p
     return None
 
+def try_pm1(N, B1_levels=PM1_B1_LEVELS, deadline=None, method=pm1):
+    """
+    P−1 (or, with method=williams_pp1, P+1) over increasing B1 levels.
+
+    Stage 1 is a single exponentiation that cannot be interrupted, so a
+    level only starts if 10× the previous level's time still fits before
+    the deadline.
+    """
+    last = 0.0
+    for B1 in B1_levels:
+        if deadline is not None and time.time() + 10 * last >= deadline:
+            break
+        t0 = time.time()
+        factor = method(N, B1, deadline=deadline)
+        if factor and 1 < factor < N:
+            return factor
+        last = time.time() - t0
+    return None
+
+def try_hart(N, max_iterations=100000, deadline=None, state=None):
+    factor = hart_one_line(N, max_iterations, deadline=deadline, state=state)
+    if factor and factor != N:
+        return factor
+    return None
+
 class FactorizationPipeline:
-    def __init__(self, N, timeout_seconds=30):
+    def __init__(self, N, timeout_seconds=30, rho_workers=1):
         self.N = N
         self.timeout = timeout_seconds
+        self.rho_workers = rho_workers
 
     def run(self):
         start = time.time()
-        # Try pollard rho
-        factor = try_pollard_rho(self.N)
+        # Try fermat first: near-square targets fall out in milliseconds
+        factor = try_fermat(self.N, max_iterations=FERMAT_PIPELINE_ITERATIONS,
+                            deadline=start + self.timeout / 4)
+        if factor:
+            elapsed = time.time() - start
+            return ([factor, self.N // factor], 'fermat', elapsed, {})
+        # Try P−1: nearly free, catches factors with smooth p − 1
+        factor = try_pm1(self.N, B1_levels=(PM1_PIPELINE_B1,),
+                         deadline=start + self.timeout / 4)
+        if factor:
+            elapsed = time.time() - start
+            return ([factor, self.N // factor], 'pm1', elapsed, {})
+        # Try pollard rho (Brent, batched GCD) for up to half the budget
+        factor = try_pollard_rho(self.N, max_iterations=RHO_PIPELINE_ITERATIONS,
+                                 workers=self.rho_workers,
+                                 deadline=start + self.timeout / 2)
         if factor:
             elapsed = time.time() - start
             return ([factor, self.N // factor], 'pollard_rho', elapsed, {})
-        # Try fermat
-        factor = try_fermat(self.N)
+        # Try Hart's one-line factoring for small-ratio p/q
+        factor = try_hart(self.N, max_iterations=HART_PIPELINE_ITERATIONS,
+                          deadline=start + self.timeout)
         if factor:
             elapsed = time.time() - start
-            return ([factor, self.N // factor], 'fermat', elapsed, {})
+            return ([factor, self.N // factor], 'hart_olf', elapsed, {})
         # No factor found
         elapsed = time.time() - start
         return (None, None, elapsed, {})
+
+
+# -- Time-budgeted per-target scheduler --------------------------------------
+
+TRIAL_DIVISION_LIMIT = 100_000
+# Opening probe slices: (method, fraction of the target's budget), run in order
+PROBE_SLICES = (
+    ('trial', 0.0),
+    ('fermat', 0.02),
+    ('rho', 0.03),
+    ('hart', 0.01),
+    ('pm1', 0.05),
+    ('pp1', 0.03),
+)
+PROBE_MAX_SECONDS = 10
+# Smaller ECM levels run before ECM_SCHEDULE when N is small
+ECM_SCHEDULE_SMALL = [
+    (15,       2_000,     25),
+    (20,      11_000,     90),
+    (25,      50_000,    300),
+    (30,     250_000,    700),
+]
+# Effectively unbounded iteration budgets; stages stop on their deadline
+_UNBOUNDED = 10**15
+
+@lru_cache(maxsize=4)
+def _primorial(limit):
+    from ecm_python import primes_up_to
+    return primes_up_to(limit), _mpz(prod(primes_up_to(limit)))
+
+def trial_division(N, limit=TRIAL_DIVISION_LIMIT):
+    """Smallest prime factor of N below limit (one GCD with the primorial), or None."""
+    primes, primorial = _primorial(limit)
+    if gcd(primorial, N) == 1:
+        return None
+    for p in primes:
+        if N % p == 0:
+            return p if p < N else None
+    return None
+
+def ecm_levels(N):
+    """ECM (digits, B1, curves) levels worth running for N, smallest first."""
+    digits_needed = len(str(isqrt(N)))
+    levels = [lvl for lvl in ECM_SCHEDULE_SMALL + ECM_SCHEDULE if lvl[0] <= digits_needed + 5]
+    return levels or ECM_SCHEDULE_SMALL[:1]
+
+def expected_work(method, bits, target_type=None):
+    """
+    Rough log2 of the work each method needs to split a bits-bit N.
+
+    Balanced factors (≈ bits/2) are assumed unless the target is 'biased'
+    (close p and q), where Fermat and Hart succeed almost immediately.
+    Lower is better; the scheduler gives the remaining budget to the
+    method with the least expected work.
+    """
+    factor_bits = max(bits / 2, 2)
+    if method in ('fermat', 'hart'):
+        return 1.0 if target_type == 'biased' else factor_bits
+    if method == 'rho':
+        return factor_bits / 2
+    if method == 'ecm':
+        # L_p[1/2, √2] curves·B1 for a factor p of factor_bits bits
+        ln_p = factor_bits * log(2)
+        return sqrt(2 * ln_p * log(ln_p)) / log(2)
+    return float('inf')
+
+def rank_methods(bits, target_type=None):
+    """Methods with a main-budget stage, best expected yield first."""
+    return sorted(SCHEDULER_STAGES, key=lambda m: expected_work(m, bits, target_type))
+
+def _stage_trial(N, deadline, ctx):
+    return trial_division(N)
+
+# ctx['fermat'], ctx['rho'] and ctx['hart'] hold each search's position, so a
+# probe's work is not repeated by the main stage or by a resumed slice
+
+def _stage_fermat(N, deadline, ctx):
+    return try_fermat(N, max_iterations=_UNBOUNDED, deadline=deadline,
+                      state=ctx.setdefault('fermat', {}))
+
+def _stage_rho(N, deadline, ctx):
+    return try_pollard_rho(N, max_iterations=_UNBOUNDED, workers=ctx.get('rho_workers', 1),
+                           deadline=deadline, state=ctx.setdefault('rho', {}))
+
+def _stage_hart(N, deadline, ctx):
+    return try_hart(N, max_iterations=_UNBOUNDED, deadline=deadline,
+                    state=ctx.setdefault('hart', {}))
+
+def _stage_pm1(N, deadline, ctx):
+    return try_pm1(N, PM1_B1_LEVELS, deadline=deadline)
+
+def _stage_pp1(N, deadline, ctx):
+    return try_pm1(N, PP1_B1_LEVELS, deadline=deadline, method=williams_pp1)
+
+def _stage_ecm(N, deadline, ctx):
+    levels = ecm_levels(N)
+    # ctx['ecm_level'] and ctx['ecm_curves'] carry the level and the curves
+    # finished within it across resumed slices
+    for level in range(ctx.get('ecm_level', 0), len(levels)):
+        _digits, B1, curves = levels[level]
+        if ctx.get('ecm_level') != level:
+            ctx['ecm_level'], ctx['ecm_curves'], ctx['ecm_chunk'] = level, 0, None
+        # Deterministic sigmas so interrupted levels resume where they stopped
+        sigma = _compute_sigma_u64(N, B1)
+        if ctx.get('checkpoint_dir'):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            factor = run_ecm_once(N, B1, curves, remaining,
+                                  checkpoint_dir=ctx['checkpoint_dir'], sigma=sigma)
+            if factor and 1 < factor < N:
+                return factor
+            if time.time() >= deadline:
+                # Level cut short: stay on it; the store keeps its finished curves
+                return None
+            continue
+        # Without a checkpoint store, run the level in chunks and count the
+        # ones that completed, skipping them (by sigma) when resumed.  A chunk
+        # cut short by the deadline is not counted, and the next one is half
+        # its size so slices shorter than a chunk still make progress.
+        while ctx.get('ecm_curves', 0) < curves:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            done = ctx.get('ecm_curves', 0)
+            count = min(ctx.get('ecm_chunk') or CHECKPOINT_CURVES, curves - done)
+            factor = run_ecm_once(N, B1, count, remaining, sigma=sigma + done)
+            if factor and 1 < factor < N:
+                return factor
+            if time.time() >= deadline:
+                ctx['ecm_chunk'] = max(1, count // 2)
+                return None
+            ctx['ecm_curves'] = done + count
+    return None
+
+# Stage functions take (N, deadline, ctx) and return a factor or None
+SCHEDULER_STAGES = {
+    'fermat': _stage_fermat,
+    'rho': _stage_rho,
+    'hart': _stage_hart,
+    'ecm': _stage_ecm,
+}
+# P±1 only run as probes: bounded, and they weed out weakly structured
+# targets before any ECM time is spent
+PROBE_STAGES = dict(SCHEDULER_STAGES, trial=_stage_trial, pm1=_stage_pm1, pp1=_stage_pp1)
+
+def factor_single_target(N, timeout=3600, verbose=False, target_type=None,
+                         checkpoint_dir=None, rho_workers=1, resume=None, budget=None):
+    """
+    Factor one target within a wall-clock budget.
+
+    Every cheap method (including P−1/P+1) first gets a short probe slice
+    (PROBE_SLICES); the rest of the budget goes to methods in order of
+    expected yield for the target's type and bit length (see
+    expected_work), each running until it succeeds, exhausts its own
+    search space or the deadline passes.
+
+    A run can be split into time slices: when the deadline ends a slice,
+    result['resume'] records which probes ran and where each search
+    stopped (Fermat's a, rho's walk and constant, Hart's i, ECM's level
+    and curves done), and passing it back as `resume` continues from there instead
+    of starting over.
+
+    Args:
+        N: Number to factor
+        timeout: Budget for this call in seconds (biased/unbiased timeouts
+            from batch_factor.get_timeout_for_target, or one slice of them)
+        verbose: Print each stage
+        target_type: 'biased', 'unbiased' or None
+        checkpoint_dir: Optional ECM checkpoint directory
+        rho_workers: Processes for the rho stage
+        resume: result['resume'] from a previous slice of the same target
+        budget: Whole-target budget that probe slices are sized against
+            (default: timeout)
+
+    Returns:
+        Dict with success, p, q (strings or None), method ('timeout' or
+        'exhausted' on failure), stages (per-stage method/elapsed/found),
+        elapsed (this call) and resume (state to continue from, or None)
+    """
+    start = time.time()
+    deadline = start + timeout
+    # Deep copy: the searches below advance their positions in place
+    state = copy.deepcopy(resume or {})
+    budget = budget or state.get('budget') or timeout
+    ctx = {'checkpoint_dir': checkpoint_dir, 'rho_workers': rho_workers,
+           'ecm_level': state.get('ecm_level', 0), 'ecm_curves': state.get('ecm_curves', 0),
+           'ecm_chunk': state.get('ecm_chunk'),
+           'fermat': state.get('fermat', {}), 'rho': state.get('rho', {}),
+           'hart': state.get('hart', {})}
+    bits = N.bit_length()
+    stages = []
+
+    def attempt(method, stage_deadline):
+        t0 = time.time()
+        factor = PROBE_STAGES[method](N, min(stage_deadline, deadline), ctx)
+        found = bool(factor and 1 < factor < N and N % factor == 0)
+        stages.append({'method': method, 'elapsed': time.time() - t0, 'found': found})
+        if verbose:
+            print(f"  [{method}] {'factor found' if found else 'no factor'} "
+                  f"({stages[-1]['elapsed']:.2f}s)")
+        return factor if found else None
+
+    factor = method = None
+    probes_done = state.get('probes_done', 0)
+    for idx, (m, frac) in enumerate(PROBE_SLICES):
+        if idx < probes_done:
+            continue
+        if time.time() >= deadline:
+            break
+        factor = attempt(m, time.time() + min(PROBE_MAX_SECONDS, frac * budget))
+        probes_done = idx + 1
+        if factor:
+            method = m
+            break
+
+    ranked = rank_methods(bits, target_type)
+    main_index = state.get('main_index', 0)
+    if not factor and probes_done == len(PROBE_SLICES):
+        if verbose:
+            print(f"  Main budget order ({bits} bits, {target_type or 'unknown'}): {', '.join(ranked)}")
+        for idx in range(main_index, len(ranked)):
+            if time.time() >= deadline:
+                break
+            main_index = idx
+            factor = attempt(ranked[idx], deadline)
+            if factor:
+                method = ranked[idx]
+                break
+            if time.time() < deadline:
+                main_index = idx + 1  # method exhausted its own search space
+
+    elapsed = time.time() - start
+    if factor:
+        p, q = sorted((int(factor), int(N // factor)))
+        return {'success': True, 'p': str(p), 'q': str(q), 'method': method,
+                'stages': stages, 'elapsed': elapsed, 'resume': None}
+    timed_out = time.time() >= deadline
+    resume_state = None
+    if timed_out and main_index < len(ranked):
+        resume_state = {'probes_done': probes_done, 'main_index': main_index,
+                        'ecm_level': ctx['ecm_level'], 'ecm_curves': ctx['ecm_curves'],
+                        'ecm_chunk': ctx['ecm_chunk'],
+                        'fermat': ctx['fermat'], 'rho': ctx['rho'], 'hart': ctx['hart'],
+                        'budget': budget}
+    return {'success': False, 'p': None, 'q': None,
+            'method': 'timeout' if timed_out else 'exhausted',
+            'stages': stages, 'elapsed': elapsed, 'resume': resume_state}
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Batch theta-gate evaluation with a persistent per-corpus cache.
+
+manifold_128bit.theta_gate(N) evaluates θ′ in mpmath one N at a time, and
+run_distance_break / scaling_test called it for every target on every run.
+theta_gate_batch() computes the same gate for a whole array of N at once,
+and GateCache stores the results next to the target file so repeated runs
+skip the gate entirely:
+
+    targets_256bit.json   ->  targets_256bit.gates.json
+    corpus_256bit.ztc     ->  corpus_256bit.gates.json
+
+The gate is  |fmod(√N, φ) − φ·(fmod(N, φ)/φ)^k| ≤ width/2, evaluated by
+theta_gate at mpmath's working precision (mp.dps = 50 → 169 bits).  For N
+wider than that, mpf(N) is rounded before the fmod, which changes the
+residue completely, so a float or exact-integer shortcut would disagree
+with theta_gate.  theta_gate_batch therefore takes the two residues with
+the same integer primitives mpmath uses (round N to the working
+precision, exact mpf_mod), and only the power and band test run in numpy.
+Rows that land within float tolerance of the band edge are re-checked
+with theta_gate itself, so the two always agree.
+
+Example:
+    cache = GateCache.for_targets("targets_256bit.json")
+    gates = cache.gates(Ns)        # computes and saves only the misses
+"""
+
+import argparse
+import json
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+
+try:
+    from mpmath import mp, mpf, phi as _PHI
+    from mpmath.libmp import from_int, mpf_mod, mpf_sqrt, to_float
+    from manifold_128bit import theta_gate
+    THETA_GATE_AVAILABLE = True
+except ImportError:
+    THETA_GATE_AVAILABLE = False
+
+WIDTH_FACTOR = 0.155
+K = 0.3
+# Band-edge margin below which float64 can't be trusted to match mpmath
+EDGE_TOLERANCE = 1e-9
+CACHE_SUFFIX = ".gates.json"
+
+
+@lru_cache(maxsize=8)
+def _phi_mpf(prec: int):
+    """φ as mpmath rounds it at this working precision (raw mpf tuple)."""
+    with mp.workprec(prec):
+        return mpf(_PHI)._mpf_
+
+
+def _residues(N: int, prec: int, phi_t) -> tuple:
+    """(fmod(N, φ)/φ, fmod(√N, φ)/φ) with mpmath's rounding at prec."""
+    n = from_int(N, prec, "n")
+    phi_f = to_float(phi_t)
+    n_mod = to_float(mpf_mod(n, phi_t, prec, "n")) / phi_f
+    s_mod = to_float(mpf_mod(mpf_sqrt(n, prec, "n"), phi_t, prec, "n")) / phi_f
+    return n_mod, s_mod
+
+
+def theta_gate_batch(Ns: Iterable[int], width_factor: float = WIDTH_FACTOR,
+                     k: float = K) -> np.ndarray:
+    """
+    Evaluate theta_gate for many N in one call.
+
+    Args:
+        Ns: Iterable of semiprimes (ints or decimal strings)
+        width_factor: Width of the acceptance region (default: 0.155)
+        k: Exponent for theta_prime (default: 0.3)
+
+    Returns:
+        Boolean array, element i == theta_gate(Ns[i], width_factor, k)
+    """
+    if not THETA_GATE_AVAILABLE:
+        raise ImportError("theta_gate_batch requires mpmath and manifold_128bit")
+    Ns = [int(N) for N in Ns]
+    prec = mp.prec
+    phi_t = _phi_mpf(prec)
+    phi_f = to_float(phi_t)
+
+    valid = np.fromiter((N >= 4 for N in Ns), dtype=bool, count=len(Ns))
+    res = np.array([_residues(N, prec, phi_t) if ok else (0.0, 0.0)
+                    for N, ok in zip(Ns, valid)], dtype=np.float64).reshape(-1, 2)
+
+    theta = phi_f * np.power(res[:, 0], k)
+    dist = np.abs(res[:, 1] * phi_f - theta)
+    half = width_factor / 2
+    gates = valid & (dist <= half)
+
+    # Defer to mpmath wherever float rounding could flip the comparison
+    for i in np.flatnonzero(valid & (np.abs(dist - half) < EDGE_TOLERANCE)):
+        gates[i] = theta_gate(Ns[i], width_factor, k)
+    return gates
+
+
+def cache_path_for(targets_file: Union[str, Path]) -> Path:
+    """Gate cache file that lives next to a targets JSON / corpus file."""
+    path = Path(targets_file)
+    return path.with_name(path.stem + CACHE_SUFFIX)
+
+
+class GateCache:
+    """
+    Theta-gate results keyed by N, persisted as JSON.
+
+    The file records the gate parameters and mpmath precision it was
+    computed with; a mismatch discards the stored entries.
+    """
+
+    def __init__(self, path: Union[str, Path], width_factor: float = WIDTH_FACTOR,
+                 k: float = K):
+        self.path = Path(path)
+        self.params = {"width_factor": width_factor, "k": k,
+                       "prec": mp.prec if THETA_GATE_AVAILABLE else None}
+        self._gates: Dict[str, bool] = {}
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                if data.get("params") == self.params:
+                    self._gates = data.get("gates", {})
+            except (OSError, json.JSONDecodeError):
+                pass
+
+    @classmethod
+    def for_targets(cls, targets_file: Union[str, Path], **kwargs) -> "GateCache":
+        return cls(cache_path_for(targets_file), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._gates)
+
+    def gates(self, Ns: Iterable[int], save: bool = True) -> List[bool]:
+        """Gate for each N; misses are computed in one batch and saved."""
+        keys = [format(int(N), "x") for N in Ns]
+        missing = sorted({key for key in keys if key not in self._gates})
+        if missing:
+            computed = theta_gate_batch((int(key, 16) for key in missing),
+                                        self.params["width_factor"], self.params["k"])
+            self._gates.update(zip(missing, map(bool, computed)))
+            self._dirty = True
+            if save:
+                self.save()
+        return [self._gates[key] for key in keys]
+
+    def gate(self, N: int) -> bool:
+        """Single lookup (computed and saved on a miss)."""
+        return self.gates([N])[0]
+
+    def save(self) -> None:
+        """Atomically write the cache if anything was added."""
+        if not self._dirty:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"params": self.params, "gates": self._gates}, f,
+                      separators=(",", ":"))
+        tmp.replace(self.path)
+        self._dirty = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute theta-gate results for a target file")
+    parser.add_argument("targets", help="Targets JSON or .ztc corpus")
+    parser.add_argument("--width-factor", type=float, default=WIDTH_FACTOR)
+    parser.add_argument("--k", type=float, default=K)
+    args = parser.parse_args()
+
+    if not THETA_GATE_AVAILABLE:
+        print("Error: theta_gate not available (mpmath / manifold_128bit)", file=sys.stderr)
+        return 1
+
+    from target_corpus import open_targets
+    _, targets = open_targets(args.targets)
+    Ns = list(targets.moduli()) if hasattr(targets, "moduli") else [int(t["N"]) for t in targets]
+    cache = GateCache.for_targets(args.targets, width_factor=args.width_factor, k=args.k)
+    start = time.time()
+    gates = cache.gates(Ns)
+    print(f"{sum(gates)}/{len(gates)} targets pass the gate "
+          f"({time.time() - start:.3f}s) -> {cache.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
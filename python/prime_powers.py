@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Shared prime-power tables and the P−1 / P+1 factoring stages.
+
+ECM stage 1, Pollard P−1 and Williams P+1 all raise a point (or a residue)
+to the same exponent: the product of the largest power of every prime
+p ≤ B1 that does not exceed B1.  This module computes that exponent once
+per B1 and keeps it in an on-disk cache which later runs and forked workers
+memory-map instead of recomputing it:
+
+    <cache>/ppexp_B1_<B1>.bin        little-endian exponent bytes
+    <cache>/gaps_<lo>_<hi>.npy       half prime gaps for stage 2
+
+The cache directory is $PRIME_POWER_CACHE, or ~/.cache/z-sandbox/prime_powers.
+Bounds below DISK_CACHE_MIN_B1 are cheap enough to stay in memory only.
+
+Stage 2 of P−1 walks the primes in (B1, B2] with a prime-gap table:
+x^q for the next prime q is x^(previous q) · x^gap, with x^gap looked up
+from a small table of even gaps.  P+1 stage 2 uses baby-step/giant-step
+Lucas sequences, mirroring ECM stage 2 in ecm_python.
+
+Example:
+    from prime_powers import pm1, williams_pp1
+    f = pm1(N, B1=1_000_000) or williams_pp1(N, B1=1_000_000)
+"""
+
+import functools
+import math
+import mmap
+import os
+import time
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import gmpy2
+    _mpz = gmpy2.mpz
+    _gcd = gmpy2.gcd
+except ImportError:
+    _mpz = int
+    _gcd = math.gcd
+
+DISK_CACHE_MIN_B1 = 100_000
+# Largest (hi - lo) span whose gap table is written to the cache
+GAP_CACHE_MAX_SPAN = 10**8
+# Width of the integer range sieved per stage-2 segment
+STAGE2_SEGMENT = 1 << 22
+DEFAULT_B2_FACTOR = 100
+# Stage-2 steps between GCDs / deadline checks
+_GCD_INTERVAL = 4096
+# Williams P+1 starting values A = num/den (mod N); 2/7 and 6/5 are
+# Montgomery's choices, which give P+1 on a third of primes and P−1 otherwise
+PP1_SEEDS = ((2, 7), (6, 5))
+PP1_STAGE2_D = 2310
+
+
+def cache_dir() -> Optional[Path]:
+    """Prime-power cache directory, or None when it cannot be created."""
+    root = Path(os.environ.get("PRIME_POWER_CACHE")
+                or Path.home() / ".cache" / "z-sandbox" / "prime_powers")
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return root
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    tmp.replace(path)
+
+
+# -- primes -------------------------------------------------------------------
+
+def sieve_segment(lo: int, hi: int) -> np.ndarray:
+    """All primes in [lo, hi) as an int64 array (segmented numpy sieve)."""
+    lo = max(lo, 2)
+    if hi <= lo:
+        return np.zeros(0, dtype=np.int64)
+    base = small_primes(math.isqrt(hi - 1))
+    mark = np.ones(hi - lo, dtype=bool)
+    for p in base.tolist():
+        start = max(p * p, (lo + p - 1) // p * p)
+        mark[start - lo::p] = False
+    return np.nonzero(mark)[0].astype(np.int64) + lo
+
+
+@functools.lru_cache(maxsize=4)
+def small_primes(n: int) -> np.ndarray:
+    """All primes ≤ n (numpy sieve of Eratosthenes)."""
+    if n < 2:
+        return np.zeros(0, dtype=np.int64)
+    sieve = np.ones(n + 1, dtype=bool)
+    sieve[:2] = False
+    for p in range(2, math.isqrt(n) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = False
+    return np.nonzero(sieve)[0].astype(np.int64)
+
+
+def prime_gap_table(lo: int, hi: int) -> Tuple[int, np.ndarray]:
+    """
+    Primes in [lo, hi) as (first prime, half gaps).
+
+    Half gaps (q_{i+1} − q_i) / 2 fit in uint8 for every prime below 2^32
+    (the largest gap there is 336).  Tables up to GAP_CACHE_MAX_SPAN are
+    cached on disk and memory-mapped on later calls.
+    """
+    root = cache_dir() if hi - lo <= GAP_CACHE_MAX_SPAN else None
+    path = root / f"gaps_{lo}_{hi}.npy" if root else None
+    if path is not None and path.exists():
+        table = np.load(path, mmap_mode="r")
+        return int.from_bytes(table[:8].tobytes(), "little"), table[8:]
+    primes = sieve_segment(max(lo, 3), hi)
+    if len(primes) == 0:
+        return 0, np.zeros(0, dtype=np.uint8)
+    half_gaps = (np.diff(primes) // 2).astype(np.uint8)
+    if path is not None:
+        # 8-byte little-endian first prime, then the uint8 half gaps
+        header = np.frombuffer(int(primes[0]).to_bytes(8, "little"), dtype=np.uint8)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        try:
+            np.save(tmp, np.concatenate([header, half_gaps]))
+            tmp.replace(path)
+        except OSError:
+            pass
+    return int(primes[0]), half_gaps
+
+
+def iter_prime_gaps(lo: int, hi: int,
+                    segment: int = STAGE2_SEGMENT) -> Iterator[Tuple[int, np.ndarray]]:
+    """prime_gap_table over [lo, hi) in fixed segments (bounded memory)."""
+    for seg_lo in range(lo, hi, segment):
+        first, gaps = prime_gap_table(seg_lo, min(hi, seg_lo + segment))
+        if first:
+            yield first, gaps
+
+
+# -- prime-power exponent -----------------------------------------------------
+
+def _product_tree(values) -> int:
+    values = [_mpz(v) for v in values]
+    if not values:
+        return 1
+    while len(values) > 1:
+        paired = [values[i] * values[i + 1] for i in range(0, len(values) - 1, 2)]
+        if len(values) % 2:
+            paired.append(values[-1])
+        values = paired
+    return int(values[0])
+
+
+def _compute_exponent(B1: int) -> int:
+    primes = small_primes(B1)
+    powers = primes.copy()
+    # Raise each prime while p^(k+1) ≤ B1; only primes ≤ √B1 ever move
+    small = primes[primes <= math.isqrt(B1)]
+    for i, p in enumerate(small.tolist()):
+        pk = p
+        while pk * p <= B1:
+            pk *= p
+        powers[i] = pk
+    return _product_tree(powers.tolist())
+
+
+@functools.lru_cache(maxsize=8)
+def prime_power_exponent(B1: int) -> int:
+    """
+    Product of the largest power of each prime ≤ B1 that does not exceed B1.
+
+    Computed once per B1; for B1 ≥ DISK_CACHE_MIN_B1 the bytes are cached
+    on disk and memory-mapped by later processes.
+    """
+    root = cache_dir() if B1 >= DISK_CACHE_MIN_B1 else None
+    path = root / f"ppexp_B1_{B1}.bin" if root else None
+    if path is not None and path.exists() and path.stat().st_size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return int.from_bytes(mm, "little")
+    E = _compute_exponent(B1)
+    if path is not None:
+        try:
+            _atomic_write(path, E.to_bytes((E.bit_length() + 7) // 8, "little"))
+        except OSError:
+            pass
+    return E
+
+
+# -- Pollard P−1 --------------------------------------------------------------
+
+def _pm1_stage2(x, N, B1: int, B2: int, deadline: Optional[float]):
+    """Product of (x^q − 1) over primes q in (B1, B2], checked by GCD per block."""
+    gap_powers = {}
+    acc = _mpz(1)
+    xq = None
+    steps = 0
+    for first, half_gaps in iter_prime_gaps(B1 + 1, B2 + 1):
+        if xq is None:
+            xq = pow(x, first, N)
+        else:
+            xq = xq * _gap_power(x, first - q, N, gap_powers) % N
+        acc = acc * (xq - 1) % N
+        q = first
+        for h in half_gaps.tolist():
+            d = 2 * h
+            xd = gap_powers.get(d)
+            if xd is None:
+                xd = gap_powers[d] = pow(x, d, N)
+            xq = xq * xd % N
+            acc = acc * (xq - 1) % N
+            q += d
+            steps += 1
+            if steps % _GCD_INTERVAL == 0:
+                g = _gcd(acc, N)
+                if g != 1:
+                    return g
+                if deadline is not None and time.time() >= deadline:
+                    return 1
+    return _gcd(acc, N)
+
+
+def _gap_power(x, d, N, table):
+    if d not in table:
+        table[d] = pow(x, d, N)
+    return table[d]
+
+
+def pm1(N: int, B1: int, B2: Optional[int] = None, base: int = 3,
+        deadline: Optional[float] = None) -> Optional[int]:
+    """
+    Pollard P−1.
+
+    Finds p | N when p − 1 is B1-smooth apart from at most one prime ≤ B2.
+
+    Args:
+        N: Number to factor
+        B1: Stage-1 bound
+        B2: Stage-2 bound (default 100·B1; ≤ B1 disables stage 2)
+        base: Starting residue
+        deadline: Optional time.time() value to stop at
+
+    Returns:
+        A nontrivial factor of N, or None
+    """
+    if N % 2 == 0:
+        return 2
+    if B2 is None:
+        B2 = DEFAULT_B2_FACTOR * B1
+    n = _mpz(N)
+    x = pow(_mpz(base), prime_power_exponent(B1), n)
+    g = _gcd(x - 1, n)
+    if g == n:
+        # Every factor is B1-smooth at once; back off prime by prime
+        return _pm1_backtrack(n, B1, base)
+    if g != 1:
+        return int(g)
+    if B2 <= B1 or (deadline is not None and time.time() >= deadline):
+        return None
+    g = _pm1_stage2(x, n, B1, B2, deadline)
+    if 1 < g < n:
+        return int(g)
+    return None
+
+
+def _pm1_backtrack(n, B1: int, base: int) -> Optional[int]:
+    x = _mpz(base)
+    for p in small_primes(B1).tolist():
+        pk = p
+        while pk * p <= B1:
+            pk *= p
+        y = pow(x, pk, n)
+        g = _gcd(y - 1, n)
+        if g == n:
+            # This prime power finished both factors; take it one p at a time
+            for _ in range(int(round(math.log(pk, p)))):
+                x = pow(x, p, n)
+                g = _gcd(x - 1, n)
+                if g != 1:
+                    return int(g) if g != n else None
+        elif g != 1:
+            return int(g)
+        x = y
+    return None
+
+
+# -- Williams P+1 -------------------------------------------------------------
+
+def lucas_v(k: int, A, N):
+    """V_k(A) mod N for the Lucas sequence V_0 = 2, V_1 = A."""
+    if k == 0:
+        return _mpz(2)
+    x, y = A, (A * A - 2) % N  # V_1, V_2
+    for bit in bin(k)[3:]:
+        if bit == "1":
+            x, y = (x * y - A) % N, (y * y - 2) % N
+        else:
+            x, y = (x * x - 2) % N, (x * y - A) % N
+    return x
+
+
+def _pp1_stage2(V, N, B1: int, B2: int, deadline: Optional[float]):
+    """
+    Baby-step/giant-step P+1 stage 2.
+
+    A prime q = m·D ± j divides the order iff V_{mD} ≡ V_j, so the
+    differences V_{mD} − V_j for every j < D/2 coprime to D are multiplied
+    together and checked with GCDs, as in ECM stage 2.
+    """
+    D = PP1_STAGE2_D if B2 - B1 > 10 * PP1_STAGE2_D else 210
+    js = [j for j in range(1, D // 2, 2) if math.gcd(j, D) == 1]
+    V2 = (V * V - 2) % N
+    baby = {}
+    prev, cur = V, lucas_v(3, V, N)  # V_1, V_3
+    baby[1] = V
+    for j in range(3, D // 2, 2):
+        if math.gcd(j, D) == 1:
+            baby[j] = cur
+        prev, cur = cur, (cur * V2 - prev) % N
+    baby_values = [baby[j] for j in js]
+
+    VD = lucas_v(D, V, N)
+    m_start = max(1, B1 // D)
+    m_end = B2 // D + 1
+    R_prev = lucas_v((m_start - 1) * D, V, N)
+    R = lucas_v(m_start * D, V, N)
+    acc = _mpz(1)
+    for m in range(m_start, m_end + 1):
+        for Vj in baby_values:
+            acc = acc * (R - Vj) % N
+        R_prev, R = R, (R * VD - R_prev) % N
+        if m % 64 == 0:
+            g = _gcd(acc, N)
+            if g != 1:
+                return g
+            if deadline is not None and time.time() >= deadline:
+                return 1
+    return _gcd(acc, N)
+
+
+def williams_pp1(N: int, B1: int, B2: Optional[int] = None, seeds=PP1_SEEDS,
+                 deadline: Optional[float] = None) -> Optional[int]:
+    """
+    Williams P+1.
+
+    Finds p | N when p + 1 (or p − 1, depending on the seed) is B1-smooth
+    apart from at most one prime ≤ B2.  Each seed num/den in `seeds` is a
+    separate attempt.
+
+    Returns:
+        A nontrivial factor of N, or None
+    """
+    if N % 2 == 0:
+        return 2
+    if B2 is None:
+        B2 = DEFAULT_B2_FACTOR * B1
+    n = _mpz(N)
+    E = prime_power_exponent(B1)
+    for num, den in seeds:
+        g = _gcd(den, n)
+        if g != 1:
+            return int(g) if g != n else None
+        A = num * pow(_mpz(den), -1, n) % n
+        V = lucas_v(E, A, n)
+        g = _gcd(V - 2, n)
+        if 1 < g < n:
+            return int(g)
+        if g == n:
+            continue
+        if deadline is not None and time.time() >= deadline:
+            return None
+        if B2 > B1:
+            g = _pp1_stage2(V, n, B1, B2, deadline)
+            if 1 < g < n:
+                return int(g)
+        if deadline is not None and time.time() >= deadline:
+            return None
+    return None
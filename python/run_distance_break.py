@@ -7,6 +7,8 @@ Enhanced with low-discrepancy sampling for ECM parameters:
 - Sigma values sampled with Sobol'/golden-angle sequences
 - B1/B2 parameter exploration with prefix-optimal coverage
 - Deterministic, restartable computation
+- Optional curve-level parallelism: a stage's curves are split across
+  workers, each with its own slice of the sigma stream
 """
 
 import argparse
@@ -14,13 +16,19 @@ import json
 import os
 import time
 import datetime
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import List
-from ecm_backend import run_ecm_once, backend_info
+from typing import List, Optional
+import ecm_backend
+from ecm_backend import run_ecm_once, backend_info, shared_worker_pool
+from target_corpus import open_targets
 
 # Try to import theta_gate
 try:
     from manifold_128bit import theta_gate
+    from gate_cache import GateCache
     THETA_GATE_AVAILABLE = True
 except ImportError:
     THETA_GATE_AVAILABLE = False
@@ -51,19 +59,24 @@ LIGHT_SCHEDULE = [
 
 
 def load_targets(filepath):
-    """Load targets from JSON file."""
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    return data['metadata'], data['targets']
+    """
+    Load targets from a JSON file or a binary corpus (.ztc).
+
+    Returns (metadata, targets); for a corpus, targets is a memory-mapped
+    TargetCorpus that decodes rows as they are iterated.
+    """
+    return open_targets(filepath)
 
 
-def determine_schedule(N, use_gate):
+def determine_schedule(N, use_gate, gate_cache=None):
     """
     Determine ECM schedule based on theta-gating.
     
     Args:
         N: The semiprime to factor
         use_gate: Whether to use theta-gating
+        gate_cache: Optional GateCache to look the gate up in instead of
+            evaluating theta_gate(N)
     
     Returns:
         Tuple of (schedule, gate_result)
@@ -74,7 +87,7 @@ def determine_schedule(N, use_gate):
         return LIGHT_SCHEDULE, None
     
     # Apply theta-gate
-    gate_passed = theta_gate(N)
+    gate_passed = gate_cache.gate(N) if gate_cache is not None else theta_gate(N)
     
     if gate_passed:
         return FULL_SCHEDULE, True
@@ -149,7 +162,133 @@ def generate_sigma_values(num_curves: int, sampler_type: str = "prng", seed: int
     return sigma_values
 
 
-def factor_with_ecm(N, schedule, timeout_per_stage, checkpoint_dir, use_sigma, sampler_type="prng"):
+def split_curves(curves: int, workers: int) -> List[tuple]:
+    """
+    Split a stage's curves into contiguous per-worker ranges.
+    
+    Args:
+        curves: Total curves in the stage
+        workers: Number of workers
+    
+    Returns:
+        List of (start, count) tuples, one per worker that gets curves
+    """
+    per_worker, extra = divmod(curves, workers)
+    ranges = []
+    start = 0
+    for w in range(workers):
+        count = per_worker + (1 if w < extra else 0)
+        if count:
+            ranges.append((start, count))
+        start += count
+    return ranges
+
+
+def _run_curve_slice(N, B1, count, sigmas: Optional[List[int]], deadline, cancel_event,
+                     checkpoint_dir=None, sigma=None):
+    """
+    Run one worker's share of a stage.
+    
+    With sigmas, each curve runs separately with its own sigma so the whole
+    low-discrepancy slice is used; every (N, B1, sigma) curve has its own
+    checkpoint entry, so a resumed stage skips curves that already ran.
+    Otherwise the slice runs as one 'ecm -c count' call with random curves
+    (or, on the local backend, `count` curves from sigma onwards) and no
+    checkpoint.
+    
+    Returns:
+        A factor of N, or None if the slice finished, timed out or was cancelled
+    """
+    if sigmas is None:
+        remaining = deadline - time.time()
+        if remaining <= 0 or cancel_event.is_set():
+            return None
+        return run_ecm_once(N=N, B1=B1, curves=count, timeout_sec=remaining,
+                            checkpoint_dir=None, sigma=sigma, cancel_event=cancel_event)
+    for sigma in sigmas:
+        remaining = deadline - time.time()
+        if remaining <= 0 or cancel_event.is_set():
+            return None
+        factor = run_ecm_once(N=N, B1=B1, curves=1, timeout_sec=remaining,
+                              checkpoint_dir=checkpoint_dir, sigma=sigma,
+                              cancel_event=cancel_event)
+        if factor:
+            return factor
+    return None
+
+
+def _run_stage_on_pool(N, B1, curves, timeout_sec, workers):
+    """Random-curve stage as one ECMWorkerPool job per slice, keyed by N."""
+    pool = shared_worker_pool(workers)
+    futures = [pool.submit(N, B1, count, timeout_sec=timeout_sec, key=N)
+               for _, count in split_curves(curves, workers)]
+    try:
+        for future in as_completed(futures, timeout=timeout_sec):
+            try:
+                factor = future.result()
+            except (CancelledError, OSError):
+                continue
+            if factor:
+                return factor
+    except FutureTimeoutError:
+        pass
+    finally:
+        # Drops slices still queued behind other work and stops running ones
+        pool.cancel_target(N)
+    return None
+
+
+def run_stage_parallel(N, B1, curves, timeout_sec, workers, sigma_values=None,
+                       checkpoint_dir=None):
+    """
+    Run one ECM stage with its curves split across workers.
+    
+    The first worker to find a factor cancels the others, so wall-clock time
+    per stage scales down with the number of cores.  Checkpoints are keyed
+    by sigma, so slices only checkpoint when sigma_values are given; random
+    curves have no range to resume.  On gmp-ecm, random-curve stages run on
+    the shared ECMWorkerPool, whose ecm processes are reused by later
+    stages and targets with the same (B1, slice size).
+    
+    Args:
+        N: The number to factor
+        B1: Stage-1 bound
+        curves: Total curves for the stage
+        timeout_sec: Wall-clock budget for the whole stage
+        workers: Number of concurrent ecm processes
+        sigma_values: Optional list of `curves` sigmas; worker w gets its own slice
+        checkpoint_dir: Optional ECM checkpoint store directory
+    
+    Returns:
+        A factor of N or None
+    """
+    if sigma_values is None and ecm_backend.BACKEND == "gmp-ecm":
+        return _run_stage_on_pool(N, B1, curves, timeout_sec, workers)
+    deadline = time.time() + timeout_sec
+    cancel_event = threading.Event()
+    ranges = split_curves(curves, workers)
+    # The local backend is seeded deterministically from (N, B1); offset
+    # each slice by its first curve so the workers don't repeat each other
+    base_sigma = None if sigma_values else ecm_backend._compute_sigma_u64(N, B1)
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(_run_curve_slice, N, B1, count,
+                        sigma_values[start:start + count] if sigma_values else None,
+                        deadline, cancel_event,
+                        checkpoint_dir if sigma_values else None,
+                        None if sigma_values else base_sigma + start)
+            for start, count in ranges
+        ]
+        for future in as_completed(futures):
+            factor = future.result()
+            if factor:
+                cancel_event.set()
+                return factor
+    return None
+
+
+def factor_with_ecm(N, schedule, timeout_per_stage, checkpoint_dir, use_sigma, sampler_type="prng",
+                    workers=1):
     """
     Attempt to factor N using the given ECM schedule.
     
@@ -160,6 +299,8 @@ def factor_with_ecm(N, schedule, timeout_per_stage, checkpoint_dir, use_sigma, s
         checkpoint_dir: Directory for checkpoints
         use_sigma: Whether to use deterministic sigma seeding
         sampler_type: Type of low-discrepancy sampler for sigma values
+        workers: Number of parallel ecm processes per stage (1 = one
+            sequential 'ecm -c curves' call, as before)
     
     Returns:
         Dictionary with factorization result
@@ -170,7 +311,8 @@ def factor_with_ecm(N, schedule, timeout_per_stage, checkpoint_dir, use_sigma, s
         'stage': None,
         'time_sec': 0.0,
         'stages_attempted': [],
-        'sampler_type': sampler_type
+        'sampler_type': sampler_type,
+        'workers': workers
     }
     
     start_time = time.time()
@@ -186,21 +328,34 @@ def factor_with_ecm(N, schedule, timeout_per_stage, checkpoint_dir, use_sigma, s
                 sampler_type=sampler_type,
                 seed=42 + stage_idx  # Different seed per stage
             )
-            # For simplicity, use first sigma value (could iterate over all)
+            # Sequential mode seeds with the first sigma; parallel mode
+            # gives each worker its own slice of the stream
             sigma = sigma_values[0]
         else:
+            sigma_values = None
             sigma = None
         
         # Try to factor
-        factor = run_ecm_once(
-            N=N,
-            B1=B1,
-            curves=curves,
-            timeout_sec=timeout_per_stage,
-            checkpoint_dir=checkpoint_dir,
-            sigma=sigma,
-            allow_resume=True
-        )
+        if workers > 1:
+            factor = run_stage_parallel(
+                N=N,
+                B1=B1,
+                curves=curves,
+                timeout_sec=timeout_per_stage,
+                workers=workers,
+                sigma_values=sigma_values,
+                checkpoint_dir=checkpoint_dir
+            )
+        else:
+            factor = run_ecm_once(
+                N=N,
+                B1=B1,
+                curves=curves,
+                timeout_sec=timeout_per_stage,
+                checkpoint_dir=checkpoint_dir,
+                sigma=sigma,
+                allow_resume=True
+            )
         
         stage_time = time.time() - stage_start
         
@@ -224,7 +379,8 @@ def factor_with_ecm(N, schedule, timeout_per_stage, checkpoint_dir, use_sigma, s
     return result
 
 
-def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigma, log_file, sampler_type="prng"):
+def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigma, log_file, sampler_type="prng",
+                       workers=1):
     """
     Run ECM factorization on distance-organized targets with theta-gating.
     
@@ -235,6 +391,7 @@ def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigm
         use_sigma: Whether to use deterministic sigma seeding
         log_file: Path to log file (JSONL format)
         sampler_type: Type of low-discrepancy sampler for ECM parameters
+        workers: Number of parallel ecm processes per stage
     """
     # Create directories
     Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
@@ -244,9 +401,19 @@ def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigm
     print("Loading targets...")
     metadata, targets = load_targets(targets_file)
     print(f"Loaded {len(targets)} targets")
+
+    # Evaluate every gate up front (cached next to the targets file)
+    gate_cache = None
+    if use_sigma and THETA_GATE_AVAILABLE:
+        gate_cache = GateCache.for_targets(targets_file)
+        gate_start = time.time()
+        moduli = targets.moduli() if hasattr(targets, 'moduli') else (t['N'] for t in targets)
+        gate_cache.gates(moduli)
+        print(f"Theta gates ready in {time.time() - gate_start:.3f}s ({gate_cache.path})")
     print(f"Target bits: {metadata['bits']}")
     print(f"Theta-gating: {'enabled' if use_sigma and THETA_GATE_AVAILABLE else 'disabled'}")
     print(f"Sampler type: {sampler_type}")
+    print(f"Workers per stage: {workers}")
     
     # Write run metadata
     run_meta = {
@@ -260,6 +427,7 @@ def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigm
         'checkpoint_dir': str(checkpoint_dir),
         'use_sigma': use_sigma,
         'sampler_type': sampler_type,
+        'workers': workers,
         'low_discrepancy_available': LOW_DISCREPANCY_AVAILABLE,
         'theta_gate_available': THETA_GATE_AVAILABLE,
         'full_schedule': [{'stage': s, 'B1': b, 'curves': c} for s, b, c in FULL_SCHEDULE],
@@ -288,7 +456,7 @@ def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigm
             print(f"  Fermat gap: {target['fermat_gap']}")
         
         # Determine schedule based on theta-gating
-        schedule, gate_result = determine_schedule(N, use_sigma and THETA_GATE_AVAILABLE)
+        schedule, gate_result = determine_schedule(N, use_sigma and THETA_GATE_AVAILABLE, gate_cache)
         schedule_type = 'full' if len(schedule) > 1 else 'light'
         
         print(f"  Gate result: {gate_result} → {schedule_type} schedule ({len(schedule)} stages)")
@@ -301,7 +469,8 @@ def run_distance_break(targets_file, timeout_per_stage, checkpoint_dir, use_sigm
             timeout_per_stage=timeout_per_stage,
             checkpoint_dir=checkpoint_dir,
             use_sigma=use_sigma,
-            sampler_type=sampler_type
+            sampler_type=sampler_type,
+            workers=workers
         )
         
         # Check integrity if factored
@@ -363,7 +532,7 @@ def main():
         description='Run ECM factorization with theta-gating on distance targets'
     )
     parser.add_argument('--targets', type=str, required=True,
-                       help='Path to targets JSON file')
+                       help='Path to targets JSON file or binary corpus (.ztc)')
     parser.add_argument('--timeout-per-stage', type=int, default=900,
                        help='Timeout in seconds per ECM stage (default: 900)')
     parser.add_argument('--checkpoint-dir', type=str, default='ckpts',
@@ -373,6 +542,8 @@ def main():
     parser.add_argument('--sampler', type=str, default='prng',
                        choices=['prng', 'sobol', 'sobol-owen', 'golden-angle'],
                        help='Low-discrepancy sampler for ECM parameters (default: prng)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Parallel ecm processes per stage; curves are split across them (default: 1)')
     parser.add_argument('--log', type=str, default='logs/distance_break.jsonl',
                        help='Log file path (default: logs/distance_break.jsonl)')
     
@@ -385,6 +556,9 @@ def main():
         args.checkpoint_dir = os.environ['ECM_CKDIR']
     if 'ECM_SAMPLER' in os.environ:
         args.sampler = os.environ['ECM_SAMPLER']
+    if 'ECM_WORKERS' in os.environ:
+        args.workers = int(os.environ['ECM_WORKERS'])
+    args.workers = max(1, args.workers)
     
     print("="*70)
     print("ECM Distance Break with Theta-Gating")
@@ -395,6 +569,7 @@ def main():
     print(f"Checkpoint dir: {args.checkpoint_dir}")
     print(f"Use sigma/gating: {args.use_sigma}")
     print(f"Sampler: {args.sampler}")
+    print(f"Workers: {args.workers}")
     print(f"Log file: {args.log}")
     
     run_distance_break(
@@ -403,7 +578,8 @@ def main():
         checkpoint_dir=args.checkpoint_dir,
         use_sigma=args.use_sigma,
         log_file=args.log,
-        sampler_type=args.sampler
+        sampler_type=args.sampler,
+        workers=args.workers
     )
 
 
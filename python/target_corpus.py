@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Compact binary target-corpus format with memory-mapped loading.
+
+The JSON target files (targets_1500.json, targets_by_distance.json,
+targets_filtered.json) store N/p/q as decimal strings and have to be parsed
+in full before the first target can be used.  A corpus file (.ztc) stores
+the same data column-wise so it can be opened with mmap in constant time:
+
+    header     magic, version, row count, limb widths, section offsets
+    N          count × n_limbs little-endian uint64 limbs
+    p, q       count × f_limbs little-endian uint64 limbs
+    bits       count × 3 uint16 (N_bits, p_bits, q_bits)
+    tier       count int16   (-1 = no tier)
+    tier_type  count int8    (0 = none, 1 = ratio, 2 = fermat)
+    bias       count int8    (1 = biased, 0 = unbiased, -1 = unknown)
+    fields     count uint16  (which column-derived keys the source row had)
+    index      count × (uint64 id hash, uint64 row), sorted by hash
+    id_offsets (count + 1) uint64 offsets into the id blob
+    id_blob    UTF-8 target ids
+    extra_offsets (count + 1) uint64 offsets into the extras blob
+    extra_blob JSON objects with every other per-target field
+    metadata   JSON (original corpus metadata)
+
+Rows come back as plain target dicts equal to the source JSON rows (generator
+fields such as ratio_actual, fermat_gap or k1/k2 live in the extras column),
+so existing loaders can use a TargetCorpus wherever they used the 'targets'
+list.  Random access by id is
+a binary search over the mmapped index, and workers can each open the file
+and iterate only their own shard.
+
+Usage:
+    python target_corpus.py convert targets_1500.json targets_1500.ztc
+    python target_corpus.py info targets_1500.ztc
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"ZTCORP\x00\x01"
+VERSION = 2
+CORPUS_SUFFIX = ".ztc"
+
+# magic, version, n_limbs, f_limbs, flags, count, then 14 section offsets
+_HEADER = struct.Struct("<8sHHHHQ14Q")
+_SECTIONS = ("N", "p", "q", "bits", "tier", "tier_type", "bias", "fields",
+             "index", "id_offsets", "id_blob", "extra_offsets", "extra_blob",
+             "metadata")
+
+# Header flags
+FLAG_INT_IDS = 0x1  # ids were integers in the source corpus
+
+_INDEX_DTYPE = np.dtype([("hash", "<u8"), ("row", "<u8")])
+
+# tier_type codes (generate_targets_by_distance uses 'ratio' and 'fermat' tiers)
+TIER_TYPES = {None: 0, "ratio": 1, "fermat": 2}
+_TIER_TYPE_NAMES = {code: name for name, code in TIER_TYPES.items()}
+
+BIAS_UNKNOWN = -1
+BIAS_UNBIASED = 0
+BIAS_BIASED = 1
+
+# Keys rebuilt from the fixed-width columns; bit i of the 'fields' column is
+# set when the source row had COLUMN_KEYS[i] with exactly the decoded value.
+COLUMN_KEYS = ("id", "N", "N_bits", "p", "q", "p_bits", "q_bits",
+               "tier", "fermat_tier", "tier_type", "bias_close", "type")
+
+
+def _id_hash(target_id) -> int:
+    """64-bit hash of a target id (ids are compared as strings)."""
+    digest = hashlib.blake2b(str(target_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _limbs_for(bits: int) -> int:
+    """Number of 64-bit limbs needed for an integer of the given bit length."""
+    return max(1, (bits + 63) // 64)
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _target_bias(target: Dict) -> int:
+    """Map the 'type' / 'bias_close' fields used by the generators to a bias code."""
+    if target.get("type") in ("biased", "unbiased"):
+        return BIAS_BIASED if target["type"] == "biased" else BIAS_UNBIASED
+    if "bias_close" in target:
+        return BIAS_BIASED if target["bias_close"] else BIAS_UNBIASED
+    return BIAS_UNKNOWN
+
+
+def _column_values(target_id, N: int, p: int, q: int, bits, tier: int,
+                   tier_type_code: int, bias: int) -> Dict:
+    """Target fields as decoded from the columns of one row."""
+    tier_type = _TIER_TYPE_NAMES.get(tier_type_code)
+    values = {
+        "id": target_id,
+        "N": str(N),
+        "N_bits": bits[0],
+        "p": str(p),
+        "q": str(q),
+        "p_bits": bits[1],
+        "q_bits": bits[2],
+        "tier_type": tier_type,
+    }
+    if tier >= 0:
+        values["fermat_tier" if tier_type == "fermat" else "tier"] = tier
+    if bias != BIAS_UNKNOWN:
+        values["bias_close"] = bias == BIAS_BIASED
+        values["type"] = "biased" if bias == BIAS_BIASED else "unbiased"
+    return values
+
+
+def _same_value(a, b) -> bool:
+    # True == 1 in Python; the round trip must not turn one into the other
+    return type(a) is type(b) and a == b
+
+
+def write_corpus(targets: List[Dict], path: Union[str, Path],
+                 metadata: Optional[Dict] = None) -> Path:
+    """
+    Write targets to a binary corpus file.
+
+    Args:
+        targets: Target dictionaries with at least 'N'; 'p', 'q', 'id',
+            'tier', 'type'/'bias_close' and bit lengths are used when present
+        path: Output file path
+        metadata: Corpus metadata stored as JSON alongside the columns
+
+    Fields the columns cannot reproduce exactly are stored in the extras
+    column, so TargetCorpus.row() returns a dict equal to the input target.
+
+    Returns:
+        Path of the written file
+    """
+    path = Path(path)
+    count = len(targets)
+
+    Ns = [int(t["N"]) for t in targets]
+    ps = [int(t.get("p", 0) or 0) for t in targets]
+    qs = [int(t.get("q", 0) or 0) for t in targets]
+    ids = [t.get("id", i) for i, t in enumerate(targets)]
+
+    n_limbs = _limbs_for(max((n.bit_length() for n in Ns), default=1))
+    f_limbs = _limbs_for(max((x.bit_length() for x in ps + qs), default=1))
+    flags = FLAG_INT_IDS if all(isinstance(i, int) for i in ids) else 0
+
+    bits = np.zeros((count, 3), dtype="<u2")
+    tier = np.full(count, -1, dtype="<i2")
+    tier_type = np.zeros(count, dtype="i1")
+    bias = np.full(count, BIAS_UNKNOWN, dtype="i1")
+    fields = np.zeros(count, dtype="<u2")
+    encoded_extras = []
+    for row, t in enumerate(targets):
+        bits[row] = (t.get("N_bits", Ns[row].bit_length()),
+                     t.get("p_bits", ps[row].bit_length()),
+                     t.get("q_bits", qs[row].bit_length()))
+        # Fermat tiers carry their number in 'fermat_tier' instead of 'tier'
+        tier_number = t.get("tier", t.get("fermat_tier"))
+        if tier_number is not None:
+            tier[row] = int(tier_number)
+        tier_type[row] = TIER_TYPES.get(t.get("tier_type"), 0)
+        bias[row] = _target_bias(t)
+
+        stored_id = ids[row] if flags & FLAG_INT_IDS else str(ids[row])
+        decoded = _column_values(stored_id, Ns[row], ps[row], qs[row],
+                                 [int(b) for b in bits[row]], int(tier[row]),
+                                 int(tier_type[row]), int(bias[row]))
+        mask = 0
+        for bit, key in enumerate(COLUMN_KEYS):
+            if key in t and key in decoded and _same_value(t[key], decoded[key]):
+                mask |= 1 << bit
+        fields[row] = mask
+        extras = {key: value for key, value in t.items()
+                  if not (key in COLUMN_KEYS and mask & (1 << COLUMN_KEYS.index(key)))}
+        encoded_extras.append(json.dumps(extras).encode() if extras else b"")
+
+    index = np.zeros(count, dtype=_INDEX_DTYPE)
+    index["hash"] = [_id_hash(i) for i in ids]
+    index["row"] = np.arange(count, dtype="<u8")
+    index.sort(order=("hash", "row"))
+
+    encoded_ids = [str(i).encode() for i in ids]
+    id_offsets = np.zeros(count + 1, dtype="<u8")
+    id_offsets[1:] = np.cumsum([len(b) for b in encoded_ids], dtype=np.uint64)
+    id_blob = b"".join(encoded_ids)
+    extra_offsets = np.zeros(count + 1, dtype="<u8")
+    extra_offsets[1:] = np.cumsum([len(b) for b in encoded_extras], dtype=np.uint64)
+    extra_blob = b"".join(encoded_extras)
+    meta_blob = json.dumps(metadata or {}).encode()
+
+    sections = [
+        b"".join(n.to_bytes(n_limbs * 8, "little") for n in Ns),
+        b"".join(p.to_bytes(f_limbs * 8, "little") for p in ps),
+        b"".join(q.to_bytes(f_limbs * 8, "little") for q in qs),
+        bits.tobytes(),
+        tier.tobytes(),
+        tier_type.tobytes(),
+        bias.tobytes(),
+        fields.tobytes(),
+        index.tobytes(),
+        id_offsets.tobytes(),
+        id_blob,
+        extra_offsets.tobytes(),
+        extra_blob,
+        meta_blob,
+    ]
+
+    offsets = []
+    position = _HEADER.size
+    for blob in sections:
+        position = _align(position)
+        offsets.append(position)
+        position += len(blob)
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, n_limbs, f_limbs, flags, count, *offsets))
+        for offset, blob in zip(offsets, sections):
+            f.write(b"\x00" * (offset - f.tell()))
+            f.write(blob)
+        # Trailing padding keeps the mmap non-empty for empty corpora
+        f.write(b"\x00" * (_align(f.tell()) - f.tell()))
+    tmp_path.replace(path)
+    return path
+
+
+def convert_json(json_path: Union[str, Path],
+                 out_path: Optional[Union[str, Path]] = None) -> Path:
+    """Convert a JSON target file ({'metadata': ..., 'targets': [...]}) to a corpus file."""
+    json_path = Path(json_path)
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    out_path = Path(out_path) if out_path else json_path.with_suffix(CORPUS_SUFFIX)
+    return write_corpus(data["targets"], out_path, data.get("metadata", {}))
+
+
+def is_corpus_file(path: Union[str, Path]) -> bool:
+    """Return True if path is a binary corpus file (checked by magic, not suffix)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class TargetCorpus:
+    """
+    Read-only, memory-mapped view of a corpus file.
+
+    Behaves like a sequence of target dicts: len(), iteration, integer
+    indexing and slicing all work, so it can stand in for the 'targets'
+    list of a JSON file.  Nothing is decoded until a row is accessed.
+
+    Example:
+        with TargetCorpus("targets_1500.ztc") as corpus:
+            target = corpus.get(42)          # random access by id
+            for t in corpus.shard(0, 4):     # this worker's quarter
+                ...
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{self.path} is empty, not a target corpus")
+
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{self.path} is too short to be a target corpus")
+        fields = _HEADER.unpack_from(self._mm, 0)
+        magic, version, self.n_limbs, self.f_limbs, self.flags, self.count = fields[:6]
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a target corpus (bad magic)")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported corpus version {version} in {self.path}")
+        self._offsets = dict(zip(_SECTIONS, fields[6:]))
+
+        self._n_width = self.n_limbs * 8
+        self._f_width = self.f_limbs * 8
+        self._bits = self._column("bits", "<u2", self.count * 3).reshape(self.count, 3)
+        self._tier = self._column("tier", "<i2", self.count)
+        self._tier_type = self._column("tier_type", "i1", self.count)
+        self._bias = self._column("bias", "i1", self.count)
+        self._fields = self._column("fields", "<u2", self.count)
+        self._index = self._column("index", _INDEX_DTYPE, self.count)
+        self._id_offsets = self._column("id_offsets", "<u8", self.count + 1)
+        self._extra_offsets = self._column("extra_offsets", "<u8", self.count + 1)
+        self._metadata = None
+
+    def _column(self, name: str, dtype, count: int) -> np.ndarray:
+        return np.frombuffer(self._mm, dtype=dtype, count=count,
+                             offset=self._offsets[name])
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def close(self):
+        """Release the mapping and the underlying file."""
+        # numpy views hold buffer exports on the mmap; drop them first
+        for attr in ("_bits", "_tier", "_tier_type", "_bias", "_fields", "_index",
+                     "_id_offsets", "_extra_offsets"):
+            self.__dict__.pop(attr, None)
+        mm = self.__dict__.pop("_mm", None)
+        if mm is not None:
+            mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- columns -----------------------------------------------------------
+
+    @property
+    def metadata(self) -> Dict:
+        """Corpus metadata (decoded on first access)."""
+        if self._metadata is None:
+            raw = self._mm[self._offsets["metadata"]:].rstrip(b"\x00")
+            self._metadata = json.loads(raw or b"{}")
+        return self._metadata
+
+    def N(self, row: int) -> int:
+        """Modulus of a row without building the full target dict."""
+        start = self._offsets["N"] + row * self._n_width
+        return int.from_bytes(self._mm[start:start + self._n_width], "little")
+
+    def factors(self, row: int) -> Tuple[int, int]:
+        """(p, q) of a row; zeros when the source corpus had no factors."""
+        p_start = self._offsets["p"] + row * self._f_width
+        q_start = self._offsets["q"] + row * self._f_width
+        p = int.from_bytes(self._mm[p_start:p_start + self._f_width], "little")
+        q = int.from_bytes(self._mm[q_start:q_start + self._f_width], "little")
+        return p, q
+
+    def target_id(self, row: int):
+        start, end = int(self._id_offsets[row]), int(self._id_offsets[row + 1])
+        base = self._offsets["id_blob"]
+        raw = self._mm[base + start:base + end].decode()
+        return int(raw) if self.flags & FLAG_INT_IDS else raw
+
+    def extras(self, row: int) -> Dict:
+        """Per-target fields stored outside the fixed-width columns."""
+        start, end = int(self._extra_offsets[row]), int(self._extra_offsets[row + 1])
+        if start == end:
+            return {}
+        base = self._offsets["extra_blob"]
+        return json.loads(self._mm[base + start:base + end])
+
+    def moduli(self, start: int = 0, stop: Optional[int] = None) -> Iterator[int]:
+        """Stream N for rows [start, stop) – cheapest way to scan a corpus."""
+        stop = self.count if stop is None else min(stop, self.count)
+        for row in range(start, stop):
+            yield self.N(row)
+
+    # -- rows --------------------------------------------------------------
+
+    def row(self, row: int) -> Dict:
+        """Decode one row into a target dict compatible with the JSON loaders."""
+        if not 0 <= row < self.count:
+            raise IndexError(f"row {row} out of range for corpus of {self.count}")
+        p, q = self.factors(row)
+        decoded = _column_values(self.target_id(row), self.N(row), p, q,
+                                 [int(b) for b in self._bits[row]],
+                                 int(self._tier[row]), int(self._tier_type[row]),
+                                 int(self._bias[row]))
+        mask = int(self._fields[row])
+        target = {key: decoded[key] for bit, key in enumerate(COLUMN_KEYS)
+                  if mask & (1 << bit)}
+        target.update(self.extras(row))
+        return target
+
+    def find_row(self, target_id) -> Optional[int]:
+        """Row number for a target id, or None (binary search on the index)."""
+        h = np.uint64(_id_hash(target_id))
+        hashes = self._index["hash"]
+        pos = int(np.searchsorted(hashes, h, side="left"))
+        wanted = str(target_id)
+        while pos < self.count and hashes[pos] == h:
+            row = int(self._index["row"][pos])
+            if str(self.target_id(row)) == wanted:
+                return row
+            pos += 1
+        return None
+
+    def get(self, target_id, default=None) -> Optional[Dict]:
+        """Random access by target id."""
+        row = self.find_row(target_id)
+        return default if row is None else self.row(row)
+
+    def iter_rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """Stream target dicts for rows [start, stop)."""
+        stop = self.count if stop is None else min(stop, self.count)
+        for row in range(start, stop):
+            yield self.row(row)
+
+    def shard_bounds(self, worker_index: int, num_workers: int) -> Tuple[int, int]:
+        """Contiguous [start, stop) row range owned by one of num_workers workers."""
+        if num_workers <= 0 or not 0 <= worker_index < num_workers:
+            raise ValueError(f"invalid shard {worker_index}/{num_workers}")
+        per_worker, extra = divmod(self.count, num_workers)
+        start = worker_index * per_worker + min(worker_index, extra)
+        stop = start + per_worker + (1 if worker_index < extra else 0)
+        return start, stop
+
+    def shard(self, worker_index: int, num_workers: int) -> Iterator[Dict]:
+        """Stream only this worker's slice of the corpus."""
+        return self.iter_rows(*self.shard_bounds(worker_index, num_workers))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_rows()
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.row(r) for r in range(*item.indices(self.count))]
+        if item < 0:
+            item += self.count
+        return self.row(item)
+
+
+def open_targets(filepath: Union[str, Path]) -> Tuple[Dict, Union[TargetCorpus, List[Dict]]]:
+    """
+    Open a target file of either format.
+
+    Returns (metadata, targets) where targets is a TargetCorpus for binary
+    corpora and the decoded list for JSON files.
+    """
+    if is_corpus_file(filepath):
+        corpus = TargetCorpus(filepath)
+        return corpus.metadata, corpus
+    with open(filepath, "r") as f:
+        data = json.load(f)
+    return data.get("metadata", {}), data["targets"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary target corpus tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="Convert a JSON target file to a corpus")
+    convert.add_argument("json_file")
+    convert.add_argument("output", nargs="?", default=None)
+
+    info = sub.add_parser("info", help="Show corpus header and first rows")
+    info.add_argument("corpus_file")
+    info.add_argument("--rows", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        out = convert_json(args.json_file, args.output)
+        with TargetCorpus(out) as corpus:
+            print(f"✓ Wrote {len(corpus)} targets to {out} "
+                  f"({out.stat().st_size} bytes, N limbs={corpus.n_limbs})")
+        return 0
+
+    with TargetCorpus(args.corpus_file) as corpus:
+        print(f"Corpus: {corpus.path}")
+        print(f"  Targets: {len(corpus)}")
+        print(f"  Limbs: N={corpus.n_limbs}, p/q={corpus.f_limbs}")
+        print(f"  Metadata: {json.dumps(corpus.metadata)}")
+        for target in corpus.iter_rows(0, args.rows):
+            print(f"  {target['id']}: N={target['N'][:24]}... ({target['N_bits']} bits)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
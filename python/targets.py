@@ -1,11 +1,12 @@
 import json
 from pathlib import Path
 
+TARGETS_FILE = Path("python/targets_filtered.json")
+
 def load_256bit_targets(count: int):
     """
     Load up to 'count' targets from targets_filtered.json
     """
-    ts = Path("python/targets_filtered.json")
-    data = json.loads(ts.read_text())
+    data = json.loads(TARGETS_FILE.read_text())
     targets = [int(x['N']) for x in data["targets"][:count]]
     return targets
\ No newline at end of file
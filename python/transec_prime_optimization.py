@@ -12,10 +12,19 @@ Mathematical Foundation:
 - Discrete curvature: κ(n) = d(n) · ln(n+1) / e²
 - For prime n: d(n) = 2 (only divisors are 1 and n)
 - Lower κ indicates more stable synchronization paths
+
+Slot indices are ~3.5×10^8 for 5 s slots, where trial division costs
+thousands of divisions per candidate.  normalize_slot_to_prime therefore
+keeps a segmented sieve (PrimeSieveWindow) over the slots around the
+current one and slides it forward as time advances; primality and
+next/previous-prime queries inside the window are table lookups.  A few
+windows are kept in LRU order, so callers alternating between slot
+ranges (e.g. ciphers with different slot durations) each keep theirs.
 """
 
 import math
-from typing import Optional, Dict
+from itertools import compress
+from typing import List, Optional, Dict, Tuple
 try:
     from mpmath import mp, mpf, log as mp_log
     MPMATH_AVAILABLE = True
@@ -28,6 +37,168 @@ _prime_cache: Dict[int, int] = {
     1: 2, 2: 2, 3: 3, 4: 5, 5: 5, 6: 7, 7: 7, 8: 7, 9: 11, 10: 11
 }
 
+DEFAULT_SIEVE_SPAN = 1 << 16  # Integers covered by the slot sieve (~3.8 days of 5 s slots)
+SIEVE_MARGIN = 1 << 12  # Kept below the slot for previous-prime lookups (> any prime gap < 2^64)
+MAX_BASE_PRIME = 1 << 22  # Sieve / factor with base primes up to here (n < 2^44)
+SIEVE_WINDOWS = 4  # Slot sieve windows kept at once, most recently used first
+
+# Odd primes up to _base_limit, grown on demand
+_base_primes: List[int] = []
+_base_limit = 0
+
+# Windows the slot normalizations run against, most recently used first.
+# Replaced as a whole (never mutated) so readers need no lock.
+_slot_sieves: Tuple["PrimeSieveWindow", ...] = ()
+
+
+def _odd_primes_upto(limit: int) -> List[int]:
+    """Odd primes <= limit (the returned list may extend further)."""
+    global _base_primes, _base_limit
+    if limit > _base_limit:
+        new_limit = max(limit, 2 * _base_limit, 1 << 15)
+        sieve = bytearray([1]) * (new_limit + 1)
+        sieve[0:2] = b"\x00\x00"
+        for i in range(2, math.isqrt(new_limit) + 1):
+            if sieve[i]:
+                sieve[i * i::i] = bytes(len(range(i * i, new_limit + 1, i)))
+        # Publish the list before the limit so concurrent readers never see
+        # a limit the list doesn't reach
+        _base_primes = list(compress(range(3, new_limit + 1, 2), sieve[3::2]))
+        _base_limit = new_limit
+    return _base_primes
+
+
+def _sieve_odd(lo: int, hi: int) -> bytearray:
+    """
+    Sieve the odd numbers in [lo, hi) (lo even).
+    
+    Returns:
+        bytearray where entry i is 1 iff lo + 2i + 1 is prime
+    """
+    count = (hi - lo) // 2
+    odd = bytearray([1]) * count
+    if lo == 0 and count:
+        odd[0] = 0  # 1 is not prime
+    for p in _odd_primes_upto(math.isqrt(hi - 1)):
+        square = p * p
+        if square >= hi:
+            break
+        first = max(square, (lo + p - 1) // p * p)
+        if first % 2 == 0:
+            first += p
+        # Consecutive odd multiples are 2p apart, i.e. p entries apart
+        i = (first - lo - 1) // 2
+        if i < count:
+            odd[i::p] = bytes(len(range(i, count, p)))
+    return odd
+
+
+class PrimeSieveWindow:
+    """
+    Segmented sieve of Eratosthenes over [start, stop).
+    
+    Holds one byte per odd number, so sieving is slice assignment and
+    next/previous-prime lookups are a bytearray find/rfind over at most
+    one prime gap.  advance() slides the window forward, re-using the
+    overlap and sieving only the new segment.
+    """
+    
+    __slots__ = ("start", "stop", "_odd")
+    
+    def __init__(self, start: int, span: int = DEFAULT_SIEVE_SPAN):
+        start = max(0, start) & ~1
+        span += span & 1
+        if math.isqrt(start + span) > MAX_BASE_PRIME:
+            raise ValueError("sieve window beyond MAX_BASE_PRIME**2")
+        self.start = start
+        self.stop = start + span
+        self._odd = _sieve_odd(start, self.stop)
+    
+    def __contains__(self, n: int) -> bool:
+        return self.start <= n < self.stop
+    
+    def __repr__(self) -> str:
+        return f"PrimeSieveWindow({self.start}, {self.stop - self.start})"
+    
+    def is_prime(self, n: int) -> bool:
+        """Primality of n (must be inside the window)."""
+        if n % 2 == 0:
+            return n == 2
+        return self._odd[(n - self.start - 1) // 2] == 1
+    
+    def next_prime(self, n: int) -> Optional[int]:
+        """Smallest prime >= n, or None if it lies beyond the window."""
+        n = max(n, self.start)
+        if n <= 2 < self.stop:
+            return 2
+        j = self._odd.find(1, (n - self.start) // 2)
+        return None if j < 0 else self.start + 2 * j + 1
+    
+    def prev_prime(self, n: int) -> Optional[int]:
+        """Largest prime <= n, or None if it lies before the window."""
+        n = min(n, self.stop - 1)
+        if n <= self.start:
+            return 2 if n == 2 else None
+        j = self._odd.rfind(1, 0, (n - self.start - 1) // 2 + 1)
+        if j >= 0:
+            return self.start + 2 * j + 1
+        return 2 if self.start <= 2 <= n else None
+    
+    def advance(self, start: int) -> "PrimeSieveWindow":
+        """
+        Window of the same span starting at `start`.
+        
+        A new object is returned (readers holding this one are unaffected);
+        when the windows overlap only the uncovered tail is sieved.
+        """
+        span = self.stop - self.start
+        start = max(0, start) & ~1
+        if not (self.start <= start < self.stop):
+            return PrimeSieveWindow(start, span)
+        window = PrimeSieveWindow.__new__(PrimeSieveWindow)
+        window.start = start
+        window.stop = start + span
+        window._odd = self._odd[(start - self.start) // 2:] + _sieve_odd(self.stop, window.stop)
+        return window
+
+
+def _window_containing(n: int) -> Optional[PrimeSieveWindow]:
+    for window in _slot_sieves:
+        if window.start <= n < window.stop:
+            return window
+    return None
+
+
+def slot_sieve(slot_index: int) -> Optional[PrimeSieveWindow]:
+    """
+    Slot sieve window covering slot_index, sliding it forward if needed.
+    
+    The window keeps SIEVE_MARGIN slots below slot_index (for previous
+    primes and late packets) and the rest of its span ahead of it.  A
+    slot within SIEVE_MARGIN of a window's top slides that window
+    forward; a slot no window is near gets a new one, evicting the least
+    recently used beyond SIEVE_WINDOWS.
+    
+    Returns:
+        The window, or None if slot_index is too large to sieve
+    """
+    global _slot_sieves
+    windows = _slot_sieves
+    for window in windows:
+        if (window.start == 0 or window.start + SIEVE_MARGIN <= slot_index) \
+                and slot_index < window.stop - SIEVE_MARGIN:
+            if window is not windows[0]:
+                _slot_sieves = (window,) + tuple(w for w in windows if w is not window)
+            return window
+    start = slot_index - SIEVE_MARGIN
+    if math.isqrt(max(start, 0) + DEFAULT_SIEVE_SPAN) > MAX_BASE_PRIME:
+        return None
+    near_top = next((w for w in windows if w.stop - SIEVE_MARGIN <= slot_index < w.stop), None)
+    window = near_top.advance(start) if near_top is not None else PrimeSieveWindow(start)
+    rest = tuple(w for w in windows if w is not near_top)
+    _slot_sieves = (window,) + rest[:SIEVE_WINDOWS - 1]
+    return window
+
 
 def count_divisors(n: int) -> int:
     """
@@ -44,6 +215,31 @@ def count_divisors(n: int) -> int:
     if n == 1:
         return 1
     
+    window = _window_containing(n)
+    if window is not None and window.is_prime(n):
+        return 2
+    
+    root = math.isqrt(n)
+    if root <= MAX_BASE_PRIME:
+        # d(n) = Π (e_i + 1) over the prime factorization, using the
+        # base primes instead of every i up to √n
+        count = 1
+        exponent = (n & -n).bit_length() - 1
+        m = n >> exponent
+        count *= exponent + 1
+        for p in _odd_primes_upto(root):
+            if p * p > m:
+                break
+            if m % p == 0:
+                exponent = 0
+                while m % p == 0:
+                    m //= p
+                    exponent += 1
+                count *= exponent + 1
+        if m > 1:
+            count *= 2
+        return count
+    
     count = 0
     sqrt_n = int(math.sqrt(n))
     
@@ -77,6 +273,10 @@ def is_prime(n: int) -> bool:
     if n % 3 == 0:
         return False
     
+    window = _window_containing(n)
+    if window is not None:
+        return window.is_prime(n)
+    
     # Check divisibility by numbers of form 6k±1 up to sqrt(n)
     # This is more efficient than checking all odd numbers
     i = 5
@@ -125,6 +325,12 @@ def find_next_prime(n: int) -> int:
     if n in _prime_cache:
         return _prime_cache[n]
     
+    window = _window_containing(n)
+    if window is not None:
+        found = window.next_prime(n)
+        if found is not None:
+            return found
+    
     if n <= 2:
         result = 2
         _prime_cache[n] = result
@@ -167,6 +373,12 @@ def find_nearest_prime(n: int) -> int:
     # Find next prime
     next_p = find_next_prime(n)
     
+    window = _window_containing(n)
+    if window is not None:
+        prev_p = window.prev_prime(n - 1)
+        if prev_p is not None:
+            return next_p if next_p - n <= n - prev_p else prev_p
+    
     # Find previous prime by searching backwards (search all the way to 2)
     prev_p = n - 1 if n > 2 else 2
     search_limit = 2  # Search all the way back to 2 to ensure correctness
@@ -204,6 +416,9 @@ def normalize_slot_to_prime(slot_index: int, strategy: str = "nearest") -> int:
     if strategy == "none" or slot_index < 2:
         return slot_index
     
+    # Keep the sieve window on the current slots
+    slot_sieve(slot_index)
+    
     if is_prime(slot_index):
         return slot_index
     
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+TCP work queue for spreading batch factorization over several machines.
+
+A coordinator (WorkQueueServer) holds the pending tasks; workers
+(run_worker) connect over TCP, lease one task at a time, send heartbeats
+while they work and push the result back.  Leases expire: if a worker
+crashes or loses its network, its task goes back on the queue after
+lease_seconds without a heartbeat and another worker picks it up.
+
+Protocol: one JSON object per line, one reply line per request, one
+short-lived connection per request (so coordinator restarts and flaky
+links only cost a retry):
+
+    {"op": "lease", "worker": w}                  -> {"task": {...} | null, "done": bool}
+    {"op": "heartbeat", "worker": w, "task_id": t} -> {"ok": bool}
+    {"op": "result", "worker": w, "task_id": t, "result": {...}} -> {"ok": bool}
+    {"op": "status"}                               -> {"pending": n, "leased": n, ...}
+
+Tasks are served lowest priority value first; the payload is opaque to
+the queue (batch_factor sends the target plus its time-slice state).
+
+Example:
+    server = WorkQueueServer(port=7777).start()
+    server.put("t1", {"N": "..."}, priority=1.0)
+    task_id, payload, result = server.results.get()
+
+    # on each node
+    run_worker(("coordinator", 7777), lambda payload: {"success": False})
+"""
+
+import heapq
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+DEFAULT_LEASE_SECONDS = 120
+_MAX_LINE = 16 * 1024 * 1024
+
+
+def parse_address(spec: str) -> Tuple[str, int]:
+    """'host:port' (or ':port' / 'port' for all interfaces) -> (host, port)."""
+    host, _, port = spec.rpartition(":")
+    return (host or "0.0.0.0", int(port))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline(_MAX_LINE)
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            reply = self.server.queue_server.dispatch(request)
+        except (ValueError, KeyError, TypeError) as e:
+            reply = {"error": str(e)}
+        self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class WorkQueueServer:
+    """
+    Coordinator side: pending heap, active leases and a result queue.
+
+    Completed results arrive on `results` as (task_id, payload, result);
+    the coordinator decides whether to put() follow-up work.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.lease_seconds = lease_seconds
+        self.results: "queue.Queue[Tuple[str, Dict, Dict]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._pending = []                      # (priority, seq, task_id)
+        self._tasks: Dict[str, Tuple[float, Dict]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}   # task_id -> (worker, expiry)
+        self._finished = False
+        self.requeued = 0
+        self._server = _TCPServer((host, port), _Handler)
+        self._server.queue_server = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def start(self) -> "WorkQueueServer":
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="work-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    # -- queue --------------------------------------------------------------
+
+    def put(self, task_id: str, payload: Dict, priority: float = 0.0) -> None:
+        """Queue a task (replacing any earlier task with the same id)."""
+        with self._lock:
+            self._tasks[task_id] = (priority, payload)
+            self._leases.pop(task_id, None)
+            heapq.heappush(self._pending, (priority, next(self._seq), task_id))
+
+    def finish(self) -> None:
+        """Tell workers asking for work that the batch is complete."""
+        with self._lock:
+            self._finished = True
+
+    def outstanding(self) -> int:
+        with self._lock:
+            return len(self._tasks)
+
+    def _expire_leases(self, now: float) -> None:
+        for task_id, (_, expiry) in list(self._leases.items()):
+            if expiry <= now:
+                del self._leases[task_id]
+                priority, _ = self._tasks[task_id]
+                heapq.heappush(self._pending, (priority, next(self._seq), task_id))
+                self.requeued += 1
+
+    # -- protocol -----------------------------------------------------------
+
+    def dispatch(self, request: Dict) -> Dict:
+        op = request["op"]
+        now = time.time()
+        with self._lock:
+            self._expire_leases(now)
+            if op == "lease":
+                while self._pending:
+                    _, _, task_id = heapq.heappop(self._pending)
+                    if task_id in self._tasks and task_id not in self._leases:
+                        self._leases[task_id] = (request["worker"], now + self.lease_seconds)
+                        return {"task": {"task_id": task_id, "payload": self._tasks[task_id][1]},
+                                "lease_seconds": self.lease_seconds}
+                return {"task": None, "done": self._finished and not self._tasks}
+            if op == "heartbeat":
+                lease = self._leases.get(request["task_id"])
+                if lease is None or lease[0] != request["worker"]:
+                    return {"ok": False}
+                self._leases[request["task_id"]] = (lease[0], now + self.lease_seconds)
+                return {"ok": True}
+            if op == "result":
+                task_id = request["task_id"]
+                lease = self._leases.get(task_id)
+                if lease is None or lease[0] != request["worker"]:
+                    # Completed elsewhere, or the lease expired and the task
+                    # (possibly re-put as its next slice) now belongs to
+                    # another worker: this result is stale
+                    return {"ok": False}
+                del self._leases[task_id]
+                _, payload = self._tasks.pop(task_id)
+                self.results.put((task_id, payload, request["result"]))
+                return {"ok": True}
+            if op == "status":
+                return {"pending": len(self._tasks) - len(self._leases),
+                        "leased": len(self._leases), "requeued": self.requeued,
+                        "finished": self._finished}
+        raise ValueError(f"unknown op {op!r}")
+
+
+# -- worker side ---------------------------------------------------------------
+
+def request(address: Tuple[str, int], message: Dict, timeout: float = 30.0) -> Dict:
+    """Send one request line and return the decoded reply."""
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode())
+        with sock.makefile("rb") as f:
+            line = f.readline(_MAX_LINE)
+    if not line:
+        raise ConnectionError("coordinator closed the connection")
+    return json.loads(line)
+
+
+def run_worker(address: Tuple[str, int], handler: Callable[[Dict], Dict],
+               worker_id: Optional[str] = None, idle_wait: float = 1.0,
+               max_tasks: Optional[int] = None, connect_retries: int = 30) -> int:
+    """
+    Lease tasks from a coordinator until it reports the batch done.
+
+    handler(payload) runs in the calling thread while a background thread
+    heartbeats the lease every lease_seconds / 3.
+
+    Args:
+        address: Coordinator (host, port)
+        handler: Computes the result dict for one task payload
+        worker_id: Name reported to the coordinator (default: host:pid:random)
+        idle_wait: Seconds to wait when every task is leased out
+        max_tasks: Stop after this many tasks (default: no limit)
+        connect_retries: Consecutive failed connections before giving up
+
+    Returns:
+        Number of tasks completed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    completed = 0
+    failures = 0
+    while max_tasks is None or completed < max_tasks:
+        try:
+            reply = request(address, {"op": "lease", "worker": worker_id})
+            failures = 0
+        except OSError:
+            failures += 1
+            if failures >= connect_retries:
+                break
+            time.sleep(idle_wait)
+            continue
+        task = reply.get("task")
+        if task is None:
+            if reply.get("done"):
+                break
+            time.sleep(idle_wait)
+            continue
+
+        stop = threading.Event()
+        interval = max(0.05, reply.get("lease_seconds", DEFAULT_LEASE_SECONDS) / 3)
+
+        def heartbeat(task_id=task["task_id"]):
+            while not stop.wait(interval):
+                try:
+                    request(address, {"op": "heartbeat", "worker": worker_id, "task_id": task_id})
+                except OSError:
+                    pass
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            result = handler(task["payload"])
+        finally:
+            stop.set()
+            beat.join()
+        for attempt in range(connect_retries):
+            try:
+                request(address, {"op": "result", "worker": worker_id,
+                                  "task_id": task["task_id"], "result": result})
+                break
+            except OSError:
+                time.sleep(idle_wait)
+        completed += 1
+    return completed
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the asyncio ECM / CADO-NFS orchestrator.
+
+A stand-in 'ecm' script sleeps, then "finds" 1009 only for one lucky sigma,
+which lets the tests check concurrency limits, timeouts and cancellation
+without gmp-ecm installed.
+"""
+
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import sympy
+
+import ecm_backend
+from async_orchestrator import AsyncOrchestrator
+from cado_result import extract_factors
+
+FAKE_ECM = '''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+curves = int(args[args.index("-c") + 1])
+sigma = int(args[args.index("-sigma") + 1]) if "-sigma" in args else None
+N = int(sys.stdin.readline())
+print("GMP-ECM fake", flush=True)
+time.sleep(float(os.environ.get("FAKE_ECM_DELAY", "0.3")))
+lucky = int(os.environ.get("FAKE_ECM_LUCKY", "-1"))
+if sigma is not None and sigma <= lucky < sigma + curves and N % 1009 == 0:
+    print(f"1009 {{N // 1009}}", flush=True)
+    time.sleep(30)  # a streaming parser must not wait for exit
+else:
+    print(N)
+'''
+
+N = 1009 * 1000003
+
+
+class TestOrchestrator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmpdir.name)
+        self.ecm = tmp / 'ecm'
+        self.ecm.write_text(FAKE_ECM.format(python=sys.executable))
+        self.ecm.chmod(self.ecm.stat().st_mode | stat.S_IEXEC)
+        self.old_env = dict(os.environ)
+        self.old_backend = ecm_backend.BACKEND
+        ecm_backend.BACKEND = "gmp-ecm"
+
+    def tearDown(self):
+        ecm_backend.BACKEND = self.old_backend
+        os.environ.clear()
+        os.environ.update(self.old_env)
+        self.tmpdir.cleanup()
+
+    def test_bounded_concurrency(self):
+        orch = AsyncOrchestrator(max_concurrency=3, ecm_bin=str(self.ecm))
+        moduli = [N + 2 * i for i in range(1, 7)]
+
+        start = time.time()
+        results = asyncio.run(orch.factor_many(moduli, [(11000, 5)]))
+        elapsed = time.time() - start
+        self.assertEqual(orch.peak_running, 3)
+        self.assertTrue(all(f is None for f in results.values()))
+        # 6 jobs of 0.3 s, 3 at a time: two waves
+        self.assertGreater(elapsed, 0.55)
+        self.assertLess(elapsed, 5)
+
+    def test_streaming_factor_and_sibling_cancel(self):
+        sigma = ecm_backend._compute_sigma_u64(N, 11000)
+        os.environ['FAKE_ECM_LUCKY'] = str(sigma + 7)
+        orch = AsyncOrchestrator(max_concurrency=4, ecm_bin=str(self.ecm))
+        start = time.time()
+        factor = asyncio.run(orch.factor_one(N, [(11000, 8)], timeout_sec=60, split=4))
+        self.assertEqual(factor, 1009)
+        # The lucky process keeps running for 30 s after printing; it was killed
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(orch.running, 0)
+
+    def test_job_timeout(self):
+        os.environ['FAKE_ECM_DELAY'] = '30'
+        orch = AsyncOrchestrator(max_concurrency=2, ecm_bin=str(self.ecm))
+        start = time.time()
+        self.assertIsNone(asyncio.run(orch.ecm(N, 11000, 1, timeout_sec=0.5)))
+        self.assertLess(time.time() - start, 5)
+
+    def test_missing_binary(self):
+        orch = AsyncOrchestrator(ecm_bin=str(Path(self.tmpdir.name) / 'nope'))
+        self.assertIsNone(asyncio.run(orch.ecm(N, 11000, 1, timeout_sec=5)))
+
+
+class TestPythonFallback(unittest.TestCase):
+
+    def test_pyecm_backend(self):
+        old = ecm_backend.BACKEND
+        ecm_backend.BACKEND = "pyecm"
+        orch = AsyncOrchestrator(max_concurrency=2)
+        try:
+            p = sympy.nextprime(10**9)
+            n = p * sympy.nextprime(10**30)
+            results = asyncio.run(orch.factor_many([n], [(2000, 40)], timeout_sec=60))
+            self.assertEqual(results[n], p)
+        finally:
+            orch.close()
+            ecm_backend.BACKEND = old
+
+    def test_cancelled_pyecm_job_frees_its_worker(self):
+        """A cancelled job stops after its current curve, not at its timeout."""
+        old = ecm_backend.BACKEND
+        ecm_backend.BACKEND = "pyecm"
+        orch = AsyncOrchestrator(max_concurrency=1)
+        hard = sympy.nextprime(2**100) * sympy.nextprime(2**101)
+        p = sympy.nextprime(10**9)
+        easy = p * sympy.nextprime(10**30)
+
+        async def scenario():
+            job = orch.submit('hard', orch.ecm(hard, 20000, 10000, timeout_sec=60))
+            await asyncio.sleep(1.0)
+            self.assertEqual(orch.cancel('hard'), 1)
+            start = time.time()
+            factor = await orch.ecm(easy, 2000, 40, timeout_sec=60)
+            return job, factor, time.time() - start
+
+        try:
+            job, factor, elapsed = asyncio.run(scenario())
+            self.assertTrue(job.cancelled())
+            self.assertEqual(factor, p)
+            self.assertLess(elapsed, 20)
+        finally:
+            orch.close()
+            ecm_backend.BACKEND = old
+
+
+class TestCadoWatcher(unittest.TestCase):
+
+    def test_ingests_new_files(self):
+        p, q = 1000003, 1000033
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / 'old.out').write_text('Info: nothing yet\n')
+            seen = []
+
+            async def scenario():
+                stop = asyncio.Event()
+                orch = AsyncOrchestrator()
+                watcher = asyncio.ensure_future(orch.watch_cado(
+                    tmp, lambda path, a, b: seen.append((path.name, a, b)),
+                    moduli={'rsa-x': p * q}, poll_interval=0.05, stop=stop))
+                await asyncio.sleep(0.2)
+                (tmp / 'rsa-x.out').write_text(f'Info:Complete Factorization\n{p} {q}\n')
+                await asyncio.sleep(0.3)
+                stop.set()
+                await watcher
+
+            asyncio.run(scenario())
+            self.assertIn(('rsa-x.out', str(p), str(q)), seen)
+            self.assertNotIn('old.out', [s[0] for s in seen])
+            self.assertEqual(len([s for s in seen if s[0] == 'rsa-x.out']), 1)
+
+    def test_rejects_pairs_that_do_not_multiply_to_N(self):
+        p, q = 1000003, 1000033
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            (tmp / 'rsa-x.log').write_text('Info: elapsed 12 34\n1000 2000\n')
+            (tmp / 'rsa-y.out').write_text(f'{p} {q}\n')  # no modulus for rsa-y
+            (tmp / 'rsa-z.out').write_text(f'{p * q} 1\n')
+            seen = []
+
+            async def scenario():
+                stop = asyncio.Event()
+                watcher = asyncio.ensure_future(AsyncOrchestrator().watch_cado(
+                    tmp, lambda path, a, b: seen.append(path.name),
+                    moduli={'rsa-x': p * q, 'rsa-z': p * q}, poll_interval=0.05, stop=stop))
+                await asyncio.sleep(0.2)
+                stop.set()
+                await watcher
+
+            asyncio.run(scenario())
+            self.assertEqual(seen, [])
+            self.assertEqual(extract_factors(tmp / 'rsa-y.out', p * q), (str(p), str(q)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for batch_factor scheduling: shortest-expected-first ordering,
+unordered completion and resumable time slices.
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import sympy
+
+from batch_factor import expected_cost, run_batch_factorization
+from factor_256bit import PROBE_SLICES, factor_single_target
+
+
+def make_target(target_id, gap, target_type):
+    p = sympy.nextprime(2**127 + len(target_id) * 2**90)
+    q = sympy.nextprime(p + gap)
+    return {'id': target_id, 'N': str(p * q), 'p': str(p), 'q': str(q), 'type': target_type}
+
+
+# Unbiased targets here are hard: q ≈ 1.6·p, out of reach of Fermat and Hart
+HARD = 5 * 2**125 + 2**100
+
+
+class TestResume(unittest.TestCase):
+
+    def test_timeout_returns_resume_state(self):
+        t = make_target('hard', HARD, 'unbiased')
+        first = factor_single_target(int(t['N']), timeout=0.5, target_type='unbiased', budget=100)
+        self.assertFalse(first['success'])
+        self.assertIsNotNone(first['resume'])
+        self.assertEqual(first['resume']['budget'], 100)
+
+        second = factor_single_target(int(t['N']), timeout=0.5, target_type='unbiased',
+                                      resume=first['resume'])
+        # Probes that already ran are not repeated
+        done = first['resume']['probes_done']
+        self.assertGreater(done, 0)
+        skipped = {m for m, _ in PROBE_SLICES[:done]}
+        self.assertFalse(skipped & {s['method'] for s in second['stages']})
+
+    def test_slices_do_not_repeat_work(self):
+        t = make_target('hard', HARD, 'unbiased')
+        N = int(t['N'])
+        resume = None
+        positions = []
+        for _ in range(5):
+            result = factor_single_target(N, timeout=1.0, target_type='unbiased', budget=20,
+                                          resume=resume)
+            resume = result['resume']
+            if {s['method'] for s in result['stages']} == {'ecm'}:
+                positions.append((resume['ecm_level'], resume['ecm_curves']))
+        # Main-budget ECM slices pick up at the curve the previous one reached
+        self.assertGreaterEqual(len(positions), 2)
+        self.assertEqual(positions, sorted(positions))
+        self.assertGreater(positions[-1], positions[0])
+        self.assertIn('a', resume['fermat'])
+        self.assertIn('walk', resume['rho'])
+
+    def test_success_has_no_resume(self):
+        t = make_target('easy', 2**40, 'biased')
+        result = factor_single_target(int(t['N']), timeout=10, target_type='biased')
+        self.assertTrue(result['success'])
+        self.assertIsNone(result['resume'])
+
+
+class TestWorkStealing(unittest.TestCase):
+
+    def test_biased_sorts_first(self):
+        biased = make_target('b', 2**40, 'biased')
+        unbiased = make_target('u', HARD, 'unbiased')
+        self.assertLess(expected_cost(biased, 300), expected_cost(unbiased, 3600))
+
+    def test_short_targets_complete_before_long(self):
+        targets = [make_target('u' * (i + 1), HARD, 'unbiased') for i in range(2)]
+        targets += [make_target('b' * (i + 1), 2**50, 'biased') for i in range(3)]
+        results = run_batch_factorization(targets, timeout_unbiased=2, timeout_biased=10,
+                                          num_workers=2, verbose=False, batch_gcd=False,
+                                          slice_seconds=0.5)
+        self.assertEqual(len(results), 5)
+        order = [r['target_type'] for r in results]
+        self.assertEqual(order[:3], ['biased'] * 3)
+        for r in results:
+            if r['target_type'] == 'biased':
+                self.assertTrue(r['correct'])
+                self.assertEqual(r['slices'], 1)
+            else:
+                self.assertFalse(r['success'])
+                self.assertGreater(r['slices'], 1)
+                self.assertNotIn('resume', r)
+
+
+if __name__ == '__main__':
+    unittest.main()
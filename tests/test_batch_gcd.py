@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the batch GCD pre-stage.
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import sympy
+
+from batch_gcd import batch_gcd, find_shared_factors, product_tree
+from batch_factor import run_batch_factorization
+
+
+def primes(count, bits=64, start=0):
+    out = []
+    p = sympy.nextprime(2**(bits - 1) + start)
+    for _ in range(count):
+        out.append(p)
+        p = sympy.nextprime(p + 2**20)
+    return out
+
+
+class TestBatchGCD(unittest.TestCase):
+
+    def test_matches_naive(self):
+        ps = primes(12)
+        moduli = [ps[0] * ps[1], ps[2] * ps[3], ps[0] * ps[4], ps[5] * ps[6], ps[7] * ps[8]]
+        naive = []
+        for i, n in enumerate(moduli):
+            rest = 1
+            for j, m in enumerate(moduli):
+                if j != i:
+                    rest *= m
+            naive.append(sympy.gcd(n, rest))
+        self.assertEqual(batch_gcd(moduli), naive)
+
+    def test_levels_spilled_to_disk(self):
+        moduli = [p * q for p, q in zip(primes(5), primes(5, start=2**40))]
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = product_tree(moduli, tmp)
+            self.assertEqual(len(paths), 4)  # 5 → 3 → 2 → 1
+            self.assertTrue(all(p.exists() for p in paths))
+
+    def test_shared_prime_and_duplicates(self):
+        ps = primes(10)
+        moduli = [ps[0] * ps[1], ps[2] * ps[3], ps[0] * ps[4], ps[2] * ps[3], ps[5] * ps[6]]
+        shared = find_shared_factors(moduli)
+        self.assertEqual(shared, {0: (ps[0], ps[1]), 2: (ps[0], ps[4])})
+
+    def test_both_primes_shared(self):
+        """Moduli whose batch GCD is N itself are split pairwise."""
+        a, b, c = primes(3)
+        shared = find_shared_factors([a * b, a * c, b * c, primes(1, start=2**50)[0] ** 2 + 2])
+        self.assertEqual(set(shared), {0, 1, 2})
+        for i, (p, q) in shared.items():
+            self.assertEqual(p * q, [a * b, a * c, b * c][i])
+
+    def test_single_modulus(self):
+        self.assertEqual(batch_gcd([15]), [1])
+        self.assertEqual(find_shared_factors([]), {})
+
+
+class TestBatchPrestage(unittest.TestCase):
+
+    def test_prestage_factors_shared_targets(self):
+        ps = primes(4, bits=128)
+        targets = [
+            {'id': 1, 'N': str(ps[0] * ps[1]), 'p': str(ps[0]), 'q': str(ps[1]), 'type': 'unbiased'},
+            {'id': 2, 'N': str(ps[0] * ps[2]), 'p': str(ps[0]), 'q': str(ps[2]), 'type': 'unbiased'},
+        ]
+        results = run_batch_factorization(targets, timeout_unbiased=1, timeout_biased=1,
+                                          verbose=False)
+        self.assertEqual(len(results), 2)
+        for r in results:
+            self.assertEqual(r['method'], 'batch_gcd')
+            self.assertTrue(r['correct'])
+
+    def test_prestage_keeps_idless_targets(self):
+        """A shared-factor hit must not drop other targets that have no id."""
+        ps = primes(3, bits=128)
+        small = primes(2, bits=24)
+        targets = [
+            {'N': str(ps[0] * ps[1]), 'p': str(ps[0]), 'q': str(ps[1]), 'type': 'unbiased'},
+            {'N': str(ps[0] * ps[2]), 'p': str(ps[0]), 'q': str(ps[2]), 'type': 'unbiased'},
+            {'N': str(small[0] * small[1]), 'p': str(small[0]), 'q': str(small[1]),
+             'type': 'unbiased'},
+        ]
+        results = run_batch_factorization(targets, timeout_unbiased=5, timeout_biased=5,
+                                          verbose=False)
+        self.assertEqual(sorted(r['target_id'] for r in results), ['0', '1', '2'])
+        by_id = {r['target_id']: r for r in results}
+        self.assertNotEqual(by_id['2']['method'], 'batch_gcd')
+        self.assertTrue(by_id['2']['correct'])
+
+    def test_prestage_disabled(self):
+        ps = primes(3, bits=128)
+        targets = [
+            {'id': 1, 'N': str(ps[0] * ps[1]), 'p': str(ps[0]), 'q': str(ps[1]), 'type': 'unbiased'},
+            {'id': 2, 'N': str(ps[0] * ps[2]), 'p': str(ps[0]), 'q': str(ps[2]), 'type': 'unbiased'},
+        ]
+        results = run_batch_factorization(targets, timeout_unbiased=0.5, timeout_biased=0.5,
+                                          verbose=False, batch_gcd=False)
+        self.assertNotIn('batch_gcd', [r['method'] for r in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the append-only JSONL checkpoint log.
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+from checkpoint_log import CheckpointLog, latest_per_target
+from batch_factor import load_checkpoint, save_checkpoint
+
+
+class TestCheckpointLog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'checkpoint.jsonl'
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_append_and_replay(self):
+        with CheckpointLog(self.path, fsync_every=2) as log:
+            for i in range(5):
+                log.append({'target_id': str(i), 'success': i % 2 == 0})
+        records = CheckpointLog(self.path).replay()
+        self.assertEqual([r['target_id'] for r in records], ['0', '1', '2', '3', '4'])
+        self.assertEqual(len(self.path.read_text().splitlines()), 5)
+
+    def test_appends_visible_before_close(self):
+        """A crash after append() must not lose the record."""
+        log = CheckpointLog(self.path, fsync_every=100, fsync_interval=3600)
+        log.append({'target_id': '1'})
+        self.assertEqual(CheckpointLog(self.path).replay(), [{'target_id': '1'}])
+        log.close()
+
+    def test_log_is_the_only_file(self):
+        """Batched fsyncs and compaction leave no side files next to the log."""
+        with CheckpointLog(self.path, fsync_every=2, fsync_interval=3600) as log:
+            for i in range(5):
+                log.append({'target_id': str(i % 2)})
+            log.compact()
+        self.assertEqual(list(self.path.parent.iterdir()), [self.path])
+        self.assertEqual(len(CheckpointLog(self.path).replay()), 2)
+
+    def test_torn_tail_is_dropped(self):
+        with CheckpointLog(self.path) as log:
+            log.append({'target_id': '1'})
+            log.append({'target_id': '2'})
+        with open(self.path, 'ab') as f:
+            f.write(b'{"target_id": "3", "succ')  # crash mid-write
+        log = CheckpointLog(self.path)
+        self.assertEqual([r['target_id'] for r in log.replay()], ['1', '2'])
+        # Later appends start on a clean line
+        log.append({'target_id': '3'})
+        log.close()
+        self.assertEqual([r['target_id'] for r in CheckpointLog(self.path).replay()], ['1', '2', '3'])
+
+    def test_compaction_keeps_latest(self):
+        with CheckpointLog(self.path) as log:
+            log.append({'target_id': '1', 'attempt': 1})
+            log.append({'target_id': '2', 'attempt': 1})
+            log.append({'target_id': '1', 'attempt': 2})
+            log.compact_in_background().join()
+            log.append({'target_id': '3', 'attempt': 1})
+        records = CheckpointLog(self.path).replay()
+        self.assertEqual([(r['target_id'], r['attempt']) for r in records],
+                         [('1', 2), ('2', 1), ('3', 1)])
+
+    def test_legacy_checkpoint(self):
+        legacy = Path(self.tmpdir.name) / 'checkpoint.json'
+        with open(legacy, 'w') as f:
+            json.dump({'checkpoint_at': 'x', 'completed_count': 1,
+                       'results': [{'target_id': '1', 'success': True}]}, f, indent=2)
+        self.assertEqual(load_checkpoint(legacy), [{'target_id': '1', 'success': True}])
+        # First append converts the file to JSONL in place
+        with CheckpointLog(legacy) as log:
+            log.append({'target_id': '2', 'success': False})
+        self.assertEqual(len(legacy.read_text().splitlines()), 2)
+        self.assertEqual([r['target_id'] for r in load_checkpoint(legacy)], ['1', '2'])
+
+    def test_save_checkpoint_roundtrip(self):
+        results = [{'target_id': '1'}, {'target_id': '2'}]
+        save_checkpoint(results, self.path)
+        self.assertEqual(load_checkpoint(self.path), results)
+
+    def test_latest_per_target(self):
+        records = [{'target_id': 'a', 'v': 1}, {'target_id': 'b', 'v': 1}, {'target_id': 'a', 'v': 2}]
+        self.assertEqual(latest_per_target(records), [{'target_id': 'a', 'v': 2}, {'target_id': 'b', 'v': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
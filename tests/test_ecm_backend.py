@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ecm_backend helpers and the persistent ECM worker pool.
+
+The pool tests drive a stand-in 'ecm' script that speaks gmp-ecm's quiet
+protocol (one number per stdin line, one answer line per number), so they
+run on hosts without GMP-ECM installed.
+"""
+
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+from ecm_backend import ECMWorkerPool, _parse_factor_lines
+
+FAKE_ECM = '''#!{python}
+import sys, time
+args = sys.argv[1:]
+B1 = int(args[-1])
+# Count process starts so tests can check processes are reused
+with open({starts!r}, "a") as log:
+    log.write(str(B1) + "\\n")
+for line in sys.stdin:
+    N = int(line)
+    if N == 999999999999999999999:  # "slow" number used for timeout tests
+        time.sleep(30)
+    factor = next((d for d in range(2, min(B1, 10**6)) if N % d == 0 and d < N), None)
+    print(f"{{factor}} {{N // factor}}" if factor else N, flush=True)
+'''
+
+
+class TestParseFactorLines(unittest.TestCase):
+    """Test ECM stdout parsing."""
+
+    def test_factor_on_own_line(self):
+        self.assertEqual(_parse_factor_lines("1009\n", 1009 * 2003), 1009)
+
+    def test_space_separated(self):
+        self.assertEqual(_parse_factor_lines("1009 2003", 1009 * 2003), 1009)
+
+    def test_input_copied_back(self):
+        N = 1009 * 2003
+        self.assertIsNone(_parse_factor_lines(str(N), N))
+
+
+class TestECMWorkerPool(unittest.TestCase):
+    """Test the persistent worker pool against a fake ecm binary."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmpdir.name)
+        self.starts = tmp / 'starts.log'
+        self.ecm = tmp / 'ecm'
+        self.ecm.write_text(FAKE_ECM.format(python=sys.executable, starts=str(self.starts)))
+        self.ecm.chmod(self.ecm.stat().st_mode | stat.S_IEXEC)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _process_starts(self):
+        if not self.starts.exists():
+            return 0
+        return len(self.starts.read_text().splitlines())
+
+    def test_factors_many_targets_with_few_processes(self):
+        numbers = [1009 * 2003, 1013 * 4001, 1019 * 3001, 1021 * 5003, 1031 * 6007]
+        with ECMWorkerPool(num_workers=2, ecm_bin=str(self.ecm)) as pool:
+            futures = [pool.submit(N, 2000, 5, timeout_sec=10) for N in numbers]
+            factors = [f.result(timeout=20) for f in futures]
+        for N, f in zip(numbers, factors):
+            self.assertIsNotNone(f)
+            self.assertEqual(N % f, 0)
+        # Same (B1, curves) for every job: at most one process per worker
+        self.assertLessEqual(self._process_starts(), 2)
+
+    def test_no_factor_below_B1(self):
+        N = 1000003 * 1000033
+        with ECMWorkerPool(num_workers=1, ecm_bin=str(self.ecm)) as pool:
+            self.assertIsNone(pool.submit(N, 1000, 1, timeout_sec=10).result(timeout=20))
+
+    def test_factor_batch_escalates_B1(self):
+        small, large = 1009 * 2003, 50021 * 50023
+        with ECMWorkerPool(num_workers=2, ecm_bin=str(self.ecm)) as pool:
+            results = pool.factor_batch([small, large], [(2000, 5), (60000, 5)], timeout_sec=20)
+        self.assertEqual(results[small], 1009)
+        self.assertEqual(results[large], 50021)
+
+    def test_timeout_returns_none_and_recovers(self):
+        slow = 999999999999999999999
+        with ECMWorkerPool(num_workers=1, ecm_bin=str(self.ecm)) as pool:
+            start = time.time()
+            self.assertIsNone(pool.submit(slow, 1000, 1, timeout_sec=0.5).result(timeout=10))
+            self.assertLess(time.time() - start, 5)
+            # Worker restarts its process for the next job
+            self.assertEqual(pool.submit(1009 * 2003, 2000, 1, timeout_sec=10).result(timeout=20), 1009)
+
+    def test_factor_cancels_remaining_jobs_for_target(self):
+        N = 1009 * 2003
+        with ECMWorkerPool(num_workers=1, ecm_bin=str(self.ecm)) as pool:
+            first = pool.submit(N, 2000, 1, timeout_sec=10)
+            rest = [pool.submit(N, 3000 + i, 1, timeout_sec=10) for i in range(5)]
+            self.assertEqual(first.result(timeout=20), 1009)
+            time.sleep(0.2)
+            # Queued jobs for the same target are cancelled rather than run
+            self.assertTrue(any(f.cancelled() for f in rest))
+
+    def test_cancelled_keys_are_forgotten(self):
+        numbers = [1009 * 2003 + 2 * i * 1009 for i in range(5)]
+        with ECMWorkerPool(num_workers=2, ecm_bin=str(self.ecm)) as pool:
+            futures = [pool.submit(N, 2000, 1, timeout_sec=10) for N in numbers for _ in range(3)]
+            for f in futures:
+                try:
+                    f.result(timeout=20)
+                except CancelledError:
+                    pass
+            deadline = time.time() + 5
+            while pool._cancelled_keys and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(pool._cancelled_keys, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the ECM checkpoint store and resumable run_ecm_once.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import ecm_backend
+from ecm_checkpoint import ECMCheckpointStore, stage_key, target_hash
+
+# Logs "<sigma> <curves>" per invocation; never finds a factor unless the
+# sigma range covers FAKE_ECM_LUCKY
+FAKE_ECM = '''#!{python}
+import os, sys
+args = sys.argv[1:]
+curves = int(args[args.index("-c") + 1])
+sigma = int(args[args.index("-sigma") + 1]) if "-sigma" in args else None
+with open(os.environ["FAKE_ECM_LOG"], "a") as log:
+    log.write(f"{{sigma}} {{curves}}\\n")
+N = int(sys.stdin.readline())
+lucky = int(os.environ.get("FAKE_ECM_LUCKY", "-1"))
+if sigma is not None and sigma <= lucky < sigma + curves:
+    print(f"1009 {{N // 1009}}")
+else:
+    print(N)
+'''
+
+N = 1009 * 1000003
+
+
+class TestKeys(unittest.TestCase):
+
+    def test_shared_prefix_does_not_collide(self):
+        """Targets with the same 16-digit prefix get distinct keys."""
+        a = 12345678901234567890123
+        b = 12345678901234567999999
+        self.assertEqual(str(a)[:16], str(b)[:16])
+        self.assertNotEqual(target_hash(a), target_hash(b))
+        self.assertNotEqual(stage_key(a, 11000, 7, 20), stage_key(b, 11000, 7, 20))
+
+    def test_sigma_range_is_part_of_key(self):
+        self.assertNotEqual(stage_key(N, 11000, 7, 20), stage_key(N, 11000, 27, 20))
+        self.assertNotEqual(stage_key(N, 11000, 7, 20), stage_key(N, 11000, None, 20))
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ECMCheckpointStore(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_record_and_progress(self):
+        self.assertEqual(self.store.progress(N, 11000, 7, 20)['curves_done'], 0)
+        self.store.record(N, 11000, 7, 20, 5)
+        entry = self.store.progress(N, 11000, 7, 20)
+        self.assertEqual(entry['curves_done'], 5)
+        self.assertEqual(entry['sigma_hi'], 26)
+        # Reopening the store sees the same manifest
+        reopened = ECMCheckpointStore(self.tmpdir.name)
+        self.assertEqual(reopened.progress(N, 11000, 7, 20)['curves_done'], 5)
+
+    def test_reset(self):
+        self.store.record(N, 11000, 7, 20, 5)
+        self.store.reset(N, 11000, 7, 20)
+        self.assertEqual(self.store.progress(N, 11000, 7, 20)['curves_done'], 0)
+
+
+class TestResumableRun(unittest.TestCase):
+    """run_ecm_once with a checkpoint directory, against a fake gmp-ecm."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmpdir.name)
+        ecm = tmp / 'ecm'
+        ecm.write_text(FAKE_ECM.format(python=sys.executable))
+        ecm.chmod(ecm.stat().st_mode | stat.S_IEXEC)
+        self.log = tmp / 'calls.log'
+        self.ckdir = tmp / 'ckpts'
+        self.old_env = dict(os.environ)
+        os.environ['PATH'] = f"{tmp}{os.pathsep}{os.environ.get('PATH', '')}"
+        os.environ['FAKE_ECM_LOG'] = str(self.log)
+        self.old_backend = ecm_backend.BACKEND
+        ecm_backend.BACKEND = "gmp-ecm"
+
+    def tearDown(self):
+        ecm_backend.BACKEND = self.old_backend
+        os.environ.clear()
+        os.environ.update(self.old_env)
+        self.tmpdir.cleanup()
+
+    def _calls(self):
+        return [tuple(line.split()) for line in self.log.read_text().splitlines()]
+
+    def test_chunks_advance_sigma(self):
+        factor = ecm_backend.run_ecm_once(N, 11000, 6, 30, checkpoint_dir=self.ckdir,
+                                          sigma=100, checkpoint_every=2)
+        self.assertIsNone(factor)
+        self.assertEqual(self._calls(), [('100', '2'), ('102', '2'), ('104', '2')])
+        store = ECMCheckpointStore(self.ckdir)
+        self.assertEqual(store.progress(N, 11000, 100, 6)['curves_done'], 6)
+
+    def test_default_chunks_are_fixed_size(self):
+        """Without checkpoint_every a stage is recorded every CHECKPOINT_CURVES curves."""
+        step = ecm_backend.CHECKPOINT_CURVES
+        ecm_backend.run_ecm_once(N, 11000, 5 * step + 1, 30, checkpoint_dir=self.ckdir,
+                                 sigma=100)
+        calls = self._calls()
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(calls[1], (str(100 + step), str(step)))
+        self.assertEqual(calls[-1], (str(100 + 5 * step), '1'))
+        self.assertFalse(list(Path(self.ckdir).rglob('*.sav')))
+
+    def test_resume_skips_completed_curves(self):
+        store = ECMCheckpointStore(self.ckdir)
+        store.record(N, 11000, 100, 6, 4)  # pretend an earlier run got this far
+        os.environ['FAKE_ECM_LUCKY'] = '105'
+        factor = ecm_backend.run_ecm_once(N, 11000, 6, 30, checkpoint_dir=self.ckdir, sigma=100,
+                                          checkpoint_every=1)
+        self.assertEqual(factor, 1009)
+        self.assertEqual(self._calls(), [('104', '1'), ('105', '1')])
+        # A finished stage returns its factor without running ecm again
+        self.log.write_text('')
+        again = ecm_backend.run_ecm_once(N, 11000, 6, 30, checkpoint_dir=self.ckdir, sigma=100)
+        self.assertEqual(again, 1009)
+        self.assertEqual(self._calls(), [])
+
+    def test_allow_resume_false_restarts(self):
+        store = ECMCheckpointStore(self.ckdir)
+        store.record(N, 11000, 100, 3, 3)
+        ecm_backend.run_ecm_once(N, 11000, 3, 30, checkpoint_dir=self.ckdir, sigma=100,
+                                 allow_resume=False, checkpoint_every=3)
+        self.assertEqual(self._calls(), [('100', '3')])
+
+
+if __name__ == '__main__':
+    unittest.main()
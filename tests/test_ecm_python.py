@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pure-Python ECM backend.
+"""
+
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import sympy
+
+import ecm_backend
+import ecm_python
+from ecm_python import (
+    ecm_factor,
+    ecm_one_curve,
+    stage1_exponent,
+    suyama_curve,
+    primes_up_to,
+    _ladder,
+)
+from run_distance_break import factor_with_ecm
+
+
+class TestCurveArithmetic(unittest.TestCase):
+    """Sanity checks on the Montgomery-curve building blocks."""
+
+    def test_primes_up_to(self):
+        self.assertEqual(primes_up_to(30), [2, 3, 5, 7, 11, 13, 17, 19, 23, 29])
+        self.assertEqual(primes_up_to(1), [])
+
+    def test_stage1_exponent(self):
+        # 2^3 · 3^2 · 5 · 7 for B1 = 10
+        self.assertEqual(stage1_exponent(10), 8 * 9 * 5 * 7)
+
+    def test_ladder_composition(self):
+        """(a·b)·P computed directly equals a·(b·P), projectively."""
+        N = sympy.nextprime(10**20)
+        X, Z, a24 = suyama_curve(11, N)
+        X1, Z1 = _ladder(35, X, Z, a24, N)
+        Xb, Zb = _ladder(5, X, Z, a24, N)
+        X2, Z2 = _ladder(7, Xb, Zb, a24, N)
+        self.assertEqual(X1 * Z2 % N, X2 * Z1 % N)
+
+    def test_degenerate_sigma(self):
+        N = 1009 * 1000003
+        self.assertIsNone(ecm_one_curve(N, 1000, 1000, 0))
+
+
+class TestECMFactor(unittest.TestCase):
+    """End-to-end factoring with the local backend."""
+
+    def setUp(self):
+        self.p = sympy.nextprime(10**10)
+        self.q = sympy.nextprime(10**30)
+        self.N = self.p * self.q
+
+    def test_single_worker(self):
+        f = ecm_factor(self.N, 5000, 100, sigma=1000, workers=1)
+        self.assertEqual(f, self.p)
+
+    def test_process_pool(self):
+        f = ecm_factor(self.N, 5000, 100, sigma=1000, workers=2)
+        self.assertEqual(f, self.p)
+
+    def test_stage2_finds_more_than_stage1(self):
+        p = sympy.nextprime(10**12)
+        N = p * sympy.nextprime(10**25)
+        sigmas = range(10, 110)
+        stage1 = sum(1 for s in sigmas if ecm_one_curve(N, 2000, 2000, s))
+        stage2 = sum(1 for s in sigmas if ecm_one_curve(N, 2000, 200000, s))
+        self.assertGreater(stage2, stage1)
+
+    def test_default_sigma_is_deterministic(self):
+        a = ecm_factor(self.N, 3000, 5, workers=1)
+        b = ecm_factor(self.N, 3000, 5, workers=1)
+        self.assertEqual(a, b)
+
+    def test_cancel_stops_running_chunks(self):
+        """cancel_event stops worker processes mid-curve, even without a timeout."""
+        N = sympy.nextprime(10**40) * sympy.nextprime(10**41)
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        start = time.time()
+        self.assertIsNone(ecm_factor(N, 2_000_000, 1000, workers=2, cancel_event=cancel))
+        # ecm_factor returns only after its running chunks have stopped
+        self.assertLess(time.time() - start, 5)
+
+    def test_nested_calls_default_to_one_worker(self):
+        with mock.patch.object(ecm_python, '_get_pool') as get_pool:
+            result = []
+            t = threading.Thread(target=lambda: result.append(
+                ecm_factor(self.N, 5000, 100, sigma=1000)))
+            t.start()
+            t.join()
+            get_pool.assert_not_called()
+        self.assertEqual(result, [self.p])
+
+    def test_timeout(self):
+        N = sympy.nextprime(10**40) * sympy.nextprime(10**41)
+        self.assertIsNone(ecm_factor(N, 200000, 1000, workers=1, timeout_sec=0.5))
+
+
+class TestFallbackBackend(unittest.TestCase):
+    """run_ecm_once and the ECM schedule pipeline without gmp-ecm."""
+
+    def setUp(self):
+        self.old_backend = ecm_backend.BACKEND
+        ecm_backend.BACKEND = "pyecm"
+
+    def tearDown(self):
+        ecm_backend.BACKEND = self.old_backend
+
+    def test_backend_info(self):
+        self.assertEqual(ecm_backend.backend_info()['backend'], 'pyecm')
+
+    def test_run_ecm_once(self):
+        p = sympy.nextprime(10**9)
+        N = p * sympy.nextprime(10**30)
+        self.assertEqual(ecm_backend.run_ecm_once(N, 2000, 40, timeout_sec=60), p)
+
+    def test_factor_with_ecm_schedule(self):
+        p = sympy.nextprime(10**9)
+        N = p * sympy.nextprime(10**30)
+        schedule = [("tiny", 100, 2), ("small", 2000, 40)]
+        result = factor_with_ecm(N, schedule, timeout_per_stage=60,
+                                 checkpoint_dir=None, use_sigma=True, sampler_type="golden-angle")
+        self.assertTrue(result['factored'])
+        self.assertEqual(N % result['factor'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the batch theta-gate and its on-disk cache.
+"""
+
+import json
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+from manifold_128bit import theta_gate
+import gate_cache
+from gate_cache import GateCache, cache_path_for, theta_gate_batch
+from run_distance_break import determine_schedule, FULL_SCHEDULE, LIGHT_SCHEDULE
+
+
+class TestThetaGateBatch(unittest.TestCase):
+
+    def test_matches_scalar_gate(self):
+        """Same answer as theta_gate, including N wider than mp.dps."""
+        rng = random.Random(7)
+        Ns = [rng.getrandbits(bits) | 1 for bits in (16, 64, 128, 256, 320) for _ in range(200)]
+        Ns += [0, 3, 4, 5]
+        expected = [theta_gate(N) for N in Ns]
+        self.assertEqual(list(theta_gate_batch(Ns)), expected)
+        self.assertTrue(any(expected))
+
+    def test_parameters_forwarded(self):
+        rng = random.Random(11)
+        Ns = [rng.getrandbits(256) for _ in range(200)]
+        self.assertEqual(list(theta_gate_batch(Ns, width_factor=0.5, k=0.5)),
+                         [theta_gate(N, 0.5, 0.5) for N in Ns])
+
+    def test_accepts_strings_and_empty(self):
+        self.assertEqual(len(theta_gate_batch([])), 0)
+        self.assertEqual(list(theta_gate_batch(['1000003'])), [theta_gate(1000003)])
+
+
+class TestGateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.targets = Path(self.tmpdir.name) / 'targets_256bit.json'
+        rng = random.Random(3)
+        self.Ns = [rng.getrandbits(256) | 1 for _ in range(50)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cache_path(self):
+        self.assertEqual(cache_path_for(self.targets).name, 'targets_256bit.gates.json')
+        self.assertEqual(cache_path_for('corpus.ztc').name, 'corpus.gates.json')
+
+    def test_persisted_and_reused(self):
+        gates = GateCache.for_targets(self.targets).gates(self.Ns)
+        self.assertEqual(gates, [theta_gate(N) for N in self.Ns])
+        reloaded = GateCache.for_targets(self.targets)
+        self.assertEqual(len(reloaded), len(self.Ns))
+        with mock.patch.object(gate_cache, 'theta_gate_batch') as batch:
+            self.assertEqual(reloaded.gates(self.Ns), gates)
+            batch.assert_not_called()
+
+    def test_only_misses_computed(self):
+        cache = GateCache.for_targets(self.targets)
+        cache.gates(self.Ns[:10])
+        seen = []
+
+        def counting_batch(Ns, *args):
+            Ns = list(Ns)
+            seen.extend(Ns)
+            return theta_gate_batch(Ns, *args)
+
+        with mock.patch.object(gate_cache, 'theta_gate_batch', counting_batch):
+            cache.gates(self.Ns)
+        self.assertEqual(sorted(seen), sorted(self.Ns[10:]))
+
+    def test_parameter_change_invalidates(self):
+        GateCache.for_targets(self.targets).gates(self.Ns)
+        self.assertEqual(len(GateCache.for_targets(self.targets, k=0.5)), 0)
+        with open(cache_path_for(self.targets)) as f:
+            self.assertEqual(json.load(f)['params']['k'], 0.3)
+
+    def test_determine_schedule_uses_cache(self):
+        cache = GateCache.for_targets(self.targets)
+        for N, passed in zip(self.Ns, cache.gates(self.Ns)):
+            schedule, gate = determine_schedule(N, True, cache)
+            self.assertEqual(gate, passed)
+            self.assertIs(schedule, FULL_SCHEDULE if passed else LIGHT_SCHEDULE)
+            self.assertEqual(determine_schedule(N, True), (schedule, gate))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared prime-power tables and the P−1 / P+1 stages.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import sympy
+
+import prime_powers
+from prime_powers import (
+    lucas_v,
+    pm1,
+    prime_gap_table,
+    prime_power_exponent,
+    sieve_segment,
+    williams_pp1,
+)
+from ecm_python import stage1_exponent
+from factor_256bit import factor_single_target
+
+Q = sympy.nextprime(2**150)
+
+
+def smooth_prime(sign, large=1, B=2000, bits=80):
+    """Prime p with p - sign = 6·large·(primes < B), i.e. p∓1 B-smooth."""
+    base = 6 * large
+    for r in sympy.primerange(5, B):
+        if base.bit_length() >= bits:
+            break
+        base *= r
+    k = 1
+    while not sympy.isprime(base * k + sign):
+        k += 1
+    return base * k + sign
+
+
+class TestTables(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.old_env = os.environ.get('PRIME_POWER_CACHE')
+        os.environ['PRIME_POWER_CACHE'] = self.tmpdir.name
+        prime_power_exponent.cache_clear()
+
+    def tearDown(self):
+        if self.old_env is None:
+            os.environ.pop('PRIME_POWER_CACHE', None)
+        else:
+            os.environ['PRIME_POWER_CACHE'] = self.old_env
+        prime_power_exponent.cache_clear()
+        self.tmpdir.cleanup()
+
+    def test_exponent(self):
+        self.assertEqual(prime_power_exponent(10), 8 * 9 * 5 * 7)
+        self.assertEqual(prime_power_exponent(1), 1)
+        self.assertEqual(stage1_exponent(1000), prime_power_exponent(1000))
+
+    def test_exponent_disk_cache(self):
+        B1 = prime_powers.DISK_CACHE_MIN_B1
+        E = prime_power_exponent(B1)
+        self.assertTrue((Path(self.tmpdir.name) / f"ppexp_B1_{B1}.bin").exists())
+        prime_power_exponent.cache_clear()
+        self.assertEqual(prime_power_exponent(B1), E)
+
+    def test_sieve_segment(self):
+        self.assertEqual(sieve_segment(90, 120).tolist(), [97, 101, 103, 107, 109, 113])
+        self.assertEqual(sieve_segment(0, 10).tolist(), [2, 3, 5, 7])
+
+    def test_gap_table_roundtrip(self):
+        for _ in range(2):  # second call reads the memory-mapped cache
+            first, gaps = prime_gap_table(1000, 2000)
+            primes = [first]
+            for h in gaps.tolist():
+                primes.append(primes[-1] + 2 * h)
+            self.assertEqual(primes, list(sympy.primerange(1000, 2000)))
+
+    def test_lucas_v(self):
+        N = 1000003
+        A = 7
+        # V_{m+n} = V_m V_n − V_{m−n}
+        self.assertEqual(lucas_v(12, A, N), (lucas_v(7, A, N) * lucas_v(5, A, N) - lucas_v(2, A, N)) % N)
+
+
+class TestPm1Pp1(unittest.TestCase):
+
+    def test_pm1_stage1(self):
+        p = smooth_prime(+1)
+        self.assertEqual(pm1(p * Q, 2000, B2=0), p)
+
+    def test_pm1_stage2(self):
+        p = smooth_prime(+1, large=sympy.prevprime(150000))
+        self.assertIsNone(pm1(p * Q, 2000, B2=0))
+        self.assertEqual(pm1(p * Q, 2000), p)
+
+    def test_pp1_stage1(self):
+        # p ≡ 2 (mod 3) so the 2/7 seed works in the p + 1 group
+        p = smooth_prime(-1)
+        self.assertIsNone(pm1(p * Q, 2000, B2=0))
+        self.assertEqual(williams_pp1(p * Q, 2000, B2=0), p)
+
+    def test_pp1_stage2(self):
+        p = smooth_prime(-1, large=sympy.prevprime(150000))
+        self.assertIsNone(williams_pp1(p * Q, 2000, B2=0))
+        self.assertEqual(williams_pp1(p * Q, 2000), p)
+
+    def test_scheduler_probe(self):
+        """Smooth p − 1 is found by the P−1 probe before any ECM runs."""
+        p = smooth_prime(+1, large=sympy.prevprime(150000), bits=120)
+        result = factor_single_target(p * Q, timeout=120)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['method'], 'pm1')
+        self.assertNotIn('ecm', [s['method'] for s in result['stages']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit tests for curve-level parallel ECM stages in run_distance_break.
+
+A stand-in 'ecm' script is put first on PATH; it "finds" a factor only for
+one lucky sigma, which lets the tests check that each worker runs its own
+slice of the sigma stream and that the first hit cancels the rest.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import ecm_backend
+from run_distance_break import split_curves, run_stage_parallel, factor_with_ecm
+
+FAKE_ECM = '''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+sigma = int(args[args.index("-sigma") + 1]) if "-sigma" in args else None
+with open(os.environ["FAKE_ECM_LOG"], "a") as log:
+    log.write(f"{{sigma}}\\n")
+N = int(sys.stdin.readline())
+time.sleep(float(os.environ.get("FAKE_ECM_DELAY", "0.05")))
+if sigma is not None and sigma == int(os.environ["FAKE_ECM_LUCKY"]):
+    print(f"1009 {{N // 1009}}")
+else:
+    print(N)
+'''
+
+N = 1009 * 1000003
+
+
+class TestSplitCurves(unittest.TestCase):
+
+    def test_ranges_cover_all_curves(self):
+        ranges = split_curves(20, 3)
+        self.assertEqual(ranges, [(0, 7), (7, 7), (14, 6)])
+        self.assertEqual(sum(c for _, c in ranges), 20)
+
+    def test_more_workers_than_curves(self):
+        self.assertEqual(split_curves(2, 4), [(0, 1), (1, 1)])
+
+
+class TestParallelStage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmpdir.name)
+        ecm = tmp / 'ecm'
+        ecm.write_text(FAKE_ECM.format(python=sys.executable))
+        ecm.chmod(ecm.stat().st_mode | stat.S_IEXEC)
+        self.log = tmp / 'sigmas.log'
+        self.old_env = dict(os.environ)
+        os.environ['PATH'] = f"{tmp}{os.pathsep}{os.environ.get('PATH', '')}"
+        os.environ['FAKE_ECM_LOG'] = str(self.log)
+        # Drive the gmp-ecm code path even where the real binary is missing
+        self.old_backend = ecm_backend.BACKEND
+        ecm_backend.BACKEND = "gmp-ecm"
+
+    def tearDown(self):
+        ecm_backend.BACKEND = self.old_backend
+        os.environ.clear()
+        os.environ.update(self.old_env)
+        self.tmpdir.cleanup()
+
+    def _sigmas_run(self):
+        return [int(s) for s in self.log.read_text().split() if s != 'None']
+
+    def test_each_worker_uses_its_sigma_slice(self):
+        sigmas = list(range(100, 140))
+        os.environ['FAKE_ECM_LUCKY'] = '131'  # first curve of worker 3's slice is 130
+        factor = run_stage_parallel(N, 11000, 40, timeout_sec=30, workers=4, sigma_values=sigmas)
+        self.assertEqual(factor, 1009)
+        ran = self._sigmas_run()
+        self.assertIn(131, ran)
+        # Every worker started on the first sigma of its own slice
+        for first in (100, 110, 120, 130):
+            self.assertIn(first, ran)
+        # First hit cancelled the other slices before they finished
+        self.assertLess(len(ran), len(sigmas))
+
+    def test_no_hit_returns_none(self):
+        os.environ['FAKE_ECM_LUCKY'] = '-1'
+        os.environ['FAKE_ECM_DELAY'] = '0'
+        factor = run_stage_parallel(N, 11000, 6, timeout_sec=30, workers=3,
+                                    sigma_values=[7, 8, 9, 10, 11, 12])
+        self.assertIsNone(factor)
+        self.assertEqual(sorted(self._sigmas_run()), [7, 8, 9, 10, 11, 12])
+
+    def test_random_curves_use_worker_pool(self):
+        """Without sigma_values, gmp-ecm slices go through the shared ECMWorkerPool."""
+        os.environ['FAKE_ECM_LUCKY'] = '-1'
+        os.environ['FAKE_ECM_DELAY'] = '0'
+        with mock.patch('run_distance_break.shared_worker_pool',
+                        wraps=ecm_backend.shared_worker_pool) as shared:
+            factor = run_stage_parallel(N, 11000, 6, timeout_sec=30, workers=3)
+        self.assertIsNone(factor)
+        shared.assert_called_once_with(3)
+        self.assertEqual(self.log.read_text().split(), ['None'] * 3)
+
+    def test_local_backend_slices_get_distinct_sigmas(self):
+        """Without sigma_values, pyecm slices start at different sigmas."""
+        ecm_backend.BACKEND = "pyecm"
+        seen = []
+
+        def spy(N, B1, curves, timeout_sec, checkpoint_dir=None, sigma=None, **kwargs):
+            seen.append((curves, sigma))
+            return None
+        with mock.patch('run_distance_break.run_ecm_once', spy):
+            self.assertIsNone(run_stage_parallel(N, 11000, 40, timeout_sec=30, workers=4))
+        base = ecm_backend._compute_sigma_u64(N, 11000)
+        self.assertEqual(sorted(seen), [(10, base), (10, base + 10), (10, base + 20), (10, base + 30)])
+
+    def test_stage_timeout(self):
+        os.environ['FAKE_ECM_LUCKY'] = '-1'
+        os.environ['FAKE_ECM_DELAY'] = '0.5'
+        start = time.time()
+        factor = run_stage_parallel(N, 11000, 100, timeout_sec=1, workers=2,
+                                    sigma_values=list(range(1000, 1100)))
+        self.assertIsNone(factor)
+        self.assertLess(time.time() - start, 5)
+
+    def test_factor_with_ecm_reports_workers(self):
+        os.environ['FAKE_ECM_LUCKY'] = '-1'
+        os.environ['FAKE_ECM_DELAY'] = '0'
+        result = factor_with_ecm(N, [("tiny", 11000, 4)], timeout_per_stage=30,
+                                 checkpoint_dir=None, use_sigma=False, workers=2)
+        self.assertFalse(result['factored'])
+        self.assertEqual(result['workers'], 2)
+        self.assertEqual(len(result['stages_attempted']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the binary target-corpus format.
+"""
+
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+from target_corpus import (
+    TargetCorpus,
+    write_corpus,
+    convert_json,
+    is_corpus_file,
+    open_targets,
+)
+
+PYTHON_DIR = Path(__file__).parent.parent / 'python'
+
+
+class TestCorpusRoundTrip(unittest.TestCase):
+    """Round-trip the JSON target files through the binary format."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.tmp = Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_distance_targets_round_trip(self):
+        """String ids, tiers and 128-bit N survive conversion."""
+        src = PYTHON_DIR / 'targets_128bit_test.json'
+        with open(src) as f:
+            data = json.load(f)
+        out = convert_json(src, self.tmp / 'distance.ztc')
+
+        with TargetCorpus(out) as corpus:
+            self.assertEqual(len(corpus), len(data['targets']))
+            self.assertEqual(corpus.metadata, data['metadata'])
+            for original, decoded in zip(data['targets'], corpus):
+                self.assertEqual(decoded['id'], original['id'])
+                self.assertEqual(decoded['N'], original['N'])
+                self.assertEqual(decoded['p'], original['p'])
+                self.assertEqual(decoded['q'], original['q'])
+                self.assertEqual(decoded['N_bits'], original['N_bits'])
+                self.assertEqual(decoded.get('tier'), original.get('tier'))
+                self.assertEqual(decoded.get('fermat_tier'), original.get('fermat_tier'))
+                self.assertEqual(decoded['tier_type'], original['tier_type'])
+                self.assertNotIn('bias_close', decoded)
+
+    def test_biased_targets_round_trip(self):
+        """Integer ids and bias flags from the 256-bit generator survive conversion."""
+        src = PYTHON_DIR / 'targets_filtered.json'
+        with open(src) as f:
+            data = json.load(f)
+        out = convert_json(src, self.tmp / 'filtered.ztc')
+
+        with TargetCorpus(out) as corpus:
+            self.assertEqual(corpus.n_limbs, 4)
+            for original in data['targets'][:20]:
+                decoded = corpus.get(original['id'])
+                self.assertIsNotNone(decoded)
+                self.assertIsInstance(decoded['id'], int)
+                self.assertEqual(int(decoded['N']), int(original['N']))
+                self.assertEqual(decoded['bias_close'], original['bias_close'])
+
+    def test_rows_match_json_field_by_field(self):
+        """Every per-target field, including generator extras, survives conversion."""
+        for name in ('targets_128bit_test.json', 'targets_by_distance.json',
+                     'targets_filtered.json'):
+            src = PYTHON_DIR / name
+            with open(src) as f:
+                data = json.load(f)
+            out = convert_json(src, self.tmp / (src.stem + '.ztc'))
+
+            with TargetCorpus(out) as corpus:
+                for original, decoded in zip(data['targets'], corpus):
+                    self.assertEqual(set(decoded), set(original), original['id'])
+                    for key, value in original.items():
+                        self.assertEqual(decoded[key], value, (original['id'], key))
+                        self.assertIs(type(decoded[key]), type(value), (original['id'], key))
+
+    def test_mismatched_column_values_kept_verbatim(self):
+        """Values the columns would normalise (int N, mixed ids) come back unchanged."""
+        targets = [
+            {'id': 7, 'N': 1000003 * 11, 'type': 'biased', 'note': 'int N'},
+            {'id': 'X', 'N': '143', 'p': '11', 'q': '13', 'N_bits': 99},
+        ]
+        out = write_corpus(targets, self.tmp / 'odd.ztc')
+
+        with TargetCorpus(out) as corpus:
+            self.assertEqual(list(corpus), targets)
+            self.assertEqual(corpus.get(7), targets[0])
+
+    def test_random_access_and_missing_id(self):
+        targets = [{'id': f'X{i}', 'N': str(1000003 * (i + 7)), 'tier': i % 3}
+                   for i in range(50)]
+        out = write_corpus(targets, self.tmp / 'small.ztc', {'bits': 30})
+
+        with TargetCorpus(out) as corpus:
+            self.assertEqual(corpus.get('X17')['N'], targets[17]['N'])
+            self.assertIsNone(corpus.get('missing'))
+            self.assertEqual(corpus.N(3), int(targets[3]['N']))
+            self.assertEqual(corpus[-1]['id'], 'X49')
+            self.assertEqual([t['id'] for t in corpus[2:5]], ['X2', 'X3', 'X4'])
+
+    def test_shards_cover_corpus(self):
+        """Worker shards are disjoint and together cover every row."""
+        targets = [{'id': i, 'N': str(2 * i + 15)} for i in range(103)]
+        out = write_corpus(targets, self.tmp / 'shards.ztc')
+
+        with TargetCorpus(out) as corpus:
+            seen = []
+            for worker in range(4):
+                seen.extend(t['id'] for t in corpus.shard(worker, 4))
+            self.assertEqual(seen, list(range(103)))
+            with self.assertRaises(ValueError):
+                corpus.shard_bounds(4, 4)
+
+    def test_open_targets_detects_format(self):
+        src = PYTHON_DIR / 'targets_128bit_test.json'
+        out = convert_json(src, self.tmp / 'detect.ztc')
+
+        self.assertTrue(is_corpus_file(out))
+        self.assertFalse(is_corpus_file(src))
+
+        meta_json, targets_json = open_targets(src)
+        meta_bin, targets_bin = open_targets(out)
+        self.assertEqual(meta_json, meta_bin)
+        self.assertEqual([t['N'] for t in targets_json], [t['N'] for t in targets_bin])
+        targets_bin.close()
+
+    def test_rejects_non_corpus(self):
+        bogus = self.tmp / 'bogus.ztc'
+        bogus.write_bytes(b'not a corpus at all, definitely not' * 4)
+        with self.assertRaises(ValueError):
+            TargetCorpus(bogus)
+
+
+if __name__ == '__main__':
+    unittest.main()
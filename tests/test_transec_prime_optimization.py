@@ -8,6 +8,7 @@ Tests cover:
 - Interoperability with different strategies
 - Performance impact
 - Edge cases
+- Segmented sieve window for slot normalization
 """
 
 import sys
@@ -24,7 +25,11 @@ from transec import (
 )
 
 try:
+    import transec_prime_optimization
     from transec_prime_optimization import (
+        PrimeSieveWindow,
+        slot_sieve,
+        count_divisors,
         is_prime,
         compute_curvature,
         find_next_prime,
@@ -144,6 +149,86 @@ class TestPrimeUtilities(unittest.TestCase):
         self.assertGreater(reduction, 70, "Should have >70% reduction")
 
 
+def _trial_is_prime(n):
+    return n >= 2 and all(n % d for d in range(2, int(n ** 0.5) + 1))
+
+
+@unittest.skipUnless(PRIME_OPTIMIZATION_AVAILABLE, "Prime optimization module not available")
+class TestPrimeSieveWindow(unittest.TestCase):
+    """Test the segmented sieve used for slot normalization."""
+    
+    def test_matches_trial_division(self):
+        """Window primality and next/prev lookups agree with trial division."""
+        for start, span in [(0, 200), (1000, 500), (350000001, 2000)]:
+            window = PrimeSieveWindow(start, span)
+            primes = [n for n in range(window.start, window.stop) if _trial_is_prime(n)]
+            self.assertEqual([n for n in range(window.start, window.stop)
+                              if window.is_prime(n)], primes)
+            for n in range(window.start, window.stop, 7):
+                later = [p for p in primes if p >= n]
+                earlier = [p for p in primes if p <= n]
+                self.assertEqual(window.next_prime(n), later[0] if later else None)
+                self.assertEqual(window.prev_prime(n), earlier[-1] if earlier else None)
+    
+    def test_advance_reuses_overlap(self):
+        """Sliding forward gives the same table as sieving from scratch."""
+        window = PrimeSieveWindow(350000000, 4096)
+        for start in (350001000, 350004000, 349000000):
+            moved = window.advance(start)
+            fresh = PrimeSieveWindow(start, 4096)
+            self.assertEqual((moved.start, moved.stop), (fresh.start, fresh.stop))
+            self.assertEqual(moved._odd, fresh._odd)
+            self.assertEqual(window.start, 350000000)  # original untouched
+    
+    def test_normalization_follows_slots(self):
+        """Normalizing slides the shared window along with the slot index."""
+        slot = int(time.time() / 5)
+        normalize_slot_to_prime(slot, "nearest")
+        window = slot_sieve(slot)
+        self.assertIn(slot, window)
+        self.assertIs(slot_sieve(slot + 1), window)
+        later = slot + 100000
+        self.assertTrue(_trial_is_prime(normalize_slot_to_prime(later, "next")))
+        self.assertIn(later, transec_prime_optimization._slot_sieves[0])
+    
+    def test_alternating_ranges_keep_windows(self):
+        """Slot ranges used in turn each keep their window instead of re-sieving."""
+        slot = int(time.time() / 5)
+        other = slot // 12  # same clock at a 60 s slot duration
+        window, other_window = slot_sieve(slot), slot_sieve(other)
+        self.assertIsNot(window, other_window)
+        for _ in range(3):
+            self.assertIs(slot_sieve(slot), window)
+            self.assertIs(slot_sieve(other), other_window)
+        # Reaching a window's top slides that window rather than adding one
+        moved = slot_sieve(window.stop - 1)
+        self.assertIn(window.stop - 1, moved)
+        self.assertNotIn(window, transec_prime_optimization._slot_sieves)
+        self.assertIs(slot_sieve(other), other_window)
+    
+    def test_results_unchanged_near_slot(self):
+        """Sieve-backed answers match trial division around the current slot."""
+        slot = int(time.time() / 5)
+        slot_sieve(slot)
+        for n in range(slot - 60, slot + 60):
+            self.assertEqual(is_prime(n), _trial_is_prime(n))
+            nxt = find_next_prime(n)
+            self.assertTrue(_trial_is_prime(nxt))
+            self.assertFalse(any(_trial_is_prime(k) for k in range(n, nxt)))
+            nearest = find_nearest_prime(n)
+            self.assertTrue(_trial_is_prime(nearest))
+            self.assertFalse(any(_trial_is_prime(k)
+                                 for k in range(n - abs(nearest - n) + 1, n + abs(nearest - n))))
+    
+    def test_count_divisors(self):
+        """Factorization-based divisor count agrees with the definition."""
+        for n in list(range(1, 400)) + [2 ** 20, 3 ** 10 * 7, 999983 * 2, 350000041]:
+            expected = sum(2 if d * d != n else 1
+                           for d in range(1, int(n ** 0.5) + 1) if n % d == 0)
+            self.assertEqual(count_divisors(n), expected, n)
+        self.assertEqual(count_divisors(0), 0)
+
+
 @unittest.skipUnless(PRIME_OPTIMIZATION_AVAILABLE, "Prime optimization module not available")
 class TestTransecPrimeOptimization(unittest.TestCase):
     """Test TRANSEC with prime optimization enabled."""
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the TCP work queue and batch_factor's coordinator/worker mode.
+
+Everything runs on 127.0.0.1 with an ephemeral port.
+"""
+
+import multiprocessing
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add python directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'python'))
+
+import sympy
+
+from work_queue import WorkQueueServer, parse_address, request, run_worker
+from batch_factor import run_batch_factorization, run_batch_worker
+
+
+def _square(payload):
+    return {'value': payload['x'] ** 2}
+
+
+class TestWorkQueue(unittest.TestCase):
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('node1:7777'), ('node1', 7777))
+        self.assertEqual(parse_address(':7777'), ('0.0.0.0', 7777))
+
+    def test_priority_order_and_results(self):
+        with WorkQueueServer() as server:
+            server.put('slow', {'x': 3}, priority=10)
+            server.put('fast', {'x': 2}, priority=1)
+            server.finish()
+            done = run_worker(server.address, _square, worker_id='w1', idle_wait=0.05)
+            self.assertEqual(done, 2)
+            first = server.results.get(timeout=1)
+            second = server.results.get(timeout=1)
+        self.assertEqual((first[0], first[2]), ('fast', {'value': 4}))
+        self.assertEqual((second[0], second[2]), ('slow', {'value': 9}))
+
+    def test_expired_lease_is_requeued(self):
+        with WorkQueueServer(lease_seconds=0.3) as server:
+            server.put('t', {'x': 5})
+            # A worker leases the task and then "crashes" (no heartbeat, no result)
+            lease = request(server.address, {'op': 'lease', 'worker': 'crashed'})
+            self.assertEqual(lease['task']['task_id'], 't')
+            self.assertIsNone(request(server.address, {'op': 'lease', 'worker': 'w2'})['task'])
+            time.sleep(0.4)
+            server.finish()
+            self.assertEqual(run_worker(server.address, _square, worker_id='w2', idle_wait=0.05), 1)
+            self.assertEqual(server.results.get(timeout=1)[2], {'value': 25})
+            self.assertEqual(server.requeued, 1)
+            # The crashed worker's late result is ignored
+            late = request(server.address, {'op': 'result', 'worker': 'crashed',
+                                            'task_id': 't', 'result': {}})
+            self.assertFalse(late['ok'])
+
+    def test_result_requires_current_lease(self):
+        """A worker whose lease expired cannot complete the task, or its next slice."""
+        with WorkQueueServer(lease_seconds=0.2) as server:
+            server.put('t', {'slice': 1})
+            request(server.address, {'op': 'lease', 'worker': 'slow'})
+            time.sleep(0.3)
+            lease = request(server.address, {'op': 'lease', 'worker': 'w2'})
+            self.assertEqual(lease['task']['payload'], {'slice': 1})
+
+            stale = {'op': 'result', 'worker': 'slow', 'task_id': 't', 'result': {'by': 'slow'}}
+            self.assertFalse(request(server.address, stale)['ok'])
+            self.assertTrue(request(server.address, {'op': 'result', 'worker': 'w2',
+                                                     'task_id': 't', 'result': {'by': 'w2'}})['ok'])
+            self.assertEqual(server.results.get(timeout=1)[2], {'by': 'w2'})
+
+            # The coordinator queues the next slice under the same id
+            server.put('t', {'slice': 2})
+            self.assertFalse(request(server.address, stale)['ok'])
+            request(server.address, {'op': 'lease', 'worker': 'w3'})
+            self.assertFalse(request(server.address, stale)['ok'])
+            self.assertTrue(server.results.empty())
+            self.assertEqual(server.outstanding(), 1)
+
+    def test_heartbeat_keeps_lease(self):
+        def slow(payload):
+            time.sleep(1.0)
+            return {'ok': True}
+
+        with WorkQueueServer(lease_seconds=0.3) as server:
+            server.put('t', {})
+            server.finish()
+            worker = threading.Thread(target=run_worker, args=(server.address, slow),
+                                      kwargs={'idle_wait': 0.05})
+            worker.start()
+            time.sleep(0.7)
+            status = request(server.address, {'op': 'status'})
+            self.assertEqual(status['leased'], 1)
+            self.assertEqual(status['requeued'], 0)
+            worker.join()
+        self.assertEqual(server.results.get(timeout=1)[2], {'ok': True})
+
+
+def _target(i, gap):
+    p = sympy.nextprime(2**100 + i * 2**80)
+    q = sympy.nextprime(p + gap)
+    return {'id': f't{i}', 'N': str(p * q), 'p': str(p), 'q': str(q), 'type': 'biased'}
+
+
+class TestDistributedBatch(unittest.TestCase):
+
+    def test_coordinator_with_worker_processes(self):
+        targets = [_target(i, 2**30) for i in range(4)]
+        port_box = {}
+
+        def coordinator():
+            port_box['results'] = run_batch_factorization(
+                targets, timeout_unbiased=10, timeout_biased=10, verbose=False,
+                batch_gcd=False, serve=('127.0.0.1', port_box['port']))
+
+        # Reserve a port, then hand it to the coordinator
+        with WorkQueueServer() as probe:
+            port_box['port'] = probe.address[1]
+        thread = threading.Thread(target=coordinator)
+        thread.start()
+        time.sleep(0.3)
+        ctx = multiprocessing.get_context('fork')
+        workers = [ctx.Process(target=run_batch_worker, args=(('127.0.0.1', port_box['port']),))
+                   for _ in range(2)]
+        for w in workers:
+            w.start()
+        thread.join(timeout=60)
+        for w in workers:
+            w.join(timeout=30)
+        self.assertFalse(thread.is_alive())
+        results = port_box['results']
+        self.assertEqual(sorted(r['target_id'] for r in results), ['t0', 't1', 't2', 't3'])
+        self.assertTrue(all(r['correct'] for r in results))
+        self.assertTrue(all(w.exitcode == 0 for w in workers))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,20 +8,13 @@ This script reads the CADO-NFS output file, extracts the factors,
 and updates the corresponding row in src/test/resources/rsa_challenges.csv.
 """
 
-import sys
 import csv
-import re
+import os
+import sys
 
-def extract_factors(cado_file):
-    """Extract p and q from CADO-NFS output."""
-    with open(cado_file, 'r') as f:
-        content = f.read()
-    # Look for lines like "p = 123..." or similar
-    p_match = re.search(r'p\s*=\s*(\d+)', content)
-    q_match = re.search(r'q\s*=\s*(\d+)', content)
-    if p_match and q_match:
-        return p_match.group(1), q_match.group(1)
-    return None, None
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+from cado_result import extract_factors, lookup_modulus  # noqa: E402
 
 def update_csv(rsa_id, p, q):
     """Update the CSV with factors."""
@@ -45,7 +38,11 @@ if __name__ == '__main__':
         sys.exit(1)
     rsa_id = sys.argv[1]
     cado_file = sys.argv[2]
-    p, q = extract_factors(cado_file)
+    N = lookup_modulus(rsa_id)
+    if N is None:
+        print(f"{rsa_id} not found in src/test/resources/rsa_challenges.csv")
+        sys.exit(1)
+    p, q = extract_factors(cado_file, N)
     if p and q:
         update_csv(rsa_id, p, q)
         print(f"Updated {rsa_id} with factors {p} and {q}")
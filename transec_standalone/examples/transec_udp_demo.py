@@ -8,25 +8,39 @@ No handshake is required - messages are encrypted and sent immediately.
 Usage:
     # Start server
     python3 transec_udp_demo.py server
-
+    
     # Run client in another terminal
     python3 transec_udp_demo.py client
+    
+    # Multi-peer: one server, per-peer secrets derived from a master secret
+    python3 transec_udp_demo.py server --multi
+    python3 transec_udp_demo.py client --peer-id alice
+    
+    # asyncio endpoints: pipelined benchmark (64 requests in flight)
+    python3 transec_udp_demo.py server --asyncio
+    python3 transec_udp_demo.py benchmark --asyncio --concurrency 64
 """
 
 import sys
 import os
+import asyncio
 import socket
 import time
 import threading
 import argparse
 
-# Add parent directory to path if running from examples/
-if os.path.exists('../python/transec.py'):
-    sys.path.insert(0, '../python')
-else:
-    sys.path.insert(0, './python')
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from transec import TransecCipher, generate_shared_secret
+from transec.aio import create_datagram_server, create_datagram_client
+from transec.sessions import (
+    SessionTable,
+    compute_channel_hash,
+    derive_peer_secret,
+    master_secret_resolver,
+    ROLE_CLIENT,
+)
 
 
 # For demo purposes, use a fixed shared secret
@@ -95,13 +109,69 @@ class TransecUDPServer:
         self.running = False
 
 
+class TransecMultiPeerServer(TransecUDPServer):
+    """UDP server keeping one TRANSEC session per peer (channel hash)."""
+    
+    def __init__(self, host: str, port: int, master_secret: bytes, max_peers: int = 10000):
+        super().__init__(host, port, master_secret)
+        self.sessions = SessionTable(master_secret_resolver(master_secret),
+                                     slot_duration=5, drift_window=2, max_peers=max_peers)
+    
+    def start(self):
+        """Start the server."""
+        self.running = True
+        print(f"🔐 TRANSEC multi-peer UDP Server listening on {self.host}:{self.port}")
+        print("Waiting for encrypted messages...")
+        print()
+        
+        try:
+            while self.running:
+                packet, client_addr = self.socket.recvfrom(65536)
+                opened = self.sessions.open(packet, address=client_addr)
+                if opened is None:
+                    print(f"⚠️  Rejected packet from {client_addr} (unknown peer, auth failed or replay)")
+                    continue
+                
+                session, plaintext = opened
+                text = plaintext.decode('utf-8', errors='replace')
+                timestamp = time.strftime("%H:%M:%S")
+                print(f"[{timestamp}] {session!r} ({len(self.sessions)} peers): {text}")
+                response = self.sessions.seal(session, f"Echo: {text}".encode())
+                self.socket.sendto(response, session.address)
+        
+        except KeyboardInterrupt:
+            print("\nServer shutting down...")
+        finally:
+            self.socket.close()
+
+
+class PeerCipher:
+    """Client-side adapter giving a SessionTable peer the TransecCipher seal/open API."""
+    
+    def __init__(self, peer_id: str, master_secret: bytes):
+        self.peer_id = peer_id
+        self.sessions = SessionTable(slot_duration=5, drift_window=2, role=ROLE_CLIENT)
+        secret = derive_peer_secret(master_secret, compute_channel_hash(peer_id))
+        self.sessions.add_peer(peer_id, secret)
+    
+    def seal(self, plaintext: bytes, sequence: int) -> bytes:
+        return self.sessions.seal(self.peer_id, plaintext, sequence=sequence)
+    
+    def open(self, packet: bytes):
+        opened = self.sessions.open(packet)
+        return opened[1] if opened else None
+
+
 class TransecUDPClient:
     """UDP client with TRANSEC encryption."""
     
-    def __init__(self, host: str, port: int, shared_secret: bytes):
+    def __init__(self, host: str, port: int, shared_secret: bytes, peer_id: str = None):
         self.host = host
         self.port = port
-        self.cipher = TransecCipher(shared_secret, slot_duration=5, drift_window=2)
+        if peer_id is None:
+            self.cipher = TransecCipher(shared_secret, slot_duration=5, drift_window=2)
+        else:
+            self.cipher = PeerCipher(peer_id, shared_secret)
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.settimeout(2.0)
         self.sequence = 0
@@ -205,6 +275,63 @@ class TransecUDPClient:
         self.socket.close()
 
 
+async def run_async_server(host: str, port: int, shared_secret: bytes):
+    """Echo server on TransecDatagramProtocol (replies are pipelined, not lock-step)."""
+    cipher = TransecCipher(shared_secret, slot_duration=5, drift_window=2)
+    
+    def echo(plaintext: bytes, client_addr):
+        return b"Echo: " + plaintext
+    
+    transport, server = await create_datagram_server(cipher, echo, host, port)
+    print(f"🔐 TRANSEC asyncio UDP Server listening on {host}:{port}")
+    print()
+    try:
+        while True:
+            await asyncio.sleep(5)
+            print(f"received={server.received} rejected={server.rejected} "
+                  f"dropped={server.dropped} sent={server.sent}")
+    finally:
+        transport.close()
+
+
+async def run_async_benchmark(host: str, port: int, shared_secret: bytes,
+                              count: int = 100, concurrency: int = 64):
+    """Benchmark with up to `concurrency` requests in flight."""
+    print(f"🔐 TRANSEC asyncio UDP Client - Benchmarking {count} messages "
+          f"({concurrency} in flight)")
+    print(f"Connected to {host}:{port}")
+    print()
+    
+    cipher = TransecCipher(shared_secret, slot_duration=5, drift_window=2)
+    # Clients share one secret, so start above any earlier client's sequences
+    transport, client = await create_datagram_client(cipher, host, port,
+                                                     sequence=time.time_ns() // 1000)
+    in_flight = asyncio.Semaphore(concurrency)
+    rtts = []
+    
+    async def one(i: int):
+        async with in_flight:
+            start = time.time()
+            response = await client.request(f"Benchmark message {i+1}".encode())
+            if response is not None:
+                rtts.append((time.time() - start) * 1000)
+    
+    start = time.time()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    elapsed = time.time() - start
+    transport.close()
+    
+    print("=" * 60)
+    print("Benchmark Results:")
+    print(f"  Success rate: {len(rtts)}/{count} ({len(rtts)/count*100:.1f}%)")
+    if rtts:
+        print(f"  Average RTT: {sum(rtts)/len(rtts):.2f}ms")
+        print(f"  Min RTT: {min(rtts):.2f}ms")
+        print(f"  Max RTT: {max(rtts):.2f}ms")
+        print(f"  Throughput: {len(rtts)/elapsed:.1f} msg/sec")
+    print("=" * 60)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="TRANSEC UDP Demo - Zero-Handshake Encrypted Messaging"
@@ -231,6 +358,27 @@ def main():
         default=100,
         help="Number of messages for benchmark (default: 100)"
     )
+    parser.add_argument(
+        "--multi",
+        action="store_true",
+        help="Server: keep one session per peer (secrets derived from the master secret)"
+    )
+    parser.add_argument(
+        "--peer-id",
+        default=None,
+        help="Client: talk to a --multi server as this peer"
+    )
+    parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Server/benchmark: use the asyncio TransecDatagramProtocol endpoints"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="Requests in flight for an --asyncio benchmark (default: 64)"
+    )
     
     args = parser.parse_args()
     
@@ -241,16 +389,29 @@ def main():
     print("=" * 60)
     print()
     
-    if args.mode == "server":
-        server = TransecUDPServer(args.host, args.port, DEMO_SECRET)
+    if args.asyncio and args.mode in ("server", "benchmark"):
+        try:
+            if args.mode == "server":
+                asyncio.run(run_async_server(args.host, args.port, DEMO_SECRET))
+            else:
+                asyncio.run(run_async_benchmark(args.host, args.port, DEMO_SECRET,
+                                                args.count, args.concurrency))
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+    
+    elif args.mode == "server":
+        if args.multi:
+            server = TransecMultiPeerServer(args.host, args.port, DEMO_SECRET)
+        else:
+            server = TransecUDPServer(args.host, args.port, DEMO_SECRET)
         server.start()
     
     elif args.mode == "client":
-        client = TransecUDPClient(args.host, args.port, DEMO_SECRET)
+        client = TransecUDPClient(args.host, args.port, DEMO_SECRET, peer_id=args.peer_id)
         client.run_interactive()
     
     elif args.mode == "benchmark":
-        client = TransecUDPClient(args.host, args.port, DEMO_SECRET)
+        client = TransecUDPClient(args.host, args.port, DEMO_SECRET, peer_id=args.peer_id)
         client.run_benchmark(args.count)
 
 
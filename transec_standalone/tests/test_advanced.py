@@ -95,6 +95,72 @@ class TestAdaptiveTransec(unittest.TestCase):
         decrypted = receiver.open(packet)
         
         self.assertEqual(decrypted, plaintext)
+    
+    def test_schedule_frames_are_fixed_length(self):
+        """Each frame's durations stay in range and sum to frame_length."""
+        from transec.adaptive import SCHEDULE_FRAME_EPOCHS
+        
+        for jitter_range in [(2, 10), (3, 3), (1, 2), (5, 60)]:
+            cipher = AdaptiveTransecCipher(self.secret, jitter_range=jitter_range)
+            for frame in (-1, 0, 7, 6_000_000):
+                base = frame * SCHEDULE_FRAME_EPOCHS
+                durations = [cipher.get_adaptive_slot_duration(base + k)
+                             for k in range(SCHEDULE_FRAME_EPOCHS)]
+                self.assertEqual(sum(durations), cipher.frame_length)
+                self.assertGreaterEqual(min(durations), jitter_range[0])
+                self.assertLessEqual(max(durations), jitter_range[1])
+    
+    def test_slot_for_time_follows_schedule(self):
+        """Timestamps resolve to the epoch whose bounds contain them."""
+        from transec.adaptive import SCHEDULE_FRAME_EPOCHS
+        
+        cipher = AdaptiveTransecCipher(self.secret, jitter_range=(2, 10))
+        now = int(time.time())
+        first = cipher.get_raw_slot_for_time(now)
+        previous_end = None
+        for epoch in range(first, first + 2 * SCHEDULE_FRAME_EPOCHS):
+            start, end = cipher.get_slot_bounds(epoch)
+            self.assertEqual(end - start, cipher.get_adaptive_slot_duration(epoch))
+            if previous_end is not None:
+                self.assertEqual(start, previous_end)  # contiguous across frames
+            previous_end = end
+            self.assertEqual(cipher.get_raw_slot_for_time(start), epoch)
+            self.assertEqual(cipher.get_raw_slot_for_time(start + 0.5), epoch)
+            self.assertEqual(cipher.get_raw_slot_for_time(end - 1e-3), epoch)
+            self.assertEqual(cipher.get_raw_slot_for_time(end), epoch + 1)
+    
+    def test_schedule_shared_by_peers(self):
+        """Independent instances agree; a different secret gives another schedule."""
+        a = AdaptiveTransecCipher(self.secret, jitter_range=(2, 10))
+        b = AdaptiveTransecCipher(self.secret, jitter_range=(2, 10))
+        other = AdaptiveTransecCipher(generate_shared_secret(), jitter_range=(2, 10))
+        
+        epochs = range(10**8, 10**8 + 1000)
+        durations = [a.get_adaptive_slot_duration(e) for e in epochs]
+        self.assertEqual([b.get_adaptive_slot_duration(e) for e in reversed(epochs)],
+                         durations[::-1])
+        self.assertNotEqual([other.get_adaptive_slot_duration(e) for e in epochs],
+                            durations)
+        self.assertEqual(a.get_current_slot(), b.get_slot_for_time(time.time()))
+    
+    def test_schedule_cache_bounded(self):
+        """Frames are generated lazily and only a few are kept."""
+        from transec.adaptive import SCHEDULE_CACHE_FRAMES, SCHEDULE_FRAME_EPOCHS
+        
+        cipher = AdaptiveTransecCipher(self.secret)
+        for frame in range(50):
+            cipher.get_adaptive_slot_duration(frame * SCHEDULE_FRAME_EPOCHS)
+        self.assertLessEqual(len(cipher._frames), SCHEDULE_CACHE_FRAMES)
+    
+    def test_adaptive_prime_normalization(self):
+        """Prime strategies normalize the adaptive epoch index."""
+        sender = AdaptiveTransecCipher(self.secret, prime_strategy="nearest")
+        receiver = AdaptiveTransecCipher(self.secret, prime_strategy="nearest")
+        
+        raw = sender.get_raw_current_slot()
+        self.assertEqual(sender.get_current_slot(), sender._normalize_slot(raw))
+        packet = sender.seal(b"prime adaptive", 5)
+        self.assertEqual(receiver.open(packet), b"prime adaptive")
 
 
 @unittest.skipIf(not OTAR_AVAILABLE, "OTAR features not available")
@@ -183,6 +249,46 @@ class TestOTARTransec(unittest.TestCase):
         
         self.assertEqual(decrypted, plaintext)
     
+    def test_refresh_invalidates_slot_keys(self):
+        """Test that cached slot keys don't survive a generation refresh."""
+        sender = OTARTransecCipher(self.secret, auto_refresh=False)
+        receiver = OTARTransecCipher(self.secret, auto_refresh=False)
+        
+        self.assertEqual(receiver.open(sender.seal(b"gen 0", 1)), b"gen 0")
+        self.assertEqual(len(sender._key_cache), 1)
+        
+        sender.manual_refresh()
+        receiver.manual_refresh()
+        self.assertEqual(len(sender._key_cache), 0)
+        
+        packet = sender.seal(b"gen 1", 2)
+        self.assertEqual(receiver.open(packet), b"gen 1")
+        # A receiver still holding generation 0 keys must not decrypt it
+        stale = OTARTransecCipher(self.secret, auto_refresh=False)
+        stale.seal(b"warm", 1)
+        self.assertIsNone(stale.open(b"\x00" + packet[1:]))
+    
+    def test_prefetch_stages_next_generation(self):
+        """Test that slot keys for the next generation are ready at refresh."""
+        sender = OTARTransecCipher(self.secret, refresh_interval=60)
+        receiver = OTARTransecCipher(self.secret, refresh_interval=60)
+        
+        # Far from the refresh: nothing staged
+        sender.prefetch()
+        self.assertIsNone(sender._staged_keys)
+        
+        # Refresh due within the prefetch horizon
+        sender.last_refresh_time -= 59
+        sender.prefetch()
+        self.assertIsNotNone(sender._staged_keys)
+        
+        sender.manual_refresh()
+        receiver.manual_refresh()
+        misses = sender._key_cache.misses
+        packet = sender.seal(b"first after rekey", 1)
+        self.assertEqual(sender._key_cache.misses, misses)
+        self.assertEqual(receiver.open(packet), b"first after rekey")
+    
     def test_generation_mismatch_handling(self):
         """Test handling of generation mismatch between sender/receiver."""
         sender = OTARTransecCipher(self.secret, auto_refresh=False)
@@ -201,6 +307,21 @@ class TestOTARTransec(unittest.TestCase):
         decrypted = receiver.open(packet)
         self.assertIsNone(decrypted, "Should fail to decrypt generation mismatch")
     
+    def test_batch_seal_open(self):
+        """seal_many/open_many carry the generation marker."""
+        sender = OTARTransecCipher(self.secret, auto_refresh=False)
+        receiver = OTARTransecCipher(self.secret, auto_refresh=False)
+        packets = sender.seal_many([b"a", b"b", b"c"], sequence=1)
+        self.assertTrue(all(p[0] == 0 for p in packets))
+        self.assertEqual(receiver.open(packets[0]), b"a")
+        self.assertEqual(receiver.open_many(packets + [b"x"]), [None, b"b", b"c", None])
+        
+        sender.manual_refresh()
+        receiver.manual_refresh()
+        packets = sender.seal_many([b"d"], sequence=1)
+        self.assertEqual(packets[0][0], 1)
+        self.assertEqual(receiver.open_many(packets), [b"d"])
+    
     def test_time_until_refresh(self):
         """Test refresh timing calculations."""
         cipher = OTARTransecCipher(
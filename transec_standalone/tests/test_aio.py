@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the TRANSEC asyncio datagram endpoints.
+
+Everything runs over UDP on 127.0.0.1 with ephemeral ports.
+"""
+
+import sys
+import os
+import asyncio
+import socket
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from transec import TransecCipher, generate_shared_secret
+from transec.aio import (
+    TransecDatagramProtocol,
+    create_datagram_server,
+    create_datagram_client,
+    packet_sequence,
+    MESSAGE_HEADER,
+    MESSAGE_HEADER_SIZE,
+    KIND_REQUEST,
+    KIND_REPLY,
+)
+from transec.sessions import ROLE_CLIENT
+
+
+class TestDatagramProtocol(unittest.TestCase):
+    """Test asyncio server/client endpoints."""
+    
+    def setUp(self):
+        self.secret = generate_shared_secret()
+        self.transports = []
+    
+    def run_scenario(self, coro):
+        async def run_and_close():
+            try:
+                await asyncio.wait_for(coro, 10)
+            finally:
+                for transport in self.transports:
+                    transport.close()
+                await asyncio.sleep(0)
+        asyncio.run(run_and_close())
+    
+    async def start(self, handler, **kwargs):
+        server_transport, server = await create_datagram_server(
+            TransecCipher(self.secret), handler, '127.0.0.1', 0, **kwargs)
+        port = server_transport.get_extra_info('sockname')[1]
+        client_transport, client = await create_datagram_client(
+            TransecCipher(self.secret), '127.0.0.1', port, **kwargs)
+        self.transports += [server_transport, client_transport]
+        return server, client
+    
+    def test_pipelined_requests(self):
+        """Concurrent requests each get their own reply."""
+        async def scenario():
+            server, client = await self.start(lambda plaintext, addr: b"re:" + plaintext)
+            messages = [b"m%d" % i for i in range(200)]
+            replies = await asyncio.gather(*(client.request(m) for m in messages))
+            self.assertEqual(replies, [b"re:" + m for m in messages])
+            self.assertEqual((server.received, server.rejected), (200, 0))
+        self.run_scenario(scenario())
+    
+    def test_executor_and_async_handler(self):
+        """AEAD work on a thread pool; coroutine handlers reply when done."""
+        async def handler(plaintext, addr):
+            await asyncio.sleep(0.01 if plaintext == b"slow" else 0)
+            return plaintext.upper()
+        
+        async def scenario():
+            with ThreadPoolExecutor(2) as executor:
+                server, client = await self.start(handler, executor=executor)
+                slow = asyncio.ensure_future(client.request(b"slow"))
+                self.assertEqual(await client.request(b"fast"), b"FAST")
+                self.assertFalse(slow.done())
+                self.assertEqual(await slow, b"SLOW")
+        self.run_scenario(scenario())
+    
+    def test_request_timeout(self):
+        """No reply -> None after the timeout."""
+        async def scenario():
+            server, client = await self.start(lambda plaintext, addr: None)
+            self.assertIsNone(await client.request(b"ping", timeout=0.05))
+            self.assertEqual(client._pending, {})
+            self.assertEqual(server.received, 1)
+        self.run_scenario(scenario())
+    
+    def test_rejects_forged_and_replayed(self):
+        """Bad datagrams are counted and never reach the handler."""
+        seen = []
+        
+        async def scenario():
+            server, client = await self.start(lambda plaintext, addr: seen.append(plaintext))
+            port = server.transport.get_extra_info('sockname')[1]
+            header = MESSAGE_HEADER.pack(KIND_REQUEST, 0)
+            packet = header + TransecCipher(self.secret).seal(b"once", 1, ROLE_CLIENT + header)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for datagram in (packet, packet, b"junk", packet[:-1] + b"\0"):
+                    sock.sendto(datagram, ('127.0.0.1', port))
+                    await asyncio.sleep(0.01)
+            self.assertEqual(seen, [b"once"])
+            self.assertEqual((server.received, server.rejected), (1, 3))
+        self.run_scenario(scenario())
+    
+    def test_clients_have_separate_replay_state(self):
+        """Replay windows are per address: two clients' sequences don't collide."""
+        async def scenario():
+            server, c1 = await self.start(lambda plaintext, addr: b"re:" + plaintext)
+            port = server.transport.get_extra_info('sockname')[1]
+            c2_transport, c2 = await create_datagram_client(
+                TransecCipher(self.secret), '127.0.0.1', port)
+            self.transports.append(c2_transport)
+            self.assertEqual(await c1.request(b"a"), b"re:a")
+            self.assertEqual(await c2.request(b"b"), b"re:b")
+            self.assertEqual((server.received, server.rejected), (2, 0))
+        self.run_scenario(scenario())
+    
+    def test_reply_uses_responders_sequence(self):
+        """Replies are sealed with the server's own counter and name the request."""
+        async def scenario():
+            server, client = await self.start(lambda plaintext, addr: b"re:" + plaintext)
+            server._sequence = 1000
+            seen = []
+            receive = client.datagram_received
+            client.datagram_received = lambda data, addr: (seen.append(data), receive(data, addr))
+            self.assertEqual(await client.request(b"a"), b"re:a")
+            self.assertEqual(MESSAGE_HEADER.unpack_from(seen[0]), (KIND_REPLY, 1))
+            self.assertEqual(packet_sequence(seen[0][MESSAGE_HEADER_SIZE:]), 1001)
+        self.run_scenario(scenario())
+    
+    def test_reflected_request_is_not_a_reply(self):
+        """A request bounced back to its sender doesn't resolve request()."""
+        async def scenario():
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as mirror:
+                mirror.bind(('127.0.0.1', 0))
+                mirror.setblocking(False)
+                transport, client = await create_datagram_client(
+                    TransecCipher(self.secret), *mirror.getsockname())
+                self.transports.append(transport)
+                loop = asyncio.get_running_loop()
+                
+                async def reflect():
+                    packet, addr = await loop.sock_recvfrom(mirror, 2048)
+                    mirror.sendto(packet, addr)
+                reflector = asyncio.ensure_future(reflect())
+                self.assertIsNone(await client.request(b"ping", timeout=0.1))
+                await reflector
+                self.assertEqual((client.received, client.rejected), (0, 1))
+        self.run_scenario(scenario())
+    
+    def test_outbound_backpressure(self):
+        """send() waits once the bounded queue is full and the transport is paused."""
+        async def scenario():
+            server, client = await self.start(lambda plaintext, addr: None, max_queue=4)
+            client.pause_writing()
+            # The writer holds one burst; the queue then fills up
+            for i in range(4 + 1):
+                await client.send(b"x")
+            await asyncio.sleep(0)
+            for i in range(3):
+                await client.send(b"x")
+            blocked = asyncio.ensure_future(client.send(b"x"))
+            await asyncio.sleep(0.02)
+            self.assertFalse(blocked.done())
+            client.resume_writing()
+            await blocked
+            await client.drain()
+            await asyncio.sleep(0.05)
+            self.assertEqual(client.sent, 9)
+            self.assertEqual(server.received, 9)
+        self.run_scenario(scenario())
+    
+    def test_close_fails_pending_requests(self):
+        async def scenario():
+            server, client = await self.start(lambda plaintext, addr: None)
+            pending = asyncio.ensure_future(client.request(b"ping"))
+            await asyncio.sleep(0.01)
+            client.close()
+            with self.assertRaises(ConnectionError):
+                await pending
+        self.run_scenario(scenario())
+    
+    def test_sequence_start_and_header(self):
+        protocol = TransecDatagramProtocol(TransecCipher(self.secret), sequence=41)
+        self.assertEqual(protocol.next_sequence(), 42)
+        self.assertEqual(packet_sequence(TransecCipher(self.secret).seal(b"", 7)), 7)
+        with self.assertRaises(ValueError):
+            TransecDatagramProtocol(TransecCipher(self.secret), max_queue=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
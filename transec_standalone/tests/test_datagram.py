@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for TRANSEC batched datagram I/O.
+
+Everything runs over UDP on 127.0.0.1 with ephemeral ports.
+"""
+
+import sys
+import os
+import socket
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from transec import TransecCipher, generate_shared_secret, recv_batch, send_batch
+
+
+class TestDatagramBatch(unittest.TestCase):
+    """Test recv_batch/send_batch over loopback."""
+    
+    def setUp(self):
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(('127.0.0.1', 0))
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.address = self.receiver.getsockname()
+    
+    def tearDown(self):
+        self.receiver.close()
+        self.sender.close()
+    
+    def test_drains_queued_datagrams(self):
+        """One call returns everything queued, up to max_packets."""
+        packets = [b"p%d" % i for i in range(20)]
+        self.assertEqual(send_batch(self.sender, packets, self.address), 20)
+        first = recv_batch(self.receiver, max_packets=16)
+        rest = recv_batch(self.receiver, max_packets=16)
+        self.assertEqual([p for p, _ in first + rest], packets)
+        self.assertEqual(first[0][1][1], self.sender.getsockname()[1])
+    
+    def test_socket_timeout_preserved(self):
+        """Draining neither waits on an empty queue nor changes the timeout."""
+        for timeout in (None, 5.0, 0.0):
+            self.receiver.settimeout(timeout)
+            send_batch(self.sender, [b"a", b"b"], self.address)
+            self.assertEqual(len(recv_batch(self.receiver)), 2)
+            self.assertEqual(self.receiver.gettimeout(), timeout)
+    
+    def test_empty_queue(self):
+        """The first receive behaves like recvfrom."""
+        self.receiver.settimeout(0.01)
+        with self.assertRaises(socket.timeout):
+            recv_batch(self.receiver)
+        self.receiver.setblocking(False)
+        with self.assertRaises(BlockingIOError):
+            recv_batch(self.receiver)
+    
+    def test_connected_socket(self):
+        self.sender.connect(self.address)
+        self.assertEqual(send_batch(self.sender, [b"x", b"y"]), 2)
+        self.assertEqual([p for p, _ in recv_batch(self.receiver)], [b"x", b"y"])
+    
+    def test_sealed_burst(self):
+        """seal_many -> send_batch -> recv_batch -> open_many."""
+        secret = generate_shared_secret()
+        messages = [b"telemetry %d" % i for i in range(32)]
+        send_batch(self.sender, TransecCipher(secret).seal_many(messages, sequence=1),
+                   self.address)
+        batch = recv_batch(self.receiver)
+        self.assertEqual(TransecCipher(secret).open_many([p for p, _ in batch]), messages)
+
+
+if __name__ == '__main__':
+    unittest.main()
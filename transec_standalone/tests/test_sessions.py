@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the TRANSEC multi-peer session table.
+"""
+
+import sys
+import os
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from transec import (
+    SessionTable,
+    PeerSession,
+    compute_channel_hash,
+    derive_peer_secret,
+    master_secret_resolver,
+    generate_shared_secret,
+    ROLE_CLIENT,
+)
+
+
+def make_client(master, peer_id, **kwargs):
+    """Client-side table holding just its own session."""
+    client = SessionTable(role=ROLE_CLIENT, **kwargs)
+    client.add_peer(peer_id, derive_peer_secret(master, compute_channel_hash(peer_id)))
+    return client
+
+
+class TestSessionRouting(unittest.TestCase):
+    """Test per-peer routing and isolation."""
+    
+    def setUp(self):
+        self.master = generate_shared_secret()
+        self.server = SessionTable(master_secret_resolver(self.master))
+    
+    def test_channel_hash_matches_wire_format(self):
+        """Channel hash uses the hr_core.wire construction."""
+        import hashlib, struct
+        expected = struct.unpack('<I', hashlib.blake2b(b"alice", digest_size=4).digest())[0]
+        self.assertEqual(compute_channel_hash("alice"), expected)
+    
+    def test_many_peers_round_trip(self):
+        """Each peer's packets open in its own session; replies go back."""
+        clients = {f"peer-{i}": make_client(self.master, f"peer-{i}") for i in range(50)}
+        for peer_id, client in clients.items():
+            session, plaintext = self.server.open(client.seal(peer_id, peer_id.encode()),
+                                                  address=(peer_id, 1))
+            self.assertEqual(plaintext, peer_id.encode())
+            self.assertEqual(session.address, (peer_id, 1))
+            reply = self.server.seal(session, b"ack:" + plaintext)
+            self.assertEqual(client.open(reply)[1], b"ack:" + peer_id.encode())
+        self.assertEqual(len(self.server), 50)
+    
+    def test_replay_per_peer(self):
+        """Replays are rejected per session; other peers are unaffected."""
+        alice = make_client(self.master, "alice")
+        bob = make_client(self.master, "bob")
+        packet = alice.seal("alice", b"once", sequence=1)
+        self.assertIsNotNone(self.server.open(packet))
+        self.assertIsNone(self.server.open(packet))
+        self.assertIsNotNone(self.server.open(bob.seal("bob", b"once", sequence=1)))
+    
+    def test_rerouted_packet_rejected(self):
+        """The channel hash is authenticated: swapping it breaks the tag."""
+        alice = make_client(self.master, "alice")
+        packet = alice.seal("alice", b"for alice")
+        forged = compute_channel_hash("mallory").to_bytes(4, 'little') + packet[4:]
+        self.assertIsNone(self.server.open(forged))
+        self.assertEqual(len(self.server), 0)
+    
+    def test_reflected_packet_rejected(self):
+        """A packet the server sealed doesn't open as one from the peer."""
+        alice = make_client(self.master, "alice")
+        session, _ = self.server.open(alice.seal("alice", b"hi", sequence=1))
+        self.server.seal(session, b"ack")
+        reflected = self.server.seal(session, b"server-says-transfer-ok")
+        self.assertIsNone(self.server.open(reflected))
+        self.assertEqual(alice.open(reflected)[1], b"server-says-transfer-ok")
+        # Nor does a client accept its own packets
+        self.assertIsNone(alice.open(alice.seal("alice", b"echo")))
+    
+    def test_unknown_peer_without_resolver(self):
+        """A registry-only table ignores unregistered peers."""
+        table = SessionTable()
+        table.add_peer("alice", generate_shared_secret())
+        stranger = make_client(self.master, "bob")
+        self.assertIsNone(table.open(stranger.seal("bob", b"hi")))
+        with self.assertRaises(KeyError):
+            table.seal("bob", b"hi")
+    
+    def test_registered_peer(self):
+        """Statically registered secrets work without a resolver."""
+        secret = generate_shared_secret()
+        server = SessionTable()
+        server.add_peer("alice", secret)
+        client = SessionTable(role=ROLE_CLIENT)
+        client.add_peer("alice", secret)
+        session, plaintext = server.open(client.seal("alice", b"hello"))
+        self.assertEqual(plaintext, b"hello")
+        self.assertEqual(session.peer_id, "alice")
+    
+    def test_invalid_secret(self):
+        with self.assertRaises(ValueError):
+            SessionTable().add_peer("alice", b"short")
+        with self.assertRaises(ValueError):
+            master_secret_resolver(b"short")
+
+
+class TestSessionEviction(unittest.TestCase):
+    """Test bounded memory and replay-safe LRU eviction."""
+    
+    def setUp(self):
+        self.master = generate_shared_secret()
+        self.server = SessionTable(master_secret_resolver(self.master), max_peers=3,
+                                   drift_window=1)
+        self.current = self.server.get_current_slot()
+    
+    def _open(self, peer_id, slot_offset=0, sequence=1):
+        client = make_client(self.master, peer_id, drift_window=1)
+        packet = client.seal(peer_id, b"x", sequence=sequence,
+                             slot_index=self.current + slot_offset)
+        return self.server.open(packet)
+    
+    def test_active_peers_not_evicted(self):
+        """A full table of recently active peers refuses new peers."""
+        for i in range(3):
+            self.assertIsNotNone(self._open(f"p{i}"))
+        self.assertIsNone(self._open("p3"))
+        self.assertEqual(self.server.refused, 1)
+        self.assertEqual(len(self.server), 3)
+    
+    def test_aged_out_peer_evicted_lru(self):
+        """The LRU peer is evicted once its packets are out of the drift window."""
+        self.assertIsNotNone(self._open("old", slot_offset=-1))
+        self.assertIsNotNone(self._open("p1"))
+        self.assertIsNotNone(self._open("p2"))
+        # Pretend "old" last accepted a packet 2 slots ago
+        self.server._sessions[compute_channel_hash("old")].last_slot = self.current - 2
+        self.assertIsNotNone(self._open("new"))
+        self.assertEqual(self.server.evicted, 1)
+        self.assertNotIn("old", self.server)
+        self.assertIn("new", self.server)
+    
+    def test_session_state_is_compact(self):
+        """Per-peer state uses __slots__ (no per-instance dict)."""
+        self._open("p0")
+        session = next(iter(self.server._sessions.values()))
+        self.assertIsInstance(session, PeerSession)
+        self.assertFalse(hasattr(session, '__dict__'))
+        self.assertFalse(hasattr(session.keys, '__dict__'))
+        self.assertFalse(hasattr(session.replay, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for TRANSEC stream mode (fragmentation and reassembly).
+"""
+
+import sys
+import os
+import random
+import unittest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from transec import (
+    TransecCipher,
+    OTARTransecCipher,
+    StreamSender,
+    StreamReceiver,
+    generate_shared_secret,
+)
+from transec.stream import STREAM_HEADER, STREAM_HEADER_SIZE, MAX_FRAGMENTS
+
+
+class TestStreamMode(unittest.TestCase):
+    """Test StreamSender/StreamReceiver."""
+    
+    def setUp(self):
+        secret = generate_shared_secret()
+        self.sender = StreamSender(TransecCipher(secret), record_size=512)
+        self.receiver = StreamReceiver(TransecCipher(secret))
+        self.rng = random.Random(5)
+    
+    def test_fragment_roundtrip(self):
+        """Large messages are split into records no bigger than record_size."""
+        message = self.rng.randbytes(100_000)
+        records = self.sender.send(message)
+        self.assertEqual(len(records), -(-len(message) // self.sender.payload_size))
+        self.assertTrue(all(len(r) <= 512 for r in records))
+        self.assertEqual(len(records[0]), 512)
+        
+        delivered = self.receiver.receive_many(records)
+        self.assertEqual(delivered, [message])
+        self.assertEqual(self.receiver.pending, 0)
+        self.assertEqual(self.receiver.buffered, 0)
+    
+    def test_out_of_order_and_interleaved(self):
+        """Fragments of several messages arrive shuffled."""
+        size = self.sender.payload_size
+        messages = [self.rng.randbytes(n) for n in (0, 1, size - 1, size, size + 1, 5000, 20000)]
+        records = [r for m in messages for r in self.sender.send(m)]
+        self.rng.shuffle(records)
+        
+        delivered = self.receiver.receive_many(records)
+        self.assertEqual(sorted(delivered), sorted(messages))
+        self.assertEqual(self.receiver.received, len(messages))
+        self.assertEqual(self.receiver.rejected, 0)
+    
+    def test_duplicate_records_ignored(self):
+        records = self.sender.send(b"x" * 2000)
+        self.assertEqual(self.receiver.receive_many(records[:2] + records[:2]), [])
+        self.assertEqual(self.receiver.receive_many(records[2:]), [b"x" * 2000])
+    
+    def test_restarted_sender_not_spliced(self):
+        """A sender restarted in a later slot reuses message ids without mixing messages."""
+        cipher = self.sender.cipher
+        slot = cipher.get_current_slot()
+        cipher.get_current_slot = lambda: slot - 1
+        before = self.sender.send(b"a" * 2000)
+        restarted = StreamSender(cipher, record_size=512)
+        cipher.get_current_slot = lambda: slot
+        after = restarted.send(b"b" * 2000)
+        self.assertEqual(STREAM_HEADER.unpack_from(before[0]), STREAM_HEADER.unpack_from(after[0]))
+        
+        # The first message loses its last fragment; the restarted one arrives whole
+        self.assertEqual(self.receiver.receive_many(before[:-1]), [])
+        self.assertEqual(self.receiver.receive_many(after), [b"b" * 2000])
+        self.assertEqual(self.receiver.pending, 1)
+        self.assertEqual(self.receiver.rejected, 0)
+    
+    def test_fragment_index_authenticated(self):
+        """Rewriting the stream header breaks authentication."""
+        message = b"a" * self.sender.payload_size + b"b" * 10
+        first, second = self.sender.send(message)
+        flags, message_id, index, count = STREAM_HEADER.unpack_from(first)
+        forged = STREAM_HEADER.pack(flags, message_id, 1, count) + first[STREAM_HEADER_SIZE:]
+        
+        self.assertEqual(self.receiver.receive(forged), [])
+        self.assertEqual(self.receiver.receive(b"short"), [])
+        self.assertEqual(self.receiver.rejected, 2)
+        self.assertEqual(self.receiver.receive_many([second, first]), [message])
+    
+    def test_coalescing(self):
+        """Small messages share records; order and boundaries survive."""
+        sender = StreamSender(self.sender.cipher, record_size=512, coalesce=True)
+        messages = [self.rng.randbytes(self.rng.randrange(0, 60)) for _ in range(200)]
+        records = []
+        for message in messages:
+            records.extend(sender.send(message))
+        records.extend(sender.flush())
+        self.assertEqual(sender.flush(), [])
+        self.assertLess(len(records), len(messages) // 5)
+        self.assertTrue(all(len(r) <= 512 for r in records))
+        
+        self.assertEqual(self.receiver.receive_many(records), messages)
+    
+    def test_coalescing_keeps_order_with_large_messages(self):
+        sender = StreamSender(self.sender.cipher, record_size=512, coalesce=True)
+        big = self.rng.randbytes(3000)
+        records = sender.send(b"one") + sender.send(big) + sender.send(b"two") + sender.flush()
+        self.assertEqual(self.receiver.receive_many(records), [b"one", big, b"two"])
+    
+    def test_bounded_reassembly(self):
+        """Incomplete messages are evicted oldest-first past the bounds."""
+        receiver = StreamReceiver(self.receiver.cipher, max_pending=2)
+        partial = [self.sender.send(bytes([i]) * 1000) for i in range(3)]
+        for records in partial:
+            receiver.receive(records[0])
+        self.assertEqual(receiver.pending, 2)
+        self.assertEqual(receiver.dropped, 1)
+        self.assertEqual(receiver.receive_many(partial[0][1:]), [])  # evicted
+        self.assertEqual(receiver.receive_many(partial[2][1:]), [bytes([2]) * 1000])
+        
+        receiver = StreamReceiver(self.receiver.cipher, max_buffer=1000)
+        records = self.sender.send(b"z" * 5000)
+        self.assertEqual(receiver.receive_many(records[:-1]), [])
+        self.assertLessEqual(receiver.buffered, 1000)
+        self.assertGreater(receiver.dropped, 0)
+    
+    def test_sequences_consumed_per_record(self):
+        sender = StreamSender(self.sender.cipher, record_size=512, sequence=100)
+        records = sender.send(b"q" * 1000)
+        self.assertEqual(sender.sequence, 100 + len(records))
+        self.assertEqual(STREAM_HEADER.unpack_from(records[-1])[1:], (101, 2, 3))
+    
+    def test_limits(self):
+        with self.assertRaises(ValueError):
+            StreamSender(self.sender.cipher, record_size=40)
+        with self.assertRaises(ValueError):
+            StreamReceiver(self.receiver.cipher, max_pending=0)
+        sender = StreamSender(self.sender.cipher, record_size=64)
+        with self.assertRaises(ValueError):
+            sender.send(bytes(sender.payload_size * MAX_FRAGMENTS + 1))
+    
+    def test_otar_cipher(self):
+        """Works with ciphers that add their own framing."""
+        secret = generate_shared_secret()
+        sender = StreamSender(OTARTransecCipher(secret, auto_refresh=False), record_size=300)
+        receiver = StreamReceiver(OTARTransecCipher(secret, auto_refresh=False))
+        message = self.rng.randbytes(4000)
+        records = sender.send(message)
+        self.assertTrue(all(len(r) <= 300 for r in records))
+        self.assertEqual(receiver.receive_many(records[::-1]), [message])
+
+
+if __name__ == '__main__':
+    unittest.main()
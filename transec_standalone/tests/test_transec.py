@@ -9,18 +9,25 @@ Tests cover:
 - Clock drift tolerance
 - Interoperability
 - Edge cases
+- Slot key caching and prefetching
+- Batch seal/open
 """
 
+import asyncio
 import sys
 import os
 import time
 import unittest
+from unittest import mock
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+import transec.core
 from transec import (
     TransecCipher,
+    SlotPrefetcher,
+    ReplayWindow,
     generate_shared_secret,
     seal_packet,
     open_packet,
@@ -181,6 +188,65 @@ class TestReplayProtection(unittest.TestCase):
             self.assertEqual(decrypted, plaintext)
 
 
+class TestReplayWindow(unittest.TestCase):
+    """Test the per-slot sliding-window replay filter."""
+    
+    def test_window_slides(self):
+        """Sequences are accepted once, and only within the window."""
+        window = ReplayWindow(ring_size=6, window=64)
+        self.assertTrue(window.update(100, 10))
+        self.assertFalse(window.update(100, 10))
+        self.assertTrue(window.update(100, 5))      # late but inside window
+        self.assertTrue(window.update(100, 200))    # jump ahead
+        self.assertFalse(window.check(100, 136))    # now 64 behind: too old
+        self.assertTrue(window.update(100, 137))
+        self.assertFalse(window.update(100, 137))
+        self.assertFalse(window.update(100, 200))
+    
+    def test_slots_independent(self):
+        """The same sequence in different slots is not a replay."""
+        window = ReplayWindow(ring_size=6)
+        for slot in range(100, 106):
+            self.assertTrue(window.update(slot, 1))
+        self.assertFalse(window.update(103, 1))
+    
+    def test_aged_out_slot_rejected(self):
+        """A slot whose ring position was taken by a newer slot is rejected."""
+        window = ReplayWindow(ring_size=6)
+        window.update(100, 1)
+        window.update(106, 1)
+        self.assertFalse(window.check(100, 2))
+        self.assertFalse(window.update(100, 2))
+    
+    def test_forged_packet_does_not_advance_window(self):
+        """A packet that fails authentication doesn't consume its sequence."""
+        secret = generate_shared_secret()
+        cipher = TransecCipher(secret)
+        packet = cipher.seal(b"real", 5)
+        forged = packet[:-1] + bytes([packet[-1] ^ 1])
+        self.assertIsNone(cipher.open(forged))
+        self.assertEqual(cipher.open(packet), b"real")
+        self.assertIsNone(cipher.open(packet))
+    
+    def test_reordering_limit(self):
+        """Sequences older than replay_window in the same slot are rejected."""
+        cipher = TransecCipher(generate_shared_secret(), replay_window=16)
+        slot = cipher.get_current_slot()
+        old = cipher.seal(b"old", 1, slot_index=slot)
+        self.assertIsNotNone(cipher.open(cipher.seal(b"new", 100, slot_index=slot)))
+        self.assertIsNone(cipher.open(old))
+    
+    def test_flood_uses_fixed_memory(self):
+        """Many accepted packets don't grow replay state."""
+        cipher = TransecCipher(generate_shared_secret())
+        slot = cipher.get_current_slot()
+        for seq in range(5000):
+            self.assertIsNotNone(cipher.open(cipher.seal(b"x", seq, slot_index=slot)))
+        live = [entry for entry in cipher._replay._ring if entry is not None]
+        self.assertEqual(len(live), 1)
+        self.assertLess(live[0][2].bit_length(), cipher._replay.window + 1)
+
+
 class TestClockDrift(unittest.TestCase):
     """Test clock drift tolerance."""
     
@@ -289,6 +355,27 @@ class TestInteroperability(unittest.TestCase):
         
         self.assertEqual(decrypted, plaintext)
     
+    def test_wire_format(self):
+        """Packets keep the documented layout, nonce and AAD construction."""
+        import struct
+        from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+        secret = generate_shared_secret()
+        cipher = TransecCipher(secret)
+        slot = cipher.get_current_slot() + (1 << 33)  # exercises the 32-bit truncation
+        packet = seal_packet(secret, slot, 0x1_0000_0007, b"payload", b"ad")
+        
+        self.assertEqual(struct.unpack(">QQ", packet[:16]), (slot, 0x1_0000_0007))
+        nonce = struct.pack(">II", slot & 0xFFFFFFFF, 7) + packet[16:20]
+        aead = ChaCha20Poly1305(derive_slot_key(secret, slot))
+        self.assertEqual(aead.decrypt(nonce, packet[20:], packet[:16] + b"ad"), b"payload")
+        
+        # A packet built by hand the same way opens, from any bytes-like buffer
+        aad = struct.pack(">QQ", slot, 9) + b"ad"
+        manual = packet[:8] + struct.pack(">Q", 9) + b"rand" + aead.encrypt(
+            struct.pack(">II", slot & 0xFFFFFFFF, 9) + b"rand", b"by hand", aad)
+        for buffer in (manual, bytearray(manual), memoryview(manual)):
+            self.assertEqual(open_packet(secret, buffer, b"ad", local_slot=slot), b"by hand")
+    
     def test_different_slot_durations(self):
         """Test that sender and receiver must have same slot duration."""
         secret = generate_shared_secret()
@@ -368,6 +455,165 @@ class TestEdgeCases(unittest.TestCase):
         self.assertEqual(decrypted, plaintext)
 
 
+class TestSlotKeyCache(unittest.TestCase):
+    """Test per-slot key/AEAD caching."""
+    
+    def test_key_derived_once_per_slot(self):
+        """Many packets in one slot derive the key once."""
+        cipher = TransecCipher(generate_shared_secret())
+        slot = cipher.get_current_slot()
+        for seq in range(50):
+            packet = cipher.seal(b"msg", seq, slot_index=slot)
+            self.assertEqual(cipher.open(packet), b"msg")
+        self.assertEqual(cipher._key_cache.misses, 1)
+        self.assertEqual(cipher._key_cache.hits, 99)
+    
+    def test_cache_bounded_to_window(self):
+        """Only the drift window (plus slack) stays cached."""
+        cipher = TransecCipher(generate_shared_secret(), drift_window=1)
+        current = cipher.get_current_slot()
+        for slot in range(current - 10, current + 1):
+            cipher.seal(b"msg", 1, slot_index=slot)
+        self.assertEqual(len(cipher._key_cache), cipher._key_cache.capacity)
+        self.assertIn(current, cipher._key_cache)
+        self.assertNotIn(current - 10, cipher._key_cache)
+    
+    def test_cached_cipher_matches_derivation(self):
+        """Packets from the cache decrypt with the stateless helper."""
+        secret = generate_shared_secret()
+        cipher = TransecCipher(secret)
+        slot = cipher.get_current_slot()
+        cipher.seal(b"warm", 1, slot_index=slot)
+        packet = cipher.seal(b"cached", 2, slot_index=slot)
+        self.assertEqual(open_packet(secret, packet, local_slot=slot), b"cached")
+    
+    def test_secret_change_invalidates(self):
+        """Replacing the shared secret drops cached slot keys."""
+        cipher = TransecCipher(generate_shared_secret())
+        cipher.seal(b"msg", 1)
+        self.assertEqual(len(cipher._key_cache), 1)
+        cipher.shared_secret = generate_shared_secret()
+        self.assertEqual(len(cipher._key_cache), 0)
+    
+    def test_secret_change_during_derivation(self):
+        """A key derived from the old secret is not cached after a change."""
+        cipher = TransecCipher(generate_shared_secret())
+        old_secret, new_secret = cipher.shared_secret, generate_shared_secret()
+        derive = cipher.derive_slot_key
+        
+        def racing(slot_index):
+            key = derive(slot_index)
+            if cipher.shared_secret is old_secret:
+                cipher.shared_secret = new_secret  # lands while a miss is deriving
+            return key
+        
+        slot = cipher.get_current_slot()
+        with mock.patch.object(cipher, "derive_slot_key", racing):
+            cipher.prefetch(lookahead=0)
+        packet = cipher.seal(b"msg", 1, slot_index=slot)
+        self.assertEqual(open_packet(new_secret, packet, local_slot=slot), b"msg")
+
+
+class TestSlotPrefetch(unittest.TestCase):
+    """Test background pre-derivation of upcoming slot keys."""
+    
+    def test_prefetch_derives_next_slot(self):
+        """A packet in the next slot finds its key already cached."""
+        cipher = TransecCipher(generate_shared_secret())
+        self.assertEqual(cipher.prefetch(lookahead=1), 2)
+        self.assertEqual(cipher.prefetch(lookahead=1), 0)
+        misses = cipher._key_cache.misses
+        next_slot = cipher.get_raw_current_slot() + 1
+        cipher.seal(b"msg", 1, slot_index=next_slot)
+        self.assertEqual(cipher._key_cache.misses, misses)
+    
+    def test_prefetch_normalizes_prime_slots_once(self):
+        """Prime normalization is memoized per raw slot."""
+        cipher = TransecCipher(generate_shared_secret(), prime_strategy="nearest")
+        with mock.patch.object(transec.core, "normalize_slot_to_prime",
+                               wraps=transec.core.normalize_slot_to_prime) as normalize:
+            cipher.prefetch(lookahead=1)
+            calls = normalize.call_count
+            packet = cipher.seal(b"msg", 1)
+            self.assertEqual(cipher.open(packet), b"msg")
+            self.assertEqual(normalize.call_count, calls)
+    
+    def test_thread_prefetches_across_boundary(self):
+        """The background thread has the new slot ready at rollover."""
+        cipher = TransecCipher(generate_shared_secret(), slot_duration=1)
+        with SlotPrefetcher(cipher, interval=0.05):
+            # Sleep to just past the next boundary, then check the cache
+            time.sleep(1.02 - time.time() % 1)
+            time.sleep(0.06)
+            self.assertIn(cipher.get_current_slot(), cipher._key_cache)
+            self.assertIn(cipher.get_current_slot() + 1, cipher._key_cache)
+    
+    def test_asyncio_task(self):
+        """The prefetcher also runs as an asyncio task."""
+        cipher = TransecCipher(generate_shared_secret())
+        
+        async def run_briefly():
+            task = asyncio.ensure_future(SlotPrefetcher(cipher, interval=0.01).run())
+            await asyncio.sleep(0.03)
+            task.cancel()
+        
+        asyncio.run(run_briefly())
+        self.assertIn(cipher.get_current_slot() + 1, cipher._key_cache)
+
+
+class TestBatchSealOpen(unittest.TestCase):
+    """Test seal_many/open_many."""
+    
+    def setUp(self):
+        self.secret = generate_shared_secret()
+        self.sender = TransecCipher(self.secret)
+        self.receiver = TransecCipher(self.secret)
+    
+    def test_round_trip(self):
+        """A burst round-trips with consecutive sequence numbers."""
+        messages = [b"reading %d" % i for i in range(50)]
+        packets = self.sender.seal_many(messages, sequence=100, associated_data=b"hdr")
+        self.assertEqual(len(packets), 50)
+        sequences = [int.from_bytes(p[8:16], 'big') for p in packets]
+        self.assertEqual(sequences, list(range(100, 150)))
+        self.assertEqual(self.receiver.open_many(packets, b"hdr"), messages)
+    
+    def test_interoperates_with_single_packet_api(self):
+        """Batch packets open with open() and vice versa."""
+        packets = self.sender.seal_many([b"a", b"b"], sequence=1)
+        self.assertEqual([self.receiver.open(p) for p in packets], [b"a", b"b"])
+        single = [self.sender.seal(b"c", 3), self.sender.seal(b"d", 4)]
+        self.assertEqual(self.receiver.open_many(single), [b"c", b"d"])
+    
+    def test_explicit_slot(self):
+        """slot_index is honoured for the whole burst."""
+        slot = self.sender.get_current_slot() - 1
+        packets = self.sender.seal_many([b"x", b"y"], sequence=1, slot_index=slot)
+        self.assertTrue(all(int.from_bytes(p[:8], 'big') == slot for p in packets))
+        self.assertEqual(self.receiver.open_many(packets), [b"x", b"y"])
+    
+    def test_rejections_are_per_packet(self):
+        """Bad packets yield None without affecting their neighbours."""
+        good = self.sender.seal_many([b"one", b"two", b"three"], sequence=1)
+        tampered = bytearray(good[1])
+        tampered[-1] ^= 1
+        stale = self.sender.seal(b"old", 9, slot_index=self.sender.get_current_slot() - 10)
+        batch = [good[0], bytes(tampered), b"short", stale, good[2], good[0]]
+        self.assertEqual(self.receiver.open_many(batch),
+                         [b"one", None, None, None, b"three", None])
+        # The tampered copy did not burn sequence 2
+        self.assertEqual(self.receiver.open(good[1]), b"two")
+    
+    def test_replay_check_optional(self):
+        """check_replay=False accepts duplicates."""
+        packets = self.sender.seal_many([b"m"], sequence=1) * 2
+        self.assertEqual(self.receiver.open_many(packets, check_replay=False), [b"m", b"m"])
+    
+    def test_empty(self):
+        self.assertEqual(self.sender.seal_many([], sequence=1), [])
+        self.assertEqual(self.receiver.open_many([]), [])
+
+
 class TestPerformance(unittest.TestCase):
     """Basic performance tests."""
     
@@ -20,6 +20,31 @@ Advanced features:
     
     # Automatic key refresh
     otar = OTARTransecCipher(secret, refresh_interval=3600)
+
+Servers with many peers:
+    from transec import SessionTable, master_secret_resolver
+    
+    table = SessionTable(master_secret_resolver(master_secret))
+    session, plaintext = table.open(packet, address=addr)
+
+Bursts of packets:
+    from transec import recv_batch, send_batch
+    
+    send_batch(sock, cipher.seal_many(messages, sequence=seq), address)
+    plaintexts = cipher.open_many([packet for packet, _ in recv_batch(sock)])
+
+asyncio endpoints:
+    from transec import create_datagram_server, create_datagram_client
+    
+    await create_datagram_server(cipher, handler, "0.0.0.0", 9999)
+    transport, client = await create_datagram_client(cipher, host, 9999)
+    reply = await client.request(b"ping")
+
+Messages larger than a datagram:
+    from transec import StreamSender, StreamReceiver
+    
+    records = StreamSender(cipher).send(large_payload)
+    messages = StreamReceiver(cipher).receive_many(records)
 """
 
 __version__ = '0.1.0'
@@ -29,6 +54,9 @@ __license__ = 'MIT'
 # Core functionality
 from .core import (
     TransecCipher,
+    SlotKeyCache,
+    SlotPrefetcher,
+    ReplayWindow,
     generate_shared_secret,
     seal_packet,
     open_packet,
@@ -37,6 +65,37 @@ from .core import (
     DEFAULT_SLOT_DURATION,
     DEFAULT_DRIFT_WINDOW,
     DEFAULT_PRIME_STRATEGY,
+    DEFAULT_REPLAY_WINDOW,
+)
+
+# Multi-peer sessions
+from .sessions import (
+    SessionTable,
+    PeerSession,
+    compute_channel_hash,
+    derive_peer_secret,
+    master_secret_resolver,
+    ROLE_SERVER,
+    ROLE_CLIENT,
+)
+
+# Batched datagram I/O
+from .datagram import (
+    recv_batch,
+    send_batch,
+)
+
+# asyncio endpoints
+from .aio import (
+    TransecDatagramProtocol,
+    create_datagram_server,
+    create_datagram_client,
+)
+
+# Stream mode (fragmentation and reassembly)
+from .stream import (
+    StreamSender,
+    StreamReceiver,
 )
 
 # Advanced features
@@ -73,11 +132,36 @@ except ImportError:
 __all__ = [
     # Core
     'TransecCipher',
+    'SlotKeyCache',
+    'SlotPrefetcher',
+    'ReplayWindow',
     'generate_shared_secret',
     'seal_packet',
     'open_packet',
     'derive_slot_key',
     
+    # Multi-peer sessions
+    'SessionTable',
+    'PeerSession',
+    'compute_channel_hash',
+    'derive_peer_secret',
+    'master_secret_resolver',
+    'ROLE_SERVER',
+    'ROLE_CLIENT',
+    
+    # Batched datagram I/O
+    'recv_batch',
+    'send_batch',
+    
+    # asyncio endpoints
+    'TransecDatagramProtocol',
+    'create_datagram_server',
+    'create_datagram_client',
+    
+    # Stream mode
+    'StreamSender',
+    'StreamReceiver',
+    
     # Advanced
     'AdaptiveTransecCipher',
     'OTARTransecCipher',
@@ -93,6 +177,7 @@ __all__ = [
     'DEFAULT_SLOT_DURATION',
     'DEFAULT_DRIFT_WINDOW',
     'DEFAULT_PRIME_STRATEGY',
+    'DEFAULT_REPLAY_WINDOW',
     
     # Feature flags
     'ADAPTIVE_AVAILABLE',
@@ -7,13 +7,29 @@ unpredictability, as suggested in the Lamarr-level enhancement ideas.
 
 This module adds:
 1. Adaptive slot duration using ChaCha20-based CSPRNG
-2. Deterministic jitter (2-10ms default) per epoch
-3. Backward compatible with standard TRANSEC
+2. Deterministic jitter (2-10s default) per epoch
+3. A cumulative slot schedule, so timestamps resolve to the epoch that
+   actually contains them
+
+Schedule layout: wall-clock time is split into frames of
+SCHEDULE_FRAME_EPOCHS epochs each.  A frame's durations are drawn in one
+ChaCha20 keystream keyed by (secret, frame), nudged by a second here and
+there so every frame has the same total length, and stored as a
+prefix-sum array.  Resolving a timestamp is then a divmod to find the
+frame and a binary search inside it; frames are generated lazily and
+only a few are kept.  Because frames have a fixed length, epoch numbers
+are continuous across frames and both peers agree on them without
+replaying the schedule from the Unix epoch.
 """
 
 import struct
 import hashlib
-from typing import Tuple
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import List, Tuple
 from .core import TransecCipher, DEFAULT_CONTEXT, DEFAULT_DRIFT_WINDOW
 
 try:
@@ -23,14 +39,20 @@ try:
 except ImportError:
     CRYPTO_AVAILABLE = False
 
+SCHEDULE_FRAME_EPOCHS = 256  # Epochs per schedule frame (one keystream each)
+SCHEDULE_CACHE_FRAMES = 4    # Frames kept; covers the drift window across a boundary
+
 
 class AdaptiveTransecCipher(TransecCipher):
     """
     Enhanced TRANSEC cipher with adaptive slot duration.
     
-    Uses deterministic PRNG seeded from shared secret + epoch to vary
-    slot durations, adding Lamarr-style "piano roll" unpredictability
+    Uses deterministic PRNG seeded from shared secret + schedule frame to
+    vary slot durations, adding Lamarr-style "piano roll" unpredictability
     while maintaining synchronization between sender and receiver.
+    
+    Slot indices count adaptive epochs, not base_duration intervals, so
+    both peers must use the adaptive cipher with the same jitter_range.
     """
     
     def __init__(
@@ -48,7 +70,8 @@ class AdaptiveTransecCipher(TransecCipher):
         Args:
             shared_secret: Pre-shared 256-bit (32 bytes) secret key
             context: Application-specific context string for key derivation
-            base_duration: Base duration for slot timing (seconds)
+            base_duration: Base duration for slot timing (seconds); paces
+                prefetching, slot boundaries come from the schedule
             drift_window: Number of slots to accept (±) for clock drift tolerance
             jitter_range: Tuple of (min_duration, max_duration) in seconds
             prime_strategy: Slot normalization strategy (see TransecCipher)
@@ -74,101 +97,167 @@ class AdaptiveTransecCipher(TransecCipher):
         
         self.base_duration = base_duration
         self.jitter_range = jitter_range
-        self._jitter_cache = {}  # Cache computed jitter values
+        # Every frame spans exactly this many seconds (mean duration per epoch)
+        self.frame_length = SCHEDULE_FRAME_EPOCHS * (min_dur + max_dur) // 2
+        self._frames = OrderedDict()  # frame -> epoch start offsets (prefix sums)
+        self._frames_lock = threading.Lock()
+        self._last_frame = (None, None)  # (frame, offsets) fast path for get_current_slot
     
-    def _derive_jitter_seed(self, epoch: int) -> bytes:
+    def _derive_jitter_seed(self, frame: int) -> bytes:
         """
-        Derive deterministic seed for jitter PRNG from epoch.
+        Derive deterministic seed for a schedule frame's keystream.
         
         Args:
-            epoch: Time epoch identifier
+            frame: Schedule frame index
         
         Returns:
             32-byte seed for PRNG
         """
-        # Use HKDF-like derivation: HMAC-SHA256(secret, "jitter" || epoch)
+        # Use HKDF-like derivation: HMAC-SHA256(secret, "jitter" || frame)
         h = hashlib.sha256()
         h.update(self.shared_secret)
         h.update(b"slot_jitter")
-        h.update(struct.pack(">Q", epoch))
+        h.update(struct.pack(">q", frame))
         return h.digest()
     
-    def _prng_uint32(self, seed: bytes) -> int:
+    def _keystream(self, seed: bytes, length: int) -> bytes:
         """
-        Generate pseudo-random uint32 from seed using ChaCha20.
+        Generate length pseudo-random bytes from seed using ChaCha20.
         
         Args:
             seed: 32-byte seed
+            length: Number of bytes
         
         Returns:
-            Pseudo-random 32-bit unsigned integer
+            ChaCha20 keystream (encryption of zero bytes)
         """
-        # Use ChaCha20 stream cipher as CSPRNG
-        # Generate 4 bytes of keystream and interpret as uint32
         cipher = Cipher(
             algorithms.ChaCha20(seed, b'\x00' * 16),  # key, nonce
             mode=None,
             backend=default_backend()
         )
-        encryptor = cipher.encryptor()
-        random_bytes = encryptor.update(b'\x00\x00\x00\x00')
+        return cipher.encryptor().update(bytes(length))
+    
+    def _frame_durations(self, frame: int) -> List[int]:
+        """
+        Draw the epoch durations of one schedule frame.
+        
+        One uint32 per epoch is mapped into jitter_range, plus one extra
+        word that picks where the length correction starts.  The drawn
+        total is then corrected one second at a time, walking the frame
+        and skipping epochs already at the limit, until it equals
+        frame_length.  The correction is small (about the square root of
+        the epoch count) and every duration stays within jitter_range.
+        
+        Args:
+            frame: Schedule frame index
+        
+        Returns:
+            SCHEDULE_FRAME_EPOCHS durations in seconds
+        """
+        epochs = SCHEDULE_FRAME_EPOCHS
+        keystream = self._keystream(self._derive_jitter_seed(frame), 4 * (epochs + 1))
+        words = struct.unpack(">%dI" % (epochs + 1), keystream)
+        
+        min_dur, max_dur = self.jitter_range
+        jitter_span = max_dur - min_dur + 1
+        durations = [min_dur + word % jitter_span for word in words[:epochs]]
+        
+        excess = sum(durations) - self.frame_length
+        step, limit = (-1, min_dur) if excess > 0 else (1, max_dur)
+        i = words[epochs] % epochs
+        while excess:
+            if durations[i] != limit:
+                durations[i] += step
+                excess += step
+            i = (i + 1) % epochs
+        return durations
+    
+    def _frame_offsets(self, frame: int) -> List[int]:
+        """
+        Epoch start offsets within a frame, generating the frame on first use.
+        
+        Args:
+            frame: Schedule frame index
+        
+        Returns:
+            SCHEDULE_FRAME_EPOCHS + 1 prefix sums, from 0 to frame_length
+        """
+        with self._frames_lock:
+            offsets = self._frames.get(frame)
+            if offsets is not None:
+                self._frames.move_to_end(frame)
+                return offsets
         
-        return struct.unpack(">I", random_bytes)[0]
+        offsets = list(accumulate(self._frame_durations(frame), initial=0))
+        with self._frames_lock:
+            self._frames[frame] = offsets
+            while len(self._frames) > SCHEDULE_CACHE_FRAMES:
+                self._frames.popitem(last=False)
+        return offsets
     
     def get_adaptive_slot_duration(self, epoch: int) -> int:
         """
         Get adaptive slot duration for given epoch.
         
         Args:
-            epoch: Time epoch identifier
+            epoch: Raw (unnormalized) slot index
         
         Returns:
             Slot duration in seconds (varies based on epoch)
         """
-        # Check cache first
-        if epoch in self._jitter_cache:
-            return self._jitter_cache[epoch]
-        
-        # Derive deterministic jitter
-        seed = self._derive_jitter_seed(epoch)
-        random_val = self._prng_uint32(seed)
+        frame, k = divmod(epoch, SCHEDULE_FRAME_EPOCHS)
+        offsets = self._frame_offsets(frame)
+        return offsets[k + 1] - offsets[k]
+    
+    def get_slot_bounds(self, epoch: int) -> Tuple[int, int]:
+        """
+        Wall-clock interval covered by an epoch.
         
-        # Map to jitter range
-        min_dur, max_dur = self.jitter_range
-        jitter_span = max_dur - min_dur + 1
-        duration = min_dur + (random_val % jitter_span)
+        Args:
+            epoch: Raw (unnormalized) slot index
         
-        # Cache for reuse
-        self._jitter_cache[epoch] = duration
+        Returns:
+            (start, end) Unix timestamps; the epoch covers start <= t < end
+        """
+        frame, k = divmod(epoch, SCHEDULE_FRAME_EPOCHS)
+        offsets = self._frame_offsets(frame)
+        frame_start = frame * self.frame_length
+        return frame_start + offsets[k], frame_start + offsets[k + 1]
+    
+    def get_raw_slot_for_time(self, timestamp: float) -> int:
+        """
+        Epoch containing timestamp, by binary search over the frame schedule.
         
-        # Limit cache size
-        if len(self._jitter_cache) > 1000:
-            # Remove oldest half of entries
-            sorted_epochs = sorted(self._jitter_cache.keys())
-            for old_epoch in sorted_epochs[:500]:
-                del self._jitter_cache[old_epoch]
+        Args:
+            timestamp: Unix timestamp
         
-        return duration
+        Returns:
+            Raw (unnormalized) slot index
+        """
+        frame, offset = divmod(timestamp, self.frame_length)
+        frame = int(frame)
+        cached_frame, offsets = self._last_frame
+        if cached_frame != frame:
+            offsets = self._frame_offsets(frame)
+            self._last_frame = (frame, offsets)
+        # offsets[0] == 0 <= offset, so bisect_right is at least 1; the min()
+        # guards a float offset that rounded up to frame_length
+        k = min(bisect_right(offsets, offset) - 1, SCHEDULE_FRAME_EPOCHS - 1)
+        return frame * SCHEDULE_FRAME_EPOCHS + k
+    
+    def get_raw_current_slot(self) -> int:
+        """Get current raw adaptive slot index (before normalization)."""
+        return self.get_raw_slot_for_time(time.time())
     
     def get_current_slot(self) -> int:
         """
         Get current time slot index with adaptive duration.
         
-        This implementation accumulates epochs with varying durations
-        to maintain synchronization while introducing timing jitter.
-        
-        Note: For simplicity in this minimal implementation, we use
-        base_duration as the primary slot calculator and apply jitter
-        as a secondary modulation. A production version would track
-        cumulative epoch durations more precisely.
+        The epoch is looked up in the cumulative schedule, so slot
+        boundaries follow the jittered durations exactly.
         """
-        import time
-        
-        # Use base duration for primary slot calculation
-        raw_slot = int(time.time() / self.base_duration)
-        
-        # Apply normalization if using prime strategy
-        return self._normalize_slot(raw_slot)
+        return self._normalize_slot(self.get_raw_slot_for_time(time.time()))
     
     def get_slot_for_time(self, timestamp: float) -> int:
         """
@@ -178,9 +267,6 @@ class AdaptiveTransecCipher(TransecCipher):
             timestamp: Unix timestamp
         
         Returns:
-            Slot index
+            Slot index (normalized per prime_strategy)
         """
-        # Simplified: use base duration for slot calculation
-        # Production would track cumulative durations
-        raw_slot = int(timestamp / self.base_duration)
-        return self._normalize_slot(raw_slot)
+        return self._normalize_slot(self.get_raw_slot_for_time(timestamp))
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+TRANSEC asyncio Datagram Endpoints
+
+TransecDatagramProtocol runs TRANSEC over an asyncio UDP transport for
+both servers and clients:
+
+- Requests that arrive in the same event-loop iteration are opened
+  together with open_many
+- Outbound messages go through a bounded queue; send() waits when it is
+  full, and writing also pauses while the transport's buffer is full
+- AEAD work can be handed to a worker thread pool (executor) so large
+  bursts don't stall the event loop
+- request() pipelines request/response flows: any number of requests
+  can be in flight, and each reply is matched to its request
+- Replay state is kept per peer address
+
+Every datagram is a TRANSEC packet behind a small cleartext header:
+
+    kind (1) || in_reply_to (8) || TRANSEC packet
+
+kind is KIND_REQUEST for send() and request() and KIND_REPLY for
+handler replies, which carry the answered request's sequence number in
+in_reply_to.  Every packet, replies included, is sealed with the
+sender's own next sequence number.  The header is part of the AEAD
+associated data, together with the sender's role (ROLE_SERVER for
+create_datagram_server endpoints, ROLE_CLIENT for clients), so a packet
+reflected back to its sender never opens, and a reply can't be
+re-pointed at another request.
+
+Every endpoint holding a secret seals under the same slot keys, and
+their nonces differ only by (slot, sequence) and 32 random bits, so a
+secret is meant for one server and a client or two, not a fleet.  For
+many clients, use SessionTable, which gives each peer its own secret.
+
+Example:
+    async def echo(plaintext, addr):
+        return b"Echo: " + plaintext
+    
+    transport, server = await create_datagram_server(cipher, echo, "0.0.0.0", 9999)
+    
+    transport, client = await create_datagram_client(cipher, "server", 9999)
+    replies = await asyncio.gather(*(client.request(m) for m in messages))
+"""
+
+import asyncio
+import inspect
+import struct
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from .core import PACKET_HEADER_SIZE, ReplayWindow, TransecCipher, _parse_packet
+from .datagram import DEFAULT_BATCH_SIZE
+from .sessions import DEFAULT_MAX_PEERS, ROLE_CLIENT, ROLE_SERVER
+
+DEFAULT_MAX_QUEUE = 1024  # Outbound messages (and unopened datagrams) buffered per endpoint
+DEFAULT_REQUEST_TIMEOUT = 2.0  # seconds
+MESSAGE_HEADER = struct.Struct(">BQ")  # kind, in_reply_to
+MESSAGE_HEADER_SIZE = MESSAGE_HEADER.size  # 9
+KIND_REQUEST = 0  # send() and request()
+KIND_REPLY = 1    # Handler reply; in_reply_to is the request's sequence
+_REQUEST_HEADER = MESSAGE_HEADER.pack(KIND_REQUEST, 0)
+
+Handler = Callable[[bytes, Any], Union[Optional[bytes], Awaitable[Optional[bytes]]]]
+
+def packet_sequence(packet: bytes) -> int:
+    """Sequence number from a TRANSEC packet header."""
+    return _parse_packet(packet)[1]
+
+
+def _resolve_none(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class TransecDatagramProtocol(asyncio.DatagramProtocol):
+    """
+    asyncio UDP endpoint that seals and opens TRANSEC packets.
+    
+    Packets are opened without the cipher's own replay window; each
+    peer address gets its own window instead, checked on the event loop.
+    At most max_peers windows are kept, and the least recently seen one is
+    only dropped once every packet it accepted is outside the drift
+    window (until then, datagrams from new addresses are rejected).
+    Sealing runs in a single writer task, so an executor with any number
+    of threads is safe.
+    """
+    
+    def __init__(
+        self,
+        cipher: TransecCipher,
+        handler: Optional[Handler] = None,
+        executor: Optional[Executor] = None,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        associated_data: bytes = b"",
+        sequence: int = 0,
+        max_peers: int = DEFAULT_MAX_PEERS,
+        role: bytes = ROLE_SERVER
+    ):
+        """
+        Args:
+            cipher: TransecCipher (or AdaptiveTransecCipher) for the peers' secret
+            handler: Called as handler(plaintext, addr) for each message that
+                is not a reply to request(); a bytes return value (or the result
+                of awaiting it) is sent back as the reply
+            executor: Thread pool for seal/open work (default: the event loop thread)
+            max_queue: Bound on queued outbound messages and unopened datagrams
+            associated_data: Additional authenticated data for every packet
+            sequence: Last sequence number used; the first message gets sequence + 1
+            max_peers: Peer addresses to keep replay windows for
+            role: ROLE_SERVER or ROLE_CLIENT; packets are sealed under this
+                role and only opened from the other one
+        """
+        if max_queue < 1:
+            raise ValueError("max_queue must be >= 1")
+        if max_peers < 1:
+            raise ValueError("max_peers must be >= 1")
+        if role not in (ROLE_SERVER, ROLE_CLIENT):
+            raise ValueError("role must be ROLE_SERVER or ROLE_CLIENT")
+        self.cipher = cipher
+        self.handler = handler
+        self.executor = executor
+        self.max_queue = max_queue
+        self.associated_data = associated_data
+        self.max_peers = max_peers
+        self.role = role
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        
+        self.received = 0   # authenticated messages
+        self.rejected = 0   # failed authentication, replay or out of window
+        self.dropped = 0    # datagrams discarded because the inbound buffer was full
+        self.sent = 0
+        
+        self._sequence = sequence
+        self._peer_role = ROLE_CLIENT if role == ROLE_SERVER else ROLE_SERVER
+        # addr -> [replay window, highest slot accepted]
+        self._peers: "OrderedDict[Any, list]" = OrderedDict()
+        self._pending: Dict[int, "asyncio.Future[bytes]"] = {}
+        self._inbound: List[Tuple[bytes, Any]] = []
+        self._opening = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outbound: Optional[asyncio.Queue] = None
+        self._can_write: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._tasks = set()
+    
+    # -- asyncio callbacks ----------------------------------------------------
+    
+    def connection_made(self, transport):
+        self.transport = transport
+        self._loop = asyncio.get_event_loop()
+        self._outbound = asyncio.Queue(self.max_queue)
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+        self._writer = self._loop.create_task(self._write_loop())
+    
+    def connection_lost(self, exc):
+        if self._writer is not None:
+            self._writer.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("transport closed"))
+        self._pending.clear()
+    
+    def datagram_received(self, data: bytes, addr):
+        if len(self._inbound) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._inbound.append((data, addr))
+        if not self._opening:
+            # Open on the next loop iteration so a burst is opened together
+            self._opening = True
+            self._spawn(self._open_loop())
+    
+    def error_received(self, exc):
+        # ICMP errors (e.g. port unreachable) are not fatal for UDP
+        pass
+    
+    def pause_writing(self):
+        self._can_write.clear()
+    
+    def resume_writing(self):
+        self._can_write.set()
+    
+    # -- public API -----------------------------------------------------------
+    
+    def next_sequence(self) -> int:
+        self._sequence += 1
+        return self._sequence
+    
+    async def send(self, plaintext: bytes, addr=None, sequence: Optional[int] = None) -> int:
+        """
+        Queue a message for sending, waiting while the outbound queue is full.
+        
+        Args:
+            plaintext: Data to encrypt
+            addr: Destination (default: the connected peer)
+            sequence: Sequence number (defaults to the endpoint's next one)
+        
+        Returns:
+            The sequence number used
+        """
+        if sequence is None:
+            sequence = self.next_sequence()
+        await self._outbound.put((plaintext, addr, sequence, _REQUEST_HEADER))
+        return sequence
+    
+    async def request(
+        self,
+        plaintext: bytes,
+        addr=None,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT
+    ) -> Optional[bytes]:
+        """
+        Send a message and wait for the peer's reply to it.
+        
+        Many requests may be awaited concurrently; replies are matched by
+        the request's sequence number, not arrival order.
+        
+        Returns:
+            Reply plaintext, or None if no reply arrived within timeout
+        """
+        sequence = self.next_sequence()
+        future = self._loop.create_future()
+        self._pending[sequence] = future
+        # A timer callback is much cheaper than wait_for's extra task
+        timer = self._loop.call_later(timeout, _resolve_none, future)
+        try:
+            await self.send(plaintext, addr, sequence)
+            return await future
+        finally:
+            timer.cancel()
+            self._pending.pop(sequence, None)
+    
+    async def drain(self):
+        """Wait until every queued outbound message has been sent."""
+        await self._outbound.join()
+    
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+    
+    # -- internals ------------------------------------------------------------
+    
+    def _spawn(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        return await self._loop.run_in_executor(self.executor, func, *args)
+    
+    def _seal_batch(self, batch: List[Tuple[bytes, Any, int, bytes]]) -> List[bytes]:
+        seal = self.cipher.seal
+        prefix = self.role
+        ad = self.associated_data
+        return [header + seal(plaintext, sequence, prefix + header + ad)
+                for plaintext, _, sequence, header in batch]
+    
+    def _open_batch(self, datagrams: List[bytes]) -> List[Optional[bytes]]:
+        """Open a burst: requests (one shared header) together, replies one by one."""
+        results: List[Optional[bytes]] = [None] * len(datagrams)
+        prefix = self._peer_role
+        ad = self.associated_data
+        requests = []
+        for i, datagram in enumerate(datagrams):
+            if len(datagram) < MESSAGE_HEADER_SIZE + PACKET_HEADER_SIZE:
+                continue
+            header = datagram[:MESSAGE_HEADER_SIZE]
+            if header == _REQUEST_HEADER:
+                requests.append(i)
+            elif datagram[0] == KIND_REPLY:
+                results[i] = self.cipher.open(datagram[MESSAGE_HEADER_SIZE:], prefix + header + ad,
+                                              check_replay=False)
+        if requests:
+            opened = self.cipher.open_many([datagrams[i][MESSAGE_HEADER_SIZE:] for i in requests],
+                                           prefix + _REQUEST_HEADER + ad, check_replay=False)
+            for i, plaintext in zip(requests, opened):
+                results[i] = plaintext
+        return results
+    
+    def _accept(self, addr, slot_index: int, sequence: int) -> bool:
+        """Per-peer replay check for an authenticated packet."""
+        peer = self._peers.get(addr)
+        if peer is None:
+            if len(self._peers) >= self.max_peers:
+                oldest = next(iter(self._peers))
+                if self.cipher.in_window(self._peers[oldest][1]):
+                    return False  # its packets could still be replayed
+                del self._peers[oldest]
+            # Same ring and width as the cipher's own window
+            replay = self.cipher._replay
+            peer = [ReplayWindow(replay.ring_size, replay.window), slot_index]
+            self._peers[addr] = peer
+        else:
+            self._peers.move_to_end(addr)
+        if not peer[0].update(slot_index, sequence):
+            return False
+        peer[1] = max(peer[1], slot_index)
+        return True
+    
+    async def _open_loop(self):
+        try:
+            while self._inbound:
+                batch, self._inbound = self._inbound, []
+                plaintexts = await self._run(self._open_batch, [datagram for datagram, _ in batch])
+                for (datagram, addr), plaintext in zip(batch, plaintexts):
+                    if plaintext is not None:
+                        slot_index, sequence, _ = _parse_packet(datagram, MESSAGE_HEADER_SIZE)
+                        if not self._accept(addr, slot_index, sequence):
+                            plaintext = None
+                    if plaintext is None:
+                        self.rejected += 1
+                        continue
+                    self.received += 1
+                    kind, in_reply_to = MESSAGE_HEADER.unpack_from(datagram)
+                    await self._dispatch(plaintext, addr, sequence, kind, in_reply_to)
+        finally:
+            self._opening = False
+    
+    async def _dispatch(self, plaintext: bytes, addr, sequence: int, kind: int, in_reply_to: int):
+        if kind == KIND_REPLY:
+            # A reply whose request already timed out is dropped
+            future = self._pending.pop(in_reply_to, None)
+            if future is not None and not future.done():
+                future.set_result(plaintext)
+            return
+        if self.handler is None:
+            return
+        
+        reply = self.handler(plaintext, addr)
+        if inspect.isawaitable(reply):
+            self._spawn(self._reply_later(reply, addr, sequence))
+        elif reply is not None:
+            # Waiting here when the queue is full holds back further opens,
+            # so inbound datagrams back up (and are dropped) instead of memory
+            await self._queue_reply(reply, addr, sequence)
+    
+    async def _reply_later(self, awaitable, addr, sequence: int):
+        reply = await awaitable
+        if reply is not None:
+            await self._queue_reply(reply, addr, sequence)
+    
+    async def _queue_reply(self, reply: bytes, addr, request_sequence: int):
+        header = MESSAGE_HEADER.pack(KIND_REPLY, request_sequence)
+        await self._outbound.put((reply, addr, self.next_sequence(), header))
+    
+    async def _write_loop(self):
+        queue = self._outbound
+        while True:
+            batch = [await queue.get()]
+            if queue.empty():
+                # Let producers woken in this loop iteration add to the burst
+                await asyncio.sleep(0)
+            while len(batch) < DEFAULT_BATCH_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                packets = await self._run(self._seal_batch, batch)
+                await self._can_write.wait()
+                for packet, (_, addr, _, _) in zip(packets, batch):
+                    self.transport.sendto(packet, addr)
+                self.sent += len(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+
+async def create_datagram_server(
+    cipher: TransecCipher,
+    handler: Handler,
+    host: str,
+    port: int,
+    **kwargs
+) -> Tuple[asyncio.DatagramTransport, TransecDatagramProtocol]:
+    """
+    Bind a TRANSEC UDP server on the running event loop.
+    
+    Args:
+        cipher: Cipher for the clients' secret
+        handler: handler(plaintext, addr) -> reply bytes, None, or an awaitable of either
+        host: Local address to bind
+        port: Local port (0 for an ephemeral port)
+        **kwargs: Passed to TransecDatagramProtocol (executor, max_queue,
+            associated_data, sequence, max_peers)
+    
+    Returns:
+        (transport, protocol)
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: TransecDatagramProtocol(cipher, handler, role=ROLE_SERVER, **kwargs),
+        local_addr=(host, port))
+
+
+async def create_datagram_client(
+    cipher: TransecCipher,
+    host: str,
+    port: int,
+    handler: Optional[Handler] = None,
+    **kwargs
+) -> Tuple[asyncio.DatagramTransport, TransecDatagramProtocol]:
+    """
+    Open a TRANSEC UDP endpoint connected to a server.
+    
+    Args:
+        cipher: Cipher for this client's secret, as held by the server
+        host: Server address
+        port: Server port
+        handler: Optional handler for messages that are not replies
+        **kwargs: Passed to TransecDatagramProtocol (executor, max_queue,
+            associated_data, sequence, max_peers)
+    
+    Returns:
+        (transport, protocol)
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: TransecDatagramProtocol(cipher, handler, role=ROLE_CLIENT, **kwargs),
+        remote_addr=(host, port))
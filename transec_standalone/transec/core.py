@@ -9,15 +9,21 @@ Key features:
 - Zero-RTT encryption after bootstrap
 - HKDF-SHA256 key derivation from shared secret + time slot
 - ChaCha20-Poly1305 AEAD for authenticated encryption
-- Replay protection via sequence tracking
+- Per-slot key/AEAD cache so steady-state packets skip key derivation
+- Optional background prefetcher that derives upcoming slot keys early
+- Batch seal_many/open_many for bursts of packets
+- Replay protection via per-slot sliding-window bitmaps
 - Configurable slot duration and drift tolerance
 - Prime-based slot normalization for enhanced synchronization stability
 """
 
+import asyncio
 import os
 import struct
+import threading
 import time
-from typing import Tuple, Optional, Set
+from collections import OrderedDict
+from typing import Callable, List, Sequence, Tuple, Optional
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
@@ -36,9 +42,216 @@ DEFAULT_CONTEXT = b"z-sandbox:transec:v1"
 DEFAULT_SLOT_DURATION = 5  # seconds
 DEFAULT_DRIFT_WINDOW = 2   # ±2 slots
 DEFAULT_PRIME_STRATEGY = "none"  # Options: "none", "nearest", "next"
+KEY_CACHE_SLACK = 2  # Cached slots beyond current ± drift_window
+NORMALIZED_SLOT_CACHE = 64  # Raw -> normalized slot memo entries
+DEFAULT_REPLAY_WINDOW = 1024  # Sequences tracked below the highest seen, per slot
 
 
-class TransecCipher:
+# Wire format, shared by seal and open:
+#   packet = slot_index (8) || sequence (8) || random (4) || ciphertext + tag
+#   nonce  = slot_index (4, lower bits) || sequence (4, lower bits) || random (4)
+#   AAD    = slot_index (8) || sequence (8) || associated_data
+_HEADER = struct.Struct(">QQ4s")
+_NONCE = struct.Struct(">II4s")
+PACKET_HEADER_SIZE = _HEADER.size  # 20
+_AAD_PREFIX_SIZE = 16
+_LOW32 = 0xFFFFFFFF
+
+
+def _seal_with(
+    cipher: ChaCha20Poly1305,
+    slot_index: int,
+    sequence: int,
+    plaintext: bytes,
+    associated_data: bytes = b""
+) -> bytes:
+    """
+    Build one TRANSEC packet with a ready AEAD instance.
+    
+    The header and nonce are each packed in a single call, and the AAD
+    prefix is sliced from the header rather than packed a second time.
+    
+    Returns:
+        slot_index (8) || sequence (8) || random (4) || ciphertext + tag
+    """
+    random_bytes = os.urandom(4)
+    header = _HEADER.pack(slot_index, sequence, random_bytes)
+    nonce = _NONCE.pack(slot_index & _LOW32, sequence & _LOW32, random_bytes)
+    aad = header[:_AAD_PREFIX_SIZE] + associated_data
+    return header + cipher.encrypt(nonce, plaintext, aad)
+
+
+def _parse_packet(packet: bytes, offset: int = 0) -> Tuple[int, int, bytes]:
+    """(slot_index, sequence, random) from the header at packet[offset:] (>= 20 bytes)."""
+    return _HEADER.unpack_from(packet, offset)
+
+
+def _open_with(
+    cipher: ChaCha20Poly1305,
+    packet: bytes,
+    slot_index: int,
+    sequence: int,
+    random_bytes: bytes,
+    associated_data: bytes = b"",
+    offset: int = 0
+) -> Optional[bytes]:
+    """
+    Verify and decrypt a parsed packet; None if authentication fails.
+    
+    The ciphertext and AAD prefix are memoryview slices of the packet,
+    so nothing is copied before the AEAD sees it.
+    
+    Args:
+        packet: Buffer holding the TRANSEC packet at `offset`
+        slot_index, sequence, random_bytes: Header fields from _parse_packet
+        associated_data: Additional authenticated data (must match seal)
+        offset: Start of the TRANSEC packet within `packet`
+    """
+    view = memoryview(packet)
+    prefix = view[offset:offset + _AAD_PREFIX_SIZE]
+    aad = prefix.tobytes() + associated_data if associated_data else prefix
+    nonce = _NONCE.pack(slot_index & _LOW32, sequence & _LOW32, random_bytes)
+    try:
+        return cipher.decrypt(nonce, view[offset + PACKET_HEADER_SIZE:], aad)
+    except Exception:
+        # Authentication failed
+        return None
+
+
+class SlotKeyCache:
+    """
+    Bounded slot -> (key, AEAD) cache.
+    
+    A slot key only changes once per slot_duration, so every packet in a
+    slot can reuse the derived key and its ready ChaCha20Poly1305 instance.
+    The cache holds the drift window (current ± drift_window) plus a little
+    slack; the least recently used slot is evicted as new slots arrive.
+    Thread-safe, so a SlotPrefetcher can fill it while packets are sealed.
+    Every clear() starts a new generation, and a key whose derivation
+    straddled one is derived again rather than cached, so a racing miss
+    never re-inserts a key from the old secret.
+    """
+    
+    __slots__ = ("capacity", "_entries", "_lock", "_generation", "hits", "misses")
+    
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._entries: "OrderedDict[int, Tuple[bytes, ChaCha20Poly1305]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, slot_index: int, derive: Callable[[int], bytes]) -> Tuple[bytes, ChaCha20Poly1305]:
+        """Return (key, aead) for a slot, deriving it on a miss."""
+        with self._lock:
+            entry = self._entries.get(slot_index)
+            if entry is not None:
+                self._entries.move_to_end(slot_index)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+        
+        while True:
+            # Derive outside the lock so hits on other slots never wait on HKDF
+            key = derive(slot_index)
+            entry = (key, ChaCha20Poly1305(key))
+            with self._lock:
+                if self._generation == generation:
+                    self._insert(slot_index, entry)
+                    return entry
+                # Cleared meanwhile: derive may have read the old secret
+                generation = self._generation
+    
+    def put(self, slot_index: int, entry: Tuple[bytes, ChaCha20Poly1305]):
+        """Insert a ready (key, aead) entry, evicting the LRU slot if full."""
+        with self._lock:
+            self._insert(slot_index, entry)
+    
+    def _insert(self, slot_index: int, entry: Tuple[bytes, ChaCha20Poly1305]):
+        # Caller holds the lock
+        self._entries[slot_index] = entry
+        self._entries.move_to_end(slot_index)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached slot (e.g. after the shared secret changes)."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+    
+    def __contains__(self, slot_index: int) -> bool:
+        return slot_index in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SlotClock:
+    """
+    Time-slot arithmetic shared by TransecCipher and SessionTable.
+    
+    Maps wall-clock time to (optionally prime-normalized) slot indices,
+    memoizes the normalization, and applies the ± drift_window check.
+    """
+    
+    def __init__(
+        self,
+        slot_duration: int = DEFAULT_SLOT_DURATION,
+        drift_window: int = DEFAULT_DRIFT_WINDOW,
+        prime_strategy: str = DEFAULT_PRIME_STRATEGY
+    ):
+        if prime_strategy not in ["none", "nearest", "next"]:
+            raise ValueError(f"Invalid prime_strategy: {prime_strategy}")
+        
+        self.slot_duration = slot_duration
+        self.drift_window = drift_window
+        self.prime_strategy = prime_strategy
+        self._normalized_slots = {}  # raw slot -> normalized slot
+    
+    def get_current_slot(self) -> int:
+        """Get current time slot index based on system time (normalized)."""
+        raw_slot = int(time.time() / self.slot_duration)
+        return self._normalize_slot(raw_slot)
+    
+    def get_raw_current_slot(self) -> int:
+        """Get current raw time slot index (before normalization)."""
+        return int(time.time() / self.slot_duration)
+    
+    def _normalize_slot(self, slot_index: int) -> int:
+        """
+        Normalize slot index according to prime strategy.
+        
+        Args:
+            slot_index: Raw slot index
+        
+        Returns:
+            Normalized slot index (prime or original)
+        """
+        if self.prime_strategy == "none" or not PRIME_OPTIMIZATION_AVAILABLE:
+            return slot_index
+        
+        normalized = self._normalized_slots.get(slot_index)
+        if normalized is None:
+            normalized = normalize_slot_to_prime(slot_index, strategy=self.prime_strategy)
+            if len(self._normalized_slots) >= NORMALIZED_SLOT_CACHE:
+                self._normalized_slots.clear()
+            self._normalized_slots[slot_index] = normalized
+        return normalized
+    
+    def in_window(self, slot_index: int) -> bool:
+        """
+        True if a packet's slot is within ± drift_window of the current slot.
+        
+        The packet's slot_index is already normalized by the sender, so it
+        is compared with the normalized current slot (like to like).
+        """
+        return abs(self.get_current_slot() - slot_index) <= self.drift_window
+
+
+class TransecCipher(SlotClock):
     """
     Time-synchronized cipher implementing TRANSEC protocol.
     
@@ -55,7 +268,8 @@ class TransecCipher:
         context: bytes = DEFAULT_CONTEXT,
         slot_duration: int = DEFAULT_SLOT_DURATION,
         drift_window: int = DEFAULT_DRIFT_WINDOW,
-        prime_strategy: str = DEFAULT_PRIME_STRATEGY
+        prime_strategy: str = DEFAULT_PRIME_STRATEGY,
+        replay_window: int = DEFAULT_REPLAY_WINDOW
     ):
         """
         Initialize TRANSEC cipher.
@@ -69,6 +283,8 @@ class TransecCipher:
                            - "none": Use raw slot indices (backward compatible)
                            - "nearest": Map to nearest prime for lower curvature
                            - "next": Map to next prime >= slot_index
+            replay_window: Out-of-order sequences accepted per slot, counted
+                           back from the highest sequence seen in that slot
         
         Raises:
             ValueError: If shared_secret is not 32 bytes
@@ -76,43 +292,27 @@ class TransecCipher:
         if len(shared_secret) != 32:
             raise ValueError("Shared secret must be exactly 32 bytes (256 bits)")
         
-        if prime_strategy not in ["none", "nearest", "next"]:
-            raise ValueError(f"Invalid prime_strategy: {prime_strategy}")
+        super().__init__(slot_duration, drift_window, prime_strategy)
+        
+        # Derived keys and AEAD objects for the slots in the drift window
+        self._key_cache = SlotKeyCache(2 * drift_window + 1 + KEY_CACHE_SLACK)
         
         self.shared_secret = shared_secret
         self.context = context
-        self.slot_duration = slot_duration
-        self.drift_window = drift_window
-        self.prime_strategy = prime_strategy
         
-        # Replay protection: track seen (slot_index, sequence) pairs
-        self._seen_messages: Set[Tuple[int, int]] = set()
-        self._cleanup_interval = 100  # Clean old entries every N messages
-        self._message_count = 0
+        # Replay protection: sliding window per slot in the drift window
+        # (+1 so the slot that just aged out never aliases a live one)
+        self._replay = ReplayWindow(2 * drift_window + 2 + KEY_CACHE_SLACK, replay_window)
     
-    def get_current_slot(self) -> int:
-        """Get current time slot index based on system time (normalized)."""
-        raw_slot = int(time.time() / self.slot_duration)
-        return self._normalize_slot(raw_slot)
+    @property
+    def shared_secret(self) -> bytes:
+        return self._shared_secret
     
-    def get_raw_current_slot(self) -> int:
-        """Get current raw time slot index (before normalization)."""
-        return int(time.time() / self.slot_duration)
-    
-    def _normalize_slot(self, slot_index: int) -> int:
-        """
-        Normalize slot index according to prime strategy.
-        
-        Args:
-            slot_index: Raw slot index
-        
-        Returns:
-            Normalized slot index (prime or original)
-        """
-        if self.prime_strategy == "none" or not PRIME_OPTIMIZATION_AVAILABLE:
-            return slot_index
-        
-        return normalize_slot_to_prime(slot_index, strategy=self.prime_strategy)
+    @shared_secret.setter
+    def shared_secret(self, value: bytes):
+        # Cached slot keys belong to the old secret (OTAR refresh etc.)
+        self._shared_secret = value
+        self._key_cache.clear()
     
     def derive_slot_key(self, slot_index: int) -> bytes:
         """
@@ -136,6 +336,35 @@ class TransecCipher:
         )
         return hkdf.derive(self.shared_secret)
     
+    def _slot_cipher(self, slot_index: int) -> ChaCha20Poly1305:
+        """Cached AEAD instance for a (normalized) slot."""
+        return self._key_cache.get(slot_index, self.derive_slot_key)[1]
+    
+    def prefetch(self, lookahead: int = 1) -> int:
+        """
+        Normalize and derive keys for the next `lookahead` slots now.
+        
+        Called ahead of a slot boundary (see SlotPrefetcher) so the first
+        packet of the new slot finds its key and normalized index cached.
+        
+        Args:
+            lookahead: Number of upcoming slots to prepare
+        
+        Returns:
+            Number of slot keys that had to be derived
+        """
+        # Room for the prefetched slots on top of the drift window
+        self._key_cache.capacity = max(
+            self._key_cache.capacity, 2 * self.drift_window + 1 + lookahead)
+        derived = 0
+        raw_current = self.get_raw_current_slot()
+        for raw_slot in range(raw_current, raw_current + lookahead + 1):
+            slot_index = self._normalize_slot(raw_slot)
+            if slot_index not in self._key_cache:
+                self._slot_cipher(slot_index)
+                derived += 1
+        return derived
+    
     def seal(
         self,
         plaintext: bytes,
@@ -161,33 +390,9 @@ class TransecCipher:
             # Normalize explicitly provided slot index
             slot_index = self._normalize_slot(slot_index)
         
-        # Derive key for this slot
-        key = self.derive_slot_key(slot_index)
-        cipher = ChaCha20Poly1305(key)
-        
-        # Generate random component for nonce
-        random_bytes = os.urandom(4)
-        
-        # Construct nonce: slot_index (4, lower bits) || sequence (4, lower bits) || random (4)
-        # ChaCha20-Poly1305 requires 12-byte nonces
-        nonce = (
-            struct.pack(">I", slot_index & 0xFFFFFFFF) +
-            struct.pack(">I", sequence & 0xFFFFFFFF) +
-            random_bytes
-        )
-        
-        # Construct AAD: slot_index (full 64-bit) || sequence (full 64-bit) || associated_data
-        aad = (
-            struct.pack(">Q", slot_index) +
-            struct.pack(">Q", sequence) +
-            associated_data
-        )
-        
-        # Encrypt and authenticate
-        ciphertext = cipher.encrypt(nonce, plaintext, aad)
-        
-        # Return: slot_index || sequence || random || ciphertext
-        return struct.pack(">Q", slot_index) + struct.pack(">Q", sequence) + random_bytes + ciphertext
+        # Key for this slot (derived once per slot)
+        cipher = self._slot_cipher(slot_index)
+        return _seal_with(cipher, slot_index, sequence, plaintext, associated_data)
     
     def open(
         self,
@@ -209,93 +414,263 @@ class TransecCipher:
         Raises:
             ValueError: If packet format is invalid
         """
-        if len(packet) < 20:
+        if len(packet) < PACKET_HEADER_SIZE:
             raise ValueError("Packet too short (minimum 20 bytes for header)")
         
-        # Extract slot_index, sequence, random, and ciphertext
-        slot_index = struct.unpack(">Q", packet[:8])[0]
-        sequence = struct.unpack(">Q", packet[8:16])[0]
-        random_bytes = packet[16:20]
-        ciphertext = packet[20:]
+        # Extract slot_index, sequence and random from the header
+        slot_index, sequence, random_bytes = _parse_packet(packet)
         
         # Validate slot is within acceptable window
-        # The slot_index in the packet is already normalized by sender
-        current_slot = self.get_current_slot()
-        
-        # For prime normalization, we need to check drift properly
-        # by comparing normalized slots to normalized slots
-        if self.prime_strategy != "none" and PRIME_OPTIMIZATION_AVAILABLE:
-            # Get raw current slot (before normalization)
-            raw_current = self.get_raw_current_slot()
-            
-            # Normalize the current slot using the same function as the sender
-            normalized_current = self._normalize_slot(raw_current)
-            
-            # Compare normalized slots for drift
-            slot_diff = abs(normalized_current - slot_index)
-            
-            # The drift window applies to the semantic drift between normalized slots
-            # We use the standard drift_window since we're comparing like-to-like now
-            if slot_diff > self.drift_window:
-                return None
-        else:
-            # Standard drift check for non-normalized slots
-            slot_diff = abs(current_slot - slot_index)
-            
-            if slot_diff > self.drift_window:
-                # Slot outside acceptable window - reject
-                return None
-        
-        # Check for replay attack
-        if check_replay:
-            msg_id = (slot_index, sequence)
-            if msg_id in self._seen_messages:
-                # Replay detected
-                return None
-            
-            # Mark as seen
-            self._seen_messages.add(msg_id)
-            self._message_count += 1
-            
-            # Periodically clean up old entries
-            if self._message_count >= self._cleanup_interval:
-                self._cleanup_replay_cache(current_slot)
-                self._message_count = 0
-        
-        # Derive key for the message's slot
-        key = self.derive_slot_key(slot_index)
-        cipher = ChaCha20Poly1305(key)
-        
-        # Reconstruct nonce (same format as seal)
-        nonce = (
-            struct.pack(">I", slot_index & 0xFFFFFFFF) +
-            struct.pack(">I", sequence & 0xFFFFFFFF) +
-            random_bytes
-        )
+        if not self.in_window(slot_index):
+            return None
         
-        # Reconstruct AAD
-        aad = (
-            struct.pack(">Q", slot_index) +
-            struct.pack(">Q", sequence) +
-            associated_data
-        )
+        # Cheap replay check before decrypting; the window is only
+        # advanced once the packet authenticates, so forgeries can't
+        # burn sequence numbers
+        if check_replay and not self._replay.check(slot_index, sequence):
+            return None
         
-        # Decrypt and verify
-        try:
-            plaintext = cipher.decrypt(nonce, ciphertext, aad)
-            return plaintext
-        except Exception:
-            # Authentication failed
+        # Key for the message's slot (derived once per slot)
+        cipher = self._slot_cipher(slot_index)
+        plaintext = _open_with(cipher, packet, slot_index, sequence, random_bytes,
+                               associated_data)
+        if plaintext is None:
             return None
+        
+        if check_replay and not self._replay.update(slot_index, sequence):
+            # Replay detected
+            return None
+        return plaintext
+    
+    def seal_many(
+        self,
+        plaintexts: Sequence[bytes],
+        sequence: int,
+        associated_data: bytes = b"",
+        slot_index: Optional[int] = None
+    ) -> List[bytes]:
+        """
+        Encrypt a burst of messages in one call.
+        
+        The slot, its AEAD instance and the random nonce bytes are
+        resolved once for the whole burst.  Each
+        packet is identical in format to one produced by seal().
+        
+        Args:
+            plaintexts: Messages to encrypt
+            sequence: Sequence number of the first message; message i uses sequence + i
+            associated_data: Additional data to authenticate, shared by every message
+            slot_index: Time slot to use (defaults to current slot, will be normalized)
+        
+        Returns:
+            One encrypted packet per plaintext, in order
+        """
+        if slot_index is None:
+            slot_index = self.get_current_slot()
+        else:
+            slot_index = self._normalize_slot(slot_index)
+        
+        encrypt = self._slot_cipher(slot_index).encrypt
+        pack_header = _HEADER.pack
+        pack_nonce = _NONCE.pack
+        slot_low = slot_index & _LOW32
+        randoms = os.urandom(4 * len(plaintexts))
+        
+        packets = []
+        for i, plaintext in enumerate(plaintexts):
+            # Same layout as _seal_with
+            random_bytes = randoms[4 * i:4 * i + 4]
+            header = pack_header(slot_index, sequence + i, random_bytes)
+            nonce = pack_nonce(slot_low, (sequence + i) & _LOW32, random_bytes)
+            aad = header[:_AAD_PREFIX_SIZE] + associated_data
+            packets.append(header + encrypt(nonce, plaintext, aad))
+        return packets
+    
+    def open_many(
+        self,
+        packets: Sequence[bytes],
+        associated_data: bytes = b"",
+        check_replay: bool = True
+    ) -> List[Optional[bytes]]:
+        """
+        Decrypt and verify a burst of packets in one call.
+        
+        The drift-window check and AEAD lookup run once per distinct slot
+        in the burst rather than once per packet.  Packets are processed in
+        order, so a duplicate inside the burst is rejected like any replay.
+        Unlike open(), a malformed (too short) packet yields None instead of
+        raising, since a batch off the wire may contain anything.
+        
+        Args:
+            packets: Encrypted packets
+            associated_data: Additional authenticated data, shared by every packet
+            check_replay: Whether to perform replay protection check
+        
+        Returns:
+            Plaintext for each packet, or None where open() would reject it
+        """
+        unpack_header = _HEADER.unpack_from
+        pack_nonce = _NONCE.pack
+        replay = self._replay
+        decryptors = {}
+        results: List[Optional[bytes]] = []
+        for packet in packets:
+            if len(packet) < PACKET_HEADER_SIZE:
+                results.append(None)
+                continue
+            slot_index, sequence, random_bytes = unpack_header(packet)
+            
+            decrypt = decryptors.get(slot_index, False)
+            if decrypt is False:
+                decrypt = (self._slot_cipher(slot_index).decrypt
+                           if self.in_window(slot_index) else None)
+                decryptors[slot_index] = decrypt
+            if decrypt is None or (check_replay and not replay.check(slot_index, sequence)):
+                results.append(None)
+                continue
+            
+            # Same layout as _open_with
+            view = memoryview(packet)
+            prefix = view[:_AAD_PREFIX_SIZE]
+            aad = prefix.tobytes() + associated_data if associated_data else prefix
+            nonce = pack_nonce(slot_index & _LOW32, sequence & _LOW32, random_bytes)
+            try:
+                plaintext = decrypt(nonce, view[PACKET_HEADER_SIZE:], aad)
+            except Exception:
+                results.append(None)
+                continue
+            if check_replay and not replay.update(slot_index, sequence):
+                plaintext = None
+            results.append(plaintext)
+        return results
+
+
+class SlotPrefetcher:
+    """
+    Keeps upcoming slot keys derived ahead of each slot boundary.
     
-    def _cleanup_replay_cache(self, current_slot: int):
-        """Remove old entries from replay protection cache."""
-        # Remove entries older than drift_window + 1 slots
-        min_valid_slot = current_slot - self.drift_window - 1
-        self._seen_messages = {
-            (slot, seq) for slot, seq in self._seen_messages
-            if slot >= min_valid_slot
-        }
+    Without it the first packet after every rollover pays HKDF (and, with
+    a prime strategy, slot normalization) on the critical path.  Runs
+    cipher.prefetch() every `interval` seconds (default: a quarter slot)
+    either on a daemon thread (start/stop) or as an asyncio task (run).
+    
+    Example:
+        prefetcher = SlotPrefetcher(cipher).start()
+        ...
+        prefetcher.stop()
+    """
+    
+    def __init__(self, cipher: TransecCipher, lookahead: int = 1,
+                 interval: Optional[float] = None):
+        self.cipher = cipher
+        self.lookahead = lookahead
+        self.interval = interval if interval is not None else cipher.slot_duration / 4
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def tick(self) -> int:
+        """Prefetch once; returns the number of keys derived."""
+        return self.cipher.prefetch(self.lookahead)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.interval)
+    
+    def start(self) -> "SlotPrefetcher":
+        """Start the background thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="transec-prefetch",
+                                            daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    async def run(self):
+        """Prefetch loop for an asyncio event loop (cancel the task to stop)."""
+        while True:
+            self.tick()
+            await asyncio.sleep(self.interval)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ReplayWindow:
+    """
+    Per-slot sliding-window replay filter (IPsec/DTLS style).
+    
+    Each slot keeps the highest sequence accepted so far and a bitmap of
+    the `window` sequences below it; anything older than the window, or
+    whose bit is already set, is a replay.  Slots live in a small ring
+    indexed by slot % ring_size.  The drift check only admits slots within
+    ± drift_window of the current one, so with ring_size > 2*drift_window + 1
+    two live slots never share a ring position and a slot that gets
+    overwritten has already aged out.  Memory is fixed per slot and every
+    operation is O(1); there is no periodic cleanup pass.
+    """
+    
+    __slots__ = ("window", "_mask", "_ring")
+    
+    def __init__(self, ring_size: int, window: int = DEFAULT_REPLAY_WINDOW):
+        if window < 1:
+            raise ValueError("replay window must be >= 1")
+        self.window = window
+        self._mask = (1 << window) - 1
+        self._ring: List[Optional[List[int]]] = [None] * ring_size
+    
+    @property
+    def ring_size(self) -> int:
+        return len(self._ring)
+    
+    def check(self, slot_index: int, sequence: int) -> bool:
+        """True if (slot, sequence) has not been seen and is inside the window."""
+        entry = self._ring[slot_index % len(self._ring)]
+        if entry is None or entry[0] < slot_index:
+            return True  # first packet of this slot
+        if entry[0] != slot_index:
+            return False  # ring holds a newer slot: this one aged out long ago
+        offset = entry[1] - sequence
+        if offset < 0:
+            return True
+        return offset < self.window and not (entry[2] >> offset) & 1
+    
+    def update(self, slot_index: int, sequence: int) -> bool:
+        """Record (slot, sequence); False if it is a replay or too old."""
+        ring = self._ring
+        i = slot_index % len(ring)
+        entry = ring[i]
+        if entry is None or entry[0] < slot_index:
+            ring[i] = [slot_index, sequence, 1]
+            return True
+        if entry[0] != slot_index:
+            return False
+        
+        _, highest, bitmap = entry
+        if sequence > highest:
+            shift = sequence - highest
+            entry[1] = sequence
+            entry[2] = ((bitmap << shift) | 1) & self._mask if shift < self.window else 1
+            return True
+        offset = highest - sequence
+        if offset >= self.window or (bitmap >> offset) & 1:
+            return False
+        entry[2] = bitmap | (1 << offset)
+        return True
+    
+    def clear(self):
+        """Forget every slot (e.g. after a key refresh)."""
+        self._ring = [None] * len(self._ring)
 
 
 def generate_shared_secret() -> bytes:
@@ -328,24 +703,7 @@ def seal_packet(
         Encrypted packet
     """
     key = derive_slot_key(shared_secret, slot_index, context)
-    cipher = ChaCha20Poly1305(key)
-    
-    random_bytes = os.urandom(4)
-    
-    nonce = (
-        struct.pack(">I", slot_index & 0xFFFFFFFF) +
-        struct.pack(">I", sequence & 0xFFFFFFFF) +
-        random_bytes
-    )
-    
-    aad = (
-        struct.pack(">Q", slot_index) +
-        struct.pack(">Q", sequence) +
-        associated_data
-    )
-    
-    ciphertext = cipher.encrypt(nonce, plaintext, aad)
-    return struct.pack(">Q", slot_index) + struct.pack(">Q", sequence) + random_bytes + ciphertext
+    return _seal_with(ChaCha20Poly1305(key), slot_index, sequence, plaintext, associated_data)
 
 
 def open_packet(
@@ -370,13 +728,10 @@ def open_packet(
     Returns:
         Decrypted plaintext, or None if verification fails
     """
-    if len(packet) < 20:
+    if len(packet) < PACKET_HEADER_SIZE:
         return None
     
-    slot_index = struct.unpack(">Q", packet[:8])[0]
-    sequence = struct.unpack(">Q", packet[8:16])[0]
-    random_bytes = packet[16:20]
-    ciphertext = packet[20:]
+    slot_index, sequence, random_bytes = _parse_packet(packet)
     
     # Validate slot window
     if local_slot is None:
@@ -387,24 +742,8 @@ def open_packet(
     
     # Derive key and decrypt
     key = derive_slot_key(shared_secret, slot_index, context)
-    cipher = ChaCha20Poly1305(key)
-    
-    nonce = (
-        struct.pack(">I", slot_index & 0xFFFFFFFF) +
-        struct.pack(">I", sequence & 0xFFFFFFFF) +
-        random_bytes
-    )
-    
-    aad = (
-        struct.pack(">Q", slot_index) +
-        struct.pack(">Q", sequence) +
-        associated_data
-    )
-    
-    try:
-        return cipher.decrypt(nonce, ciphertext, aad)
-    except Exception:
-        return None
+    return _open_with(ChaCha20Poly1305(key), packet, slot_index, sequence, random_bytes,
+                      associated_data)
 
 
 def derive_slot_key(
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+TRANSEC Batched Datagram I/O
+
+Socket helpers that move UDP datagrams in bursts, to pair with
+TransecCipher.seal_many / open_many:
+
+- recv_batch waits for one datagram, then drains whatever else the
+  kernel has already queued (up to max_packets) without blocking again
+- send_batch pushes a burst of packets and reports how many went out,
+  so a full send buffer on a non-blocking socket is backpressure rather
+  than an error
+
+CPython's socket module does not expose recvmmsg/sendmmsg, so each
+datagram is still one syscall; the saving is one wakeup and one
+seal_many/open_many call per burst instead of per packet.  Blocking
+sockets are drained with MSG_DONTWAIT where the platform has it; other
+sockets are switched to non-blocking for the drain and restored after.
+
+Example:
+    packets = cipher.seal_many(readings, sequence=seq)
+    send_batch(sock, packets, peer_address)
+    
+    batch = recv_batch(sock)
+    plaintexts = cipher.open_many([packet for packet, _ in batch])
+"""
+
+import socket
+from typing import Any, List, Optional, Sequence, Tuple
+
+DEFAULT_BATCH_SIZE = 64  # Datagrams per recv_batch call
+MAX_DATAGRAM_SIZE = 65535
+
+_MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+
+def recv_batch(
+    sock: socket.socket,
+    max_packets: int = DEFAULT_BATCH_SIZE,
+    bufsize: int = MAX_DATAGRAM_SIZE
+) -> List[Tuple[bytes, Any]]:
+    """
+    Receive up to max_packets datagrams in one call.
+    
+    The first receive honours the socket's blocking mode and timeout
+    (so socket.timeout / BlockingIOError propagate as with recvfrom);
+    the rest only take datagrams that are already queued.
+    
+    Args:
+        sock: Bound UDP socket
+        max_packets: Upper bound on datagrams returned
+        bufsize: Receive buffer size per datagram
+    
+    Returns:
+        List of (packet, address), in arrival order (never empty)
+    """
+    recvfrom = sock.recvfrom
+    batch = [recvfrom(bufsize)]
+    
+    timeout = sock.gettimeout()
+    flags = 0
+    if timeout is None and _MSG_DONTWAIT:
+        flags = _MSG_DONTWAIT
+    elif timeout != 0.0:
+        # A timeout socket would wait on an empty queue; drain non-blocking
+        sock.settimeout(0.0)
+    try:
+        while len(batch) < max_packets:
+            batch.append(recvfrom(bufsize, flags))
+    except (BlockingIOError, InterruptedError):
+        pass
+    finally:
+        if flags == 0 and timeout != 0.0:
+            sock.settimeout(timeout)
+    return batch
+
+
+def send_batch(
+    sock: socket.socket,
+    packets: Sequence[bytes],
+    address: Optional[Any] = None
+) -> int:
+    """
+    Send a burst of datagrams to one destination.
+    
+    Args:
+        sock: UDP socket (connected if address is None)
+        packets: Datagrams to send, in order
+        address: Destination (default: the socket's connected peer)
+    
+    Returns:
+        Number of packets sent; fewer than len(packets) only if a
+        non-blocking socket's send buffer filled up
+    """
+    sent = 0
+    try:
+        if address is None:
+            send = sock.send
+            for packet in packets:
+                send(packet)
+                sent += 1
+        else:
+            sendto = sock.sendto
+            for packet in packets:
+                sendto(packet, address)
+                sent += 1
+    except (BlockingIOError, InterruptedError):
+        pass
+    return sent
@@ -10,14 +10,22 @@ Key features:
 2. Embedded challenge-response for authenticated refresh
 3. Maintains current and next-generation keys during transition
 4. Backward compatible with standard TRANSEC
+5. Next-generation slot keys staged ahead of a refresh when prefetching
 """
 
 import os
 import struct
 import hashlib
 import time
-from typing import Optional, Tuple
-from .core import TransecCipher, DEFAULT_CONTEXT, DEFAULT_SLOT_DURATION, DEFAULT_DRIFT_WINDOW
+from typing import List, Optional, Sequence, Tuple
+from .core import (
+    TransecCipher,
+    SlotKeyCache,
+    derive_slot_key,
+    DEFAULT_CONTEXT,
+    DEFAULT_SLOT_DURATION,
+    DEFAULT_DRIFT_WINDOW,
+)
 
 
 class OTARTransecCipher(TransecCipher):
@@ -74,6 +82,9 @@ class OTARTransecCipher(TransecCipher):
         self.generation = 0
         self.last_refresh_time = time.time()
         
+        # Slot keys for next_secret, built by prefetch() shortly before a refresh
+        self._staged_keys: Optional[Tuple[bytes, SlotKeyCache]] = None
+        
         # Initialize next generation key if auto-refresh enabled
         if self.auto_refresh:
             self._prepare_next_generation()
@@ -113,17 +124,57 @@ class OTARTransecCipher(TransecCipher):
         if self.next_secret is None:
             self._prepare_next_generation()
         
-        # Rotate to next generation
+        # Rotate to next generation (assigning shared_secret also drops
+        # the parent's cached slot keys for the old generation)
         self.current_secret = self.next_secret
         self.shared_secret = self.current_secret  # Update parent class
         self.generation += 1
         self.last_refresh_time = time.time()
         
+        # Switch to pre-derived slot keys if prefetch() staged this generation
+        staged, self._staged_keys = self._staged_keys, None
+        if staged is not None and staged[0] == self.current_secret:
+            self._key_cache = staged[1]
+        
         # Prepare subsequent generation
         self._prepare_next_generation()
         
         # Clear replay cache on refresh for security
-        self._seen_messages.clear()
+        self._replay.clear()
+    
+    def prefetch(self, lookahead: int = 1) -> int:
+        """
+        Prefetch upcoming slot keys, and the next generation's when due.
+        
+        If an automatic refresh falls within the prefetch horizon, the next
+        generation secret is prepared and its slot keys are derived into a
+        staged cache that _perform_refresh() swaps in, so the first packet
+        after a rekey doesn't pay HKDF either.
+        
+        Returns:
+            Number of slot keys derived (current and staged generation)
+        """
+        derived = super().prefetch(lookahead)
+        if self.next_secret is None:
+            self._prepare_next_generation()
+        
+        horizon = (lookahead + 1) * self.slot_duration
+        if not self.auto_refresh or self.time_until_refresh() > horizon:
+            return derived
+        
+        staged = self._staged_keys
+        if staged is None or staged[0] != self.next_secret:
+            staged = (self.next_secret, SlotKeyCache(self._key_cache.capacity))
+            self._staged_keys = staged
+        next_secret, cache = staged
+        raw_current = self.get_raw_current_slot()
+        for raw_slot in range(raw_current, raw_current + lookahead + 1):
+            slot_index = self._normalize_slot(raw_slot)
+            if slot_index not in cache:
+                cache.get(slot_index,
+                          lambda slot: derive_slot_key(next_secret, slot, self.context))
+                derived += 1
+        return derived
     
     def seal(
         self,
@@ -210,6 +261,58 @@ class OTARTransecCipher(TransecCipher):
         # Generation mismatch - reject
         return None
     
+    def seal_many(
+        self,
+        plaintexts: Sequence[bytes],
+        sequence: int,
+        associated_data: bytes = b"",
+        slot_index: Optional[int] = None
+    ) -> List[bytes]:
+        """
+        Encrypt a burst of messages, each with the generation marker.
+        
+        Returns:
+            One packet per plaintext, formatted as by seal()
+        """
+        if self._should_refresh():
+            self._perform_refresh()
+        
+        generation_byte = struct.pack("B", self.generation % 256)
+        return [generation_byte + packet
+                for packet in super().seal_many(plaintexts, sequence, associated_data, slot_index)]
+    
+    def open_many(
+        self,
+        packets: Sequence[bytes],
+        associated_data: bytes = b"",
+        check_replay: bool = True
+    ) -> List[Optional[bytes]]:
+        """
+        Decrypt a burst of packets with generation awareness.
+        
+        Current-generation packets are opened together; the rare packet
+        from the previous generation falls back to open().
+        
+        Returns:
+            Plaintext for each packet, or None if authentication fails
+        """
+        current_gen = self.generation % 256
+        results: List[Optional[bytes]] = [None] * len(packets)
+        current = []
+        for i, packet in enumerate(packets):
+            if len(packet) < 21:
+                continue
+            if packet[0] == current_gen:
+                current.append(i)
+            else:
+                results[i] = self.open(packet, associated_data, check_replay)
+        
+        opened = super().open_many([packets[i][1:] for i in current], associated_data,
+                                   check_replay)
+        for i, plaintext in zip(current, opened):
+            results[i] = plaintext
+        return results
+    
     def _derive_previous_secret(self) -> Optional[bytes]:
         """
         Derive previous generation secret for transition period.
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+TRANSEC Multi-Peer Session Table
+
+Lets one server process talk to thousands of peers over a single socket.
+Each packet carries a 4-byte channel hash (blake2b of the peer id, as in
+hr_core.wire.MessageHeader.compute_channel_hash) in front of the standard
+TRANSEC packet:
+
+    channel_hash (4) || slot_index (8) || sequence (8) || random (4) || ciphertext + tag
+
+The channel hash is also bound into the AEAD associated data, so a packet
+can't be re-routed to another peer's session.  So is the sender's role
+(ROLE_SERVER or ROLE_CLIENT): both directions use the peer's key, and a
+packet the server sealed must not open as one the peer sent if it is
+reflected back.
+
+Key features:
+1. One lookup per packet: channel hash -> compact __slots__ PeerSession
+   holding that peer's secret, slot key cache, replay window, outbound
+   sequence counter and return address
+2. Slot arithmetic (clock, prime normalization, drift check) shared by
+   every peer
+3. Bounded memory: sessions are kept in LRU order and capped at max_peers
+4. Peer secrets from a static registry (add_peer) or derived on demand from
+   a master secret (master_secret_resolver), with no per-peer storage
+
+Eviction never weakens replay protection: a session is only dropped once
+every packet it accepted is outside the drift window, so a re-created
+session cannot accept one of them again.  If every session is still that
+recent, new peers are refused until one ages out.  Sessions for unknown
+peers are only created after their first packet authenticates.
+"""
+
+import hashlib
+import struct
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple, Union
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+
+from .core import (
+    SlotClock,
+    SlotKeyCache,
+    ReplayWindow,
+    derive_slot_key,
+    _seal_with,
+    _open_with,
+    _parse_packet,
+    PACKET_HEADER_SIZE,
+    KEY_CACHE_SLACK,
+    DEFAULT_CONTEXT,
+    DEFAULT_SLOT_DURATION,
+    DEFAULT_DRIFT_WINDOW,
+    DEFAULT_PRIME_STRATEGY,
+    DEFAULT_REPLAY_WINDOW,
+)
+
+CHANNEL_HEADER = struct.Struct("<I")
+CHANNEL_HEADER_SIZE = CHANNEL_HEADER.size
+DEFAULT_MAX_PEERS = 10000
+ROLE_SERVER = b"S"  # Associated-data marker of packets a server table seals
+ROLE_CLIENT = b"C"  # ... and of packets a client (peer-side) table seals
+
+PeerId = Union[str, bytes]
+
+
+def compute_channel_hash(peer_id: PeerId) -> int:
+    """
+    32-bit routing hash of a peer/channel id.
+    
+    Same construction as hr_core.wire.MessageHeader.compute_channel_hash.
+    """
+    if isinstance(peer_id, str):
+        peer_id = peer_id.encode()
+    return CHANNEL_HEADER.unpack(hashlib.blake2b(peer_id, digest_size=4).digest())[0]
+
+
+def derive_peer_secret(
+    master_secret: bytes,
+    channel_hash: int,
+    context: bytes = DEFAULT_CONTEXT
+) -> bytes:
+    """
+    Derive a peer's 32-byte shared secret from a server master secret.
+    
+    Args:
+        master_secret: 32-byte server master secret
+        channel_hash: The peer's channel hash
+        context: Application context string
+    
+    Returns:
+        32-byte per-peer shared secret
+    """
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=context + b":peer:" + CHANNEL_HEADER.pack(channel_hash),
+    )
+    return hkdf.derive(master_secret)
+
+
+def master_secret_resolver(
+    master_secret: bytes,
+    context: bytes = DEFAULT_CONTEXT
+) -> Callable[[int], Optional[bytes]]:
+    """Resolver deriving every peer's secret from one master secret."""
+    if len(master_secret) != 32:
+        raise ValueError("Master secret must be exactly 32 bytes (256 bits)")
+    return lambda channel_hash: derive_peer_secret(master_secret, channel_hash, context)
+
+
+class PeerSession:
+    """Per-peer state: secret, slot keys, replay window, sequence, address."""
+    
+    __slots__ = ("channel_hash", "peer_id", "secret", "keys", "replay",
+                 "sequence", "address", "last_slot")
+    
+    def __init__(self, channel_hash: int, peer_id: Optional[Hashable], secret: bytes,
+                 key_slots: int, replay_slots: int, replay_window: int):
+        self.channel_hash = channel_hash
+        self.peer_id = peer_id
+        self.secret = secret
+        self.keys = SlotKeyCache(key_slots)
+        self.replay = ReplayWindow(replay_slots, replay_window)
+        self.sequence = 0
+        self.address = None
+        self.last_slot: Optional[int] = None  # Highest slot accepted from this peer
+    
+    def next_sequence(self) -> int:
+        """Next outbound sequence number for this peer."""
+        self.sequence += 1
+        return self.sequence
+    
+    def __repr__(self) -> str:
+        name = repr(self.peer_id) if self.peer_id is not None else f"0x{self.channel_hash:08x}"
+        return f"PeerSession({name}, sequence={self.sequence}, address={self.address})"
+
+
+class SessionTable(SlotClock):
+    """
+    Channel-hash keyed table of TRANSEC peer sessions.
+    
+    Example:
+        table = SessionTable(master_secret_resolver(master))
+        session, plaintext = table.open(packet, address=addr)
+        sock.sendto(table.seal(session, b"ack"), session.address)
+        
+        # Peer side
+        client = SessionTable(role=ROLE_CLIENT)
+        client.add_peer("alice", secret)
+    """
+    
+    def __init__(
+        self,
+        resolver: Optional[Callable[[int], Optional[bytes]]] = None,
+        context: bytes = DEFAULT_CONTEXT,
+        slot_duration: int = DEFAULT_SLOT_DURATION,
+        drift_window: int = DEFAULT_DRIFT_WINDOW,
+        prime_strategy: str = DEFAULT_PRIME_STRATEGY,
+        replay_window: int = DEFAULT_REPLAY_WINDOW,
+        max_peers: int = DEFAULT_MAX_PEERS,
+        role: bytes = ROLE_SERVER
+    ):
+        """
+        Initialize a session table.
+        
+        Args:
+            resolver: Optional callable channel_hash -> 32-byte secret (or None)
+                      for peers not registered with add_peer
+            context: Application-specific context string for key derivation
+            slot_duration: Duration of each time slot in seconds
+            drift_window: Number of slots to accept (±) for clock drift tolerance
+            prime_strategy: Slot normalization strategy (see TransecCipher)
+            replay_window: Out-of-order sequences accepted per slot and peer
+            max_peers: Maximum number of live sessions
+            role: ROLE_SERVER, or ROLE_CLIENT on the peer side; packets are
+                  sealed under this role and only opened from the other one
+        """
+        super().__init__(slot_duration, drift_window, prime_strategy)
+        if max_peers < 1:
+            raise ValueError("max_peers must be >= 1")
+        if role not in (ROLE_SERVER, ROLE_CLIENT):
+            raise ValueError("role must be ROLE_SERVER or ROLE_CLIENT")
+        
+        self.resolver = resolver
+        self.context = context
+        self.replay_window = replay_window
+        self.max_peers = max_peers
+        self.role = role
+        self._peer_role = ROLE_CLIENT if role == ROLE_SERVER else ROLE_SERVER
+        self._key_slots = 2 * drift_window + 1 + KEY_CACHE_SLACK
+        self._replay_slots = 2 * drift_window + 2 + KEY_CACHE_SLACK
+        self._registry: Dict[int, Tuple[Hashable, bytes]] = {}
+        self._sessions: "OrderedDict[int, PeerSession]" = OrderedDict()
+        self.evicted = 0
+        self.refused = 0
+    
+    # -- peers ----------------------------------------------------------------
+    
+    def add_peer(self, peer_id: PeerId, secret: bytes) -> int:
+        """
+        Register a peer's shared secret.
+        
+        Returns:
+            The peer's channel hash
+        
+        Raises:
+            ValueError: If the secret is not 32 bytes or the channel hash
+                        collides with a different registered peer
+        """
+        if len(secret) != 32:
+            raise ValueError("Shared secret must be exactly 32 bytes (256 bits)")
+        channel_hash = compute_channel_hash(peer_id)
+        existing = self._registry.get(channel_hash)
+        if existing is not None and existing[0] != peer_id:
+            raise ValueError(f"Channel hash collision between {existing[0]!r} and {peer_id!r}")
+        self._registry[channel_hash] = (peer_id, secret)
+        session = self._sessions.get(channel_hash)
+        if session is not None and session.secret != secret:
+            del self._sessions[channel_hash]
+        return channel_hash
+    
+    def remove_peer(self, peer_id: PeerId):
+        """Forget a registered peer and drop its session."""
+        channel_hash = compute_channel_hash(peer_id)
+        self._registry.pop(channel_hash, None)
+        self._sessions.pop(channel_hash, None)
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def __contains__(self, peer_id: PeerId) -> bool:
+        return compute_channel_hash(peer_id) in self._sessions
+    
+    def _new_session(self, channel_hash: int) -> Optional[PeerSession]:
+        """Build (but don't insert) a session for a known or resolvable peer."""
+        entry = self._registry.get(channel_hash)
+        if entry is not None:
+            peer_id, secret = entry
+        elif self.resolver is not None:
+            peer_id, secret = None, self.resolver(channel_hash)
+            if secret is None:
+                return None
+        else:
+            return None
+        return PeerSession(channel_hash, peer_id, secret, self._key_slots,
+                           self._replay_slots, self.replay_window)
+    
+    def _evictable(self, session: PeerSession) -> bool:
+        """True once every packet the session accepted is outside the drift window."""
+        return (session.last_slot is None
+                or self.get_current_slot() - session.last_slot > self.drift_window)
+    
+    def _admit(self, session: PeerSession) -> bool:
+        """Insert a new session, evicting the LRU one if it has aged out."""
+        if len(self._sessions) >= self.max_peers:
+            _, oldest = next(iter(self._sessions.items()))
+            if not self._evictable(oldest):
+                self.refused += 1
+                return False
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        self._sessions[session.channel_hash] = session
+        return True
+    
+    def session(self, peer: Union[PeerSession, PeerId]) -> PeerSession:
+        """
+        Live session for a peer id (created for registered peers).
+        
+        Raises:
+            KeyError: If the peer is unknown
+            RuntimeError: If the table is full of recently active peers
+        """
+        if isinstance(peer, PeerSession):
+            return peer
+        channel_hash = compute_channel_hash(peer)
+        session = self._sessions.get(channel_hash)
+        if session is not None:
+            self._sessions.move_to_end(channel_hash)
+            return session
+        session = self._new_session(channel_hash)
+        if session is None:
+            raise KeyError(f"Unknown peer: {peer!r}")
+        if not self._admit(session):
+            raise RuntimeError("Session table full of active peers")
+        return session
+    
+    def _peer_cipher(self, session: PeerSession, slot_index: int) -> ChaCha20Poly1305:
+        entry = session.keys.get(
+            slot_index, lambda slot: derive_slot_key(session.secret, slot, self.context))
+        return entry[1]
+    
+    # -- packets --------------------------------------------------------------
+    
+    def seal(
+        self,
+        peer: Union[PeerSession, PeerId],
+        plaintext: bytes,
+        associated_data: bytes = b"",
+        sequence: Optional[int] = None,
+        slot_index: Optional[int] = None
+    ) -> bytes:
+        """
+        Encrypt a message for one peer.
+        
+        Args:
+            peer: PeerSession (e.g. from open) or registered peer id
+            plaintext: Data to encrypt
+            associated_data: Additional data to authenticate (not encrypted)
+            sequence: Sequence number (defaults to the peer's next one)
+            slot_index: Time slot to use (defaults to current slot, will be normalized)
+        
+        Returns:
+            channel_hash (4) || TRANSEC packet
+        """
+        session = self.session(peer)
+        if sequence is None:
+            sequence = session.next_sequence()
+        if slot_index is None:
+            slot_index = self.get_current_slot()
+        else:
+            slot_index = self._normalize_slot(slot_index)
+        
+        header = CHANNEL_HEADER.pack(session.channel_hash)
+        cipher = self._peer_cipher(session, slot_index)
+        return header + _seal_with(cipher, slot_index, sequence, plaintext,
+                                   header + self.role + associated_data)
+    
+    def open(
+        self,
+        packet: bytes,
+        associated_data: bytes = b"",
+        address=None,
+        check_replay: bool = True
+    ) -> Optional[Tuple[PeerSession, bytes]]:
+        """
+        Route, decrypt and verify a packet from any peer.
+        
+        Args:
+            packet: channel_hash (4) || TRANSEC packet
+            associated_data: Additional authenticated data (must match seal)
+            address: Sender address to remember for replies
+            check_replay: Whether to perform replay protection check
+        
+        Returns:
+            (session, plaintext), or None if the peer is unknown, the table
+            is full, authentication fails or a replay is detected
+        """
+        if len(packet) < CHANNEL_HEADER_SIZE + PACKET_HEADER_SIZE:
+            return None
+        
+        channel_hash = CHANNEL_HEADER.unpack_from(packet)[0]
+        session = self._sessions.get(channel_hash)
+        is_new = session is None
+        if is_new:
+            session = self._new_session(channel_hash)
+            if session is None:
+                return None
+        
+        slot_index, sequence, random_bytes = _parse_packet(packet, CHANNEL_HEADER_SIZE)
+        if not self.in_window(slot_index):
+            return None
+        if check_replay and not session.replay.check(slot_index, sequence):
+            return None
+        
+        cipher = self._peer_cipher(session, slot_index)
+        plaintext = _open_with(cipher, packet, slot_index, sequence, random_bytes,
+                               packet[:CHANNEL_HEADER_SIZE] + self._peer_role + associated_data,
+                               CHANNEL_HEADER_SIZE)
+        if plaintext is None:
+            return None
+        if check_replay and not session.replay.update(slot_index, sequence):
+            return None
+        
+        if is_new:
+            if not self._admit(session):
+                return None
+        else:
+            self._sessions.move_to_end(channel_hash)
+        if session.last_slot is None or slot_index > session.last_slot:
+            session.last_slot = slot_index
+        if address is not None:
+            session.address = address
+        return session, plaintext
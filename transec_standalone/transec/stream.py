@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+TRANSEC Stream Mode
+
+Moves messages larger than one datagram (files, bulk telemetry) over
+TRANSEC.  StreamSender splits each message into records that fit the
+path MTU; StreamReceiver reassembles them in whatever order they arrive.
+Every record is an ordinary TRANSEC packet behind a small cleartext
+stream header:
+
+    flags (1) || message_id (8) || fragment_index (2) || fragment_count (2) || TRANSEC packet
+
+The stream header is part of the AEAD associated data, so a fragment
+can't be moved to another position or another message.  Each record
+uses its own sequence number (a message's fragments take consecutive
+ones, and message_id is the first of them), so the cipher's replay
+window applies per record.
+
+With coalesce=True, messages small enough to share a record are packed
+together as length-prefixed entries (FLAG_COALESCED) until the record is
+full or flush() is called, so many small messages pay one header and one
+tag instead of one each.
+
+Partial messages are keyed by (slot, message_id), so a sender that
+restarts its sequence numbers in a later slot never has its fragments
+spliced into a message from before the restart.
+
+The receiver holds at most max_pending incomplete messages and
+max_buffer bytes of fragments; past either bound the message whose
+first fragment arrived earliest is dropped, so max_buffer is also the
+largest message a receiver accepts.  Reordering within a message is
+limited by the cipher's replay_window.
+
+Example:
+    sender = StreamSender(cipher, coalesce=True)
+    for chunk in telemetry:
+        send_batch(sock, sender.send(chunk), peer)
+    send_batch(sock, sender.flush(), peer)
+    
+    receiver = StreamReceiver(cipher)
+    for record, _ in recv_batch(sock):
+        for message in receiver.receive(record):
+            handle(message)
+"""
+
+import struct
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .core import PACKET_HEADER_SIZE, TransecCipher, _parse_packet
+
+STREAM_HEADER = struct.Struct(">BQHH")  # flags, message_id, fragment_index, fragment_count
+STREAM_HEADER_SIZE = STREAM_HEADER.size  # 13
+FLAG_COALESCED = 0x01
+_ENTRY = struct.Struct(">H")  # length prefix of a coalesced message
+
+_TAG_SIZE = 16  # Poly1305 tag
+
+DEFAULT_RECORD_SIZE = 1472  # 1500-byte Ethernet MTU minus IPv4 and UDP headers
+MAX_FRAGMENTS = 0xFFFF
+DEFAULT_MAX_PENDING = 64  # Incomplete messages held by a receiver
+DEFAULT_MAX_BUFFER = 16 * 1024 * 1024  # Fragment bytes held by a receiver
+
+
+class StreamSender:
+    """
+    Splits messages into MTU-sized TRANSEC records.
+    
+    Not thread-safe; use one sender per stream.
+    """
+    
+    def __init__(
+        self,
+        cipher: TransecCipher,
+        record_size: int = DEFAULT_RECORD_SIZE,
+        associated_data: bytes = b"",
+        sequence: int = 0,
+        coalesce: bool = False
+    ):
+        """
+        Args:
+            cipher: TransecCipher (or subclass) shared with the receiver
+            record_size: Largest record to produce, in bytes (the datagram payload)
+            associated_data: Additional authenticated data for every record
+            sequence: Last sequence number used; the first record gets sequence + 1
+            coalesce: Pack small messages into shared records (see flush())
+        
+        Raises:
+            ValueError: If record_size leaves no room for payload
+        """
+        # Sealing an empty payload measures the cipher's own framing (header,
+        # tag, and e.g. the OTAR generation byte)
+        overhead = STREAM_HEADER_SIZE + len(cipher.seal(b"", 0, b""))
+        if record_size <= overhead + _ENTRY.size:
+            raise ValueError(f"record_size must be larger than {overhead + _ENTRY.size} bytes")
+        
+        self.cipher = cipher
+        self.record_size = record_size
+        self.payload_size = record_size - overhead
+        self.associated_data = associated_data
+        self.sequence = sequence
+        self.coalesce = coalesce
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+    
+    def send(self, message: bytes) -> List[bytes]:
+        """
+        Turn a message into records.
+        
+        When coalescing, a message that fits in a record is held back and
+        nothing (or the previously filled record) is returned; call flush()
+        to emit what is held.  Records are always returned in message order.
+        
+        Args:
+            message: Data to send (any length up to MAX_FRAGMENTS records)
+        
+        Returns:
+            Records ready to transmit, one datagram each
+        
+        Raises:
+            ValueError: If the message needs more than MAX_FRAGMENTS records
+        """
+        records: List[bytes] = []
+        if self.coalesce:
+            entry_size = _ENTRY.size + len(message)
+            if entry_size <= self.payload_size:
+                if self._pending_size + entry_size > self.payload_size:
+                    records = self.flush()
+                self._pending.append(message)
+                self._pending_size += entry_size
+                return records
+            records = self.flush()
+        records.extend(self._fragment(message))
+        return records
+    
+    def flush(self) -> List[bytes]:
+        """
+        Emit the coalesced record being filled, if any.
+        
+        Returns:
+            Zero or one record
+        """
+        if not self._pending:
+            return []
+        payload = b"".join([_ENTRY.pack(len(m)) + m for m in self._pending])
+        self._pending = []
+        self._pending_size = 0
+        self.sequence += 1
+        return [self._seal_record(FLAG_COALESCED, self.sequence, 0, 1, payload, self.sequence)]
+    
+    def _fragment(self, message: bytes) -> List[bytes]:
+        size = self.payload_size
+        count = max(1, -(-len(message) // size))
+        if count > MAX_FRAGMENTS:
+            raise ValueError(f"message needs {count} records, more than {MAX_FRAGMENTS}")
+        
+        message_id = self.sequence + 1
+        self.sequence += count
+        # One slot for the whole message: the receiver's replay window is
+        # per slot, and the clock is read once instead of per record
+        slot_index = self.cipher.get_current_slot()
+        view = memoryview(message)
+        return [self._seal_record(0, message_id, index, count,
+                                  view[index * size:(index + 1) * size],
+                                  message_id + index, slot_index)
+                for index in range(count)]
+    
+    def _seal_record(
+        self,
+        flags: int,
+        message_id: int,
+        index: int,
+        count: int,
+        payload: bytes,
+        sequence: int,
+        slot_index: Optional[int] = None
+    ) -> bytes:
+        header = STREAM_HEADER.pack(flags, message_id, index, count)
+        return header + self.cipher.seal(payload, sequence, header + self.associated_data,
+                                         slot_index)
+
+
+class _Reassembly:
+    """Fragments received so far for one message."""
+    
+    __slots__ = ("fragments", "missing", "size")
+    
+    def __init__(self, count: int):
+        self.fragments: List[Optional[bytes]] = [None] * count
+        self.missing = count
+        self.size = 0
+
+
+class StreamReceiver:
+    """
+    Opens stream records and reassembles fragmented messages.
+    
+    Messages are returned as soon as they are complete, so a short
+    message can overtake a long one sent before it.
+    """
+    
+    def __init__(
+        self,
+        cipher: TransecCipher,
+        associated_data: bytes = b"",
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_buffer: int = DEFAULT_MAX_BUFFER
+    ):
+        """
+        Args:
+            cipher: TransecCipher (or subclass) shared with the sender
+            associated_data: Additional authenticated data (must match the sender)
+            max_pending: Incomplete messages to hold at once
+            max_buffer: Fragment bytes to hold at once (caps the message size)
+        
+        Raises:
+            ValueError: If a bound is < 1
+        """
+        if max_pending < 1 or max_buffer < 1:
+            raise ValueError("max_pending and max_buffer must be >= 1")
+        self.cipher = cipher
+        self.associated_data = associated_data
+        # Framing ahead of the TRANSEC header (e.g. the OTAR generation byte)
+        framing = len(cipher.seal(b"", 0, b"")) - PACKET_HEADER_SIZE - _TAG_SIZE
+        self._slot_offset = STREAM_HEADER_SIZE + framing
+        self.max_pending = max_pending
+        self.max_buffer = max_buffer
+        
+        self.received = 0   # messages delivered
+        self.rejected = 0   # records that were malformed, forged, replayed or out of window
+        self.dropped = 0    # incomplete messages evicted to respect the bounds
+        self.buffered = 0   # fragment bytes currently held
+        
+        # (slot, message_id) -> fragments
+        self._partial: "OrderedDict[Tuple[int, int], _Reassembly]" = OrderedDict()
+    
+    @property
+    def pending(self) -> int:
+        """Number of messages waiting for fragments."""
+        return len(self._partial)
+    
+    def receive(self, record: bytes) -> List[bytes]:
+        """
+        Process one record.
+        
+        Args:
+            record: Datagram produced by StreamSender
+        
+        Returns:
+            Messages completed by this record (empty if none, or if the
+            record was rejected)
+        """
+        if len(record) < STREAM_HEADER_SIZE:
+            self.rejected += 1
+            return []
+        flags, message_id, index, count = STREAM_HEADER.unpack_from(record)
+        if index >= count or flags & ~FLAG_COALESCED or (flags and count != 1):
+            self.rejected += 1
+            return []
+        
+        header = record[:STREAM_HEADER_SIZE]
+        payload = self.cipher.open(record[STREAM_HEADER_SIZE:], header + self.associated_data)
+        if payload is None:
+            self.rejected += 1
+            return []
+        
+        if flags:
+            return self._split(payload)
+        if count == 1:
+            self.received += 1
+            return [payload]
+        slot_index = _parse_packet(record, self._slot_offset)[0]
+        return self._reassemble((slot_index, message_id), index, count, payload)
+    
+    def receive_many(self, records: List[bytes]) -> List[bytes]:
+        """Process a burst of records (e.g. from recv_batch)."""
+        messages: List[bytes] = []
+        for record in records:
+            messages.extend(self.receive(record))
+        return messages
+    
+    def _split(self, payload: bytes) -> List[bytes]:
+        messages = []
+        offset, end = 0, len(payload)
+        while offset < end:
+            if offset + _ENTRY.size > end:
+                self.rejected += 1
+                return []
+            (length,) = _ENTRY.unpack_from(payload, offset)
+            offset += _ENTRY.size
+            if offset + length > end:
+                self.rejected += 1
+                return []
+            messages.append(payload[offset:offset + length])
+            offset += length
+        self.received += len(messages)
+        return messages
+    
+    def _reassemble(self, key: Tuple[int, int], index: int, count: int, payload: bytes) -> List[bytes]:
+        entry = self._partial.get(key)
+        if entry is None:
+            entry = _Reassembly(count)
+            self._partial[key] = entry
+        elif len(entry.fragments) != count:
+            self.rejected += 1
+            return []
+        if entry.fragments[index] is not None:
+            return []
+        
+        entry.fragments[index] = payload
+        entry.missing -= 1
+        entry.size += len(payload)
+        self.buffered += len(payload)
+        
+        if entry.missing == 0:
+            del self._partial[key]
+            self.buffered -= entry.size
+            self.received += 1
+            return [b"".join(entry.fragments)]
+        
+        # Oldest-started messages are the least likely to still complete
+        while len(self._partial) > self.max_pending or self.buffered > self.max_buffer:
+            _, evicted = self._partial.popitem(last=False)
+            self.buffered -= evicted.size
+            self.dropped += 1
+        return []